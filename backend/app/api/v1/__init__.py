@@ -1,7 +1,7 @@
 # API v1 module
 from fastapi import APIRouter
 
-from app.api.v1.endpoints import auth, users, mcp, llm, agent
+from app.api.v1.endpoints import auth, users, mcp, llm, agent, tools
 
 api_router = APIRouter()
 api_router.include_router(auth.router)
@@ -9,3 +9,4 @@ api_router.include_router(users.router)
 api_router.include_router(mcp.router)
 api_router.include_router(llm.router)
 api_router.include_router(agent.router)
+api_router.include_router(tools.router)
@@ -9,6 +9,7 @@ from typing import Optional
 from app.core.database import get_db
 from app.core.deps import get_current_active_user
 from app.core.agent_executor import AgentExecutor
+from app.core.stream_events import Error, encode_sse
 from app.core.tool_manager import tool_manager
 from app.models.user import User
 from app.services.llm_service import LLMService
@@ -36,11 +37,9 @@ async def chat(
             detail="请先配置默认 LLM"
         )
     
-    await tool_manager.load_external_mcp_tools(db, current_user.id)
-    
     agent = AgentExecutor.create_agent_executor(llm_config)
     
-    tools = tool_manager.get_all_tools()
+    tools = await tool_manager.get_all_tools(db, current_user.id)
     
     try:
         result = await agent.execute(
@@ -68,7 +67,8 @@ async def chat_stream(
     """
     Agent 流式聊天接口
     
-    接收用户消息，通过 Agent 执行器调用 LLM，流式返回响应
+    接收用户消息，通过 Agent 执行器调用 LLM，以具名 SSE 事件流式返回响应
+    （事件类型见 app.core.stream_events，data 为紧凑 JSON）
     """
     llm_config = await LLMService.get_default_llm_config(db, current_user.id)
     if not llm_config:
@@ -77,23 +77,20 @@ async def chat_stream(
             detail="请先配置默认 LLM"
         )
     
-    await tool_manager.load_external_mcp_tools(db, current_user.id)
-    
     agent = AgentExecutor.create_agent_executor(llm_config)
     
-    tools = tool_manager.get_all_tools()
+    tools = await tool_manager.get_all_tools(db, current_user.id)
     
     async def generate():
         try:
-            async for chunk in agent.execute_stream(
+            async for event in agent.execute_stream(
                 user_message=request.message,
                 tools=tools,
                 conversation_history=None
             ):
-                if chunk:
-                    yield f"data: {chunk}\n\n"
+                yield encode_sse(event)
         except Exception as e:
-            yield f"data: [ERROR] {str(e)}\n\n"
+            yield encode_sse(Error(str(e)))
     
     return StreamingResponse(
         generate(),
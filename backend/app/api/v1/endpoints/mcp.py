@@ -7,6 +7,7 @@ from typing import List
 
 from app.core.database import get_db
 from app.core.deps import get_current_active_user
+from app.core.tool_manager import tool_manager
 from app.models.user import User
 from app.models.mcp_server import MCPServer, ServerType, ServerStatus
 from app.services.mcp_service import MCPService
@@ -88,6 +89,8 @@ async def update_mcp_server(
         connection_params=server_in.connection_params,
         status=server_in.status
     )
+    if updated_server.status != ServerStatus.ACTIVE:
+        await tool_manager.unload_mcp_server(server_id)
     return updated_server
 
 
@@ -104,6 +107,7 @@ async def delete_mcp_server(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="MCP服务器不存在"
         )
+    await tool_manager.unload_mcp_server(server_id)
     return {"message": "MCP服务器已删除", "success": True}
 
 
@@ -121,8 +125,5 @@ async def test_mcp_server(
             detail="MCP服务器不存在"
         )
 
-    test_result = await MCPService.test_mcp_connection(
-        connection_params=server.connection_params,
-        server_type=server.server_type
-    )
+    test_result = await MCPService.test_mcp_server(db, server)
     return test_result
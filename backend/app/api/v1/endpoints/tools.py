@@ -0,0 +1,48 @@
+# ============================================================================
+# Tools API Endpoints
+# ============================================================================
+from typing import Optional
+
+from fastapi import APIRouter, Depends
+
+from app.core.deps import get_current_active_user, get_current_admin_user
+from app.core.tool_manager import tool_manager
+from app.models.user import User
+from app.schemas.user import MessageResponse
+
+router = APIRouter(prefix="/tools", tags=["Tools"])
+
+
+@router.get("/cache/stats", response_model=dict)
+async def get_tool_cache_stats(
+    current_user: User = Depends(get_current_active_user)
+):
+    """获取工具结果缓存统计（命中/未命中/淘汰/失效次数）"""
+    return tool_manager.result_cache.stats()
+
+
+@router.delete("/cache", response_model=MessageResponse)
+async def clear_tool_cache(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """清空工具结果缓存（缓存为所有用户共享，仅管理员可调用）"""
+    tool_manager.result_cache.clear()
+    return {"message": "工具结果缓存已清空", "success": True}
+
+
+@router.get("/breakers", response_model=dict)
+async def get_tool_breakers(
+    current_user: User = Depends(get_current_active_user)
+):
+    """获取工具熔断器状态（内置工具按工具名，外部工具按MCP服务器）"""
+    return tool_manager.breakers.snapshot()
+
+
+@router.delete("/breakers", response_model=MessageResponse)
+async def reset_tool_breakers(
+    name: Optional[str] = None,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """重置熔断器，不指定名称时重置全部（熔断器为所有用户共享，仅管理员可调用）"""
+    count = tool_manager.breakers.reset(name)
+    return {"message": f"已重置 {count} 个熔断器", "success": True}
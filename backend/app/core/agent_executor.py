@@ -1,18 +1,34 @@
 # ============================================================================
 # Agent Executor Module
 # ============================================================================
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, AsyncGenerator, Deque
+from collections import deque
+import asyncio
+import json
 import re
+from app.core.config import settings
 from app.core.llm_client import LLMClient
+from app.core.stream_events import Done, Error, StreamEvent, TextDelta, ToolCallEnd, ToolStatus, Usage
 from app.core.tool_manager import tool_manager
+from app.core.tool_output import ToolOutputShaper
 from loguru import logger
 
 
 class AgentExecutor:
     """Agent执行器 - 编排层"""
 
-    def __init__(self, llm_client: LLMClient):
+    def __init__(
+        self,
+        llm_client: LLMClient,
+        parallel_tool_calls: Optional[bool] = None,
+        tool_concurrency: Optional[int] = None
+    ):
         self.llm_client = llm_client
+        self.parallel_tool_calls = (
+            settings.AGENT_PARALLEL_TOOL_CALLS if parallel_tool_calls is None else parallel_tool_calls
+        )
+        # 每个执行器对应一次 Agent 运行，信号量限制本次运行的工具并发数
+        self._tool_semaphore = asyncio.Semaphore(max(1, tool_concurrency or settings.AGENT_TOOL_CONCURRENCY))
 
     def _extract_reasoning(self, content: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
         """
@@ -84,6 +100,9 @@ class AgentExecutor:
         
         messages.append({"role": "user", "content": user_message})
         
+        # 本次运行所有工具输出共享 token 预算
+        output_shaper = ToolOutputShaper()
+        
         max_iterations = 10
         iteration = 0
         
@@ -127,25 +146,32 @@ class AgentExecutor:
                 }
                 messages.append(assistant_message)
                 
+                parsed_calls = []
                 for tool_call in tool_calls:
                     tool_name = tool_call.get("function", {}).get("name")
                     tool_arguments = tool_call.get("function", {}).get("arguments", "{}")
                     
                     try:
-                        import json
                         arguments = json.loads(tool_arguments)
                     except json.JSONDecodeError:
                         arguments = {}
                     
                     logger.info(f"执行工具: {tool_name}, 参数: {arguments}")
-                    
-                    tool_result = await tool_manager.execute_tool(tool_name, arguments)
-                    
+                    parsed_calls.append((tool_name, arguments))
+                
+                tool_results: List[Any] = [None] * len(parsed_calls)
+                async for index, tool_result, tool_error in self._run_tool_calls(parsed_calls):
+                    if tool_error is not None:
+                        raise tool_error
+                    tool_results[index] = tool_result
+                
+                # 工具结果按原始调用顺序加入消息列表
+                for tool_call, (tool_name, _), tool_result in zip(tool_calls, parsed_calls, tool_results):
                     tool_message = {
                         "role": "tool",
                         "tool_call_id": tool_call.get("id", ""),
                         "name": tool_name,
-                        "content": str(tool_result)
+                        "content": await output_shaper.shape_async(tool_name, tool_result)
                     }
                     messages.append(tool_message)
                 
@@ -166,7 +192,7 @@ class AgentExecutor:
         user_message: str,
         tools: Optional[List[Dict[str, Any]]] = None,
         conversation_history: Optional[List[Dict[str, str]]] = None
-    ):
+    ) -> AsyncGenerator[StreamEvent, None]:
         """
         流式执行 Agent 任务
         
@@ -176,16 +202,10 @@ class AgentExecutor:
             conversation_history: 对话历史记录
             
         Yields:
-            流式响应内容
+            流式事件：各轮的内容、思考与工具调用事件，工具执行后的 ToolStatus，
+            结束时为合计的 Usage（服务返回用量时）与 Done，或 Error
         """
-        logger.info("=" * 60)
-        logger.info("[Agent] ========== 开始流式执行 ==========")
-        logger.info(f"[Agent] 用户消息: {user_message}")
-        logger.info(f"[Agent] 可用工具数量: {len(tools) if tools else 0}")
-        if tools:
-            for tool in tools:
-                tool_name = tool.get("function", {}).get("name", "unknown")
-                logger.info(f"[Agent]   - {tool_name}")
+        logger.info(f"[Agent] 开始流式执行, 用户消息: {user_message}, 可用工具数量: {len(tools) if tools else 0}")
         
         messages = []
         
@@ -193,11 +213,13 @@ class AgentExecutor:
         messages.append({"role": "system", "content": system_prompt})
         
         if conversation_history:
-            logger.info(f"[Agent] 对话历史长度: {len(conversation_history)}")
             messages.extend(conversation_history)
         
         messages.append({"role": "user", "content": user_message})
-        logger.info(f"[Agent] 消息列表长度: {len(messages)}")
+        
+        # 本次运行所有工具输出共享 token 预算
+        output_shaper = ToolOutputShaper()
+        usage: Optional[List[int]] = None
         
         max_iterations = 10
         iteration = 0
@@ -206,149 +228,185 @@ class AgentExecutor:
             iteration += 1
             logger.info(f"[Agent] ========== 迭代 {iteration}/{max_iterations} ==========")
             
+            content_parts: List[str] = []
+            tool_calls: List[ToolCallEnd] = []
+            # 工具调用的参数一完整就开始执行，与模型继续生成其余内容重叠
+            tasks: List[asyncio.Task] = []
+            tool_messages: List[Optional[Dict[str, Any]]] = []
+            finished: Deque[asyncio.Task] = deque()
+
             try:
-                tool_calls_buffer = []
-                current_content = ""
-                tool_arguments_buffer = {}
-                chunk_count = 0
-                tool_calls_executed = False  # 标记本轮是否执行了工具调用
+                finish_reason = None
                 
-                logger.info("[Agent] 开始调用LLM流式接口...")
-                async for chunk in self.llm_client.stream_chat_completion(
+                async for event in self.llm_client.stream_chat_completion(
                     messages=messages,
                     tools=tools
                 ):
-                    chunk_count += 1
-                    if chunk_count <= 5 or chunk_count % 10 == 0:
-                        logger.info(f"[Agent] 收到第{chunk_count}个chunk, 长度: {len(chunk)}, 内容: '{chunk[:100]}...' " if len(chunk) > 100 else f"[Agent] 收到第{chunk_count}个chunk: '{chunk}'")
-                    
-                    if chunk.startswith("[TOOL_CALL:"):
-                        logger.info(f"[Agent] 检测到工具调用: {chunk}")
-                        tool_calls_buffer.append(chunk)
-                    elif chunk == "[DONE]":
-                        logger.info(f"[Agent] 收到 [DONE], 总chunk数: {chunk_count}")
-                        logger.info(f"[Agent] 收到 [DONE], 工具调用缓冲区: {tool_calls_buffer}")
-                        if tool_calls_buffer:
-                            for tool_call_str in tool_calls_buffer:
-                                try:
-                                    import json
-                                    import re
-                                    
-                                    logger.info(f"[Agent] 解析工具调用: {tool_call_str}")
-                                    
-                                    # 使用正则表达式解析 [TOOL_CALL:tool_name:{...}]
-                                    # 工具名是字母数字下划线，参数是 JSON 对象
-                                    match = re.match(r'\[TOOL_CALL:([a-zA-Z_][a-zA-Z0-9_]*):(.*)\]', tool_call_str)
-                                    if match:
-                                        tool_name = match.group(1)
-                                        tool_arguments_str = match.group(2)
-                                        logger.info(f"[Agent] 正则匹配成功: 工具名={tool_name}, 参数={tool_arguments_str}")
-                                    else:
-                                        logger.warning(f"[Agent] 正则匹配失败，回退到简单解析: {tool_call_str}")
-                                        # 回退到简单解析
-                                        content = tool_call_str[12:]  # len("[TOOL_CALL:") = 12
-                                        if content.endswith(']'):
-                                            content = content[:-1]
-                                        
-                                        if ":" in content:
-                                            colon_idx = content.find(':')
-                                            tool_name = content[:colon_idx]
-                                            tool_arguments_str = content[colon_idx + 1:]
-                                        else:
-                                            tool_name = content
-                                            tool_arguments_str = "{}"
-                                        logger.info(f"[Agent] 简单解析结果: 工具名={tool_name}, 参数={tool_arguments_str}")
-                                    
-                                    try:
-                                        arguments = json.loads(tool_arguments_str)
-                                        logger.info(f"[Agent] JSON 解析成功: {arguments}")
-                                    except json.JSONDecodeError as e:
-                                        logger.warning(f"[Agent] JSON 解析失败: {e}, 尝试修复")
-                                        # 尝试修复 JSON
-                                        try:
-                                            # 可能是缺少闭合括号
-                                            if not tool_arguments_str.strip().endswith('}'):
-                                                tool_arguments_str = tool_arguments_str + '}'
-                                            arguments = json.loads(tool_arguments_str)
-                                            logger.info(f"[Agent] JSON 修复成功: {arguments}")
-                                        except Exception as e2:
-                                            logger.error(f"[Agent] JSON 修复失败: {e2}, 使用空对象")
-                                            # 如果仍然失败，使用空对象
-                                            arguments = {}
-                                    
-                                    logger.info(f"[Agent] 执行工具: {tool_name}, 参数: {arguments}")
-                                    
-                                    # 执行工具并获取结果
-                                    try:
-                                        tool_result = await tool_manager.execute_tool(tool_name, arguments)
-                                        logger.info(f"[Agent] 工具执行结果: {tool_result}")
-                                        
-                                        # 生成简洁的状态消息
-                                        status_message = f"【{tool_name}】执行成功"
-                                        
-                                        # 向前端返回简洁状态
-                                        yield f"[TOOL_STATUS:{status_message}]"
-                                        
-                                        # 将工具结果转换为JSON格式传给大模型
-                                        try:
-                                            tool_result_json = json.dumps(tool_result)
-                                        except (TypeError, ValueError) as e:
-                                            logger.warning(f"[Agent] 工具结果 JSON 序列化失败: {e}, 转换为字符串")
-                                            tool_result_json = json.dumps({"success": True, "result": str(tool_result)})
-                                        
-                                        # 准备工具结果消息给大模型
-                                        tool_message = {
-                                            "role": "tool",
-                                            "tool_call_id": f"call_{iteration}_{len(tool_calls_buffer)}",
-                                            "name": tool_name,
-                                            "content": tool_result_json
-                                        }
-                                        messages.append(tool_message)
-                                        logger.info(f"[Agent] 工具结果已添加到消息列表, 当前消息数: {len(messages)}")
-                                        
-                                    except Exception as tool_error:
-                                        logger.error(f"[Agent] 工具执行失败: {tool_error}")
-                                        status_message = f"【{tool_name}】执行失败"
-                                        yield f"[TOOL_STATUS:{status_message}]"
-                                except Exception as e:
-                                    logger.error(f"[Agent] 处理工具调用失败: {str(e)}")
-                                    yield f"[ERROR:工具调用失败: {str(e)}]"
-                            
-                            logger.info(f"[Agent] 所有工具调用处理完成, 共处理 {len(tool_calls_buffer)} 个工具")
-                            tool_calls_buffer = []
-                            current_content = ""
-                            tool_arguments_buffer = {}
-                            tool_calls_executed = True  # 标记执行了工具调用
-                            # 处理完工具后，跳出LLM循环，继续外层迭代
-                            logger.info("[Agent] 工具调用处理完成，跳出LLM循环，准备下一轮迭代")
-                            break
-                        else:
-                            logger.info("[Agent] 无工具调用, 流式响应结束")
-                            yield chunk
-                            return
-                    elif chunk.startswith("[ERROR:"):
-                        logger.error(f"[Agent] 收到错误标记: {chunk}")
-                        yield chunk
+                    if isinstance(event, TextDelta):
+                        content_parts.append(event.text)
+                        yield event
+                    elif isinstance(event, ToolCallEnd):
+                        logger.info(f"[Agent] 工具调用: {event.name}, 参数: {event.arguments}")
+                        task = self._dispatch_tool_call(
+                            len(tool_calls), event.name, event.arguments, self._previous_call(tasks)
+                        )
+                        task.add_done_callback(finished.append)
+                        tool_calls.append(event)
+                        tool_messages.append(None)
+                        tasks.append(task)
+                        yield event
+                    elif isinstance(event, Usage):
+                        usage = [a + b for a, b in zip(usage or (0, 0, 0), event)]
+                    elif isinstance(event, Done):
+                        finish_reason = event.finish_reason
+                    elif isinstance(event, Error):
+                        logger.error(f"[Agent] LLM 流式响应错误: {event.message}")
+                        yield event
                         return
                     else:
-                        current_content += chunk
-                        yield chunk
+                        yield event
+                    
+                    # 生成期间已经完成的工具立即返回状态（按完成顺序）
+                    while finished:
+                        yield await self._tool_status(finished.popleft(), tool_calls, tool_messages, output_shaper)
                 
-                # 判断是否需要继续迭代：只有执行了工具调用才继续，否则说明是正常响应完成
-                if tool_calls_executed:
-                    logger.info("[Agent] 本轮执行了工具调用，继续下一轮迭代让LLM生成总结...")
-                    continue
-                else:
+                if not tool_calls:
                     logger.info("[Agent] 本轮无工具调用，流式响应完成")
+                    if usage:
+                        yield Usage(*usage)
+                    yield Done(finish_reason)
                     return
+                
+                pending = [task for task in tasks if not task.done()]
+                for next_done in asyncio.as_completed(pending):
+                    await next_done
+                    while finished:
+                        yield await self._tool_status(finished.popleft(), tool_calls, tool_messages, output_shaper)
+                while finished:
+                    yield await self._tool_status(finished.popleft(), tool_calls, tool_messages, output_shaper)
+                
+                # 工具结果消息之前需要有包含这些调用的 assistant 消息；调用与结果均按模型给出的序号排列
+                order = sorted(range(len(tool_calls)), key=lambda position: tool_calls[position].index)
+                messages.append({
+                    "role": "assistant",
+                    "content": "".join(content_parts) or None,
+                    "tool_calls": [
+                        {
+                            "id": tool_calls[position].id,
+                            "type": "function",
+                            "function": {
+                                "name": tool_calls[position].name,
+                                "arguments": json.dumps(tool_calls[position].arguments, ensure_ascii=False)
+                            }
+                        }
+                        for position in order
+                    ]
+                })
+                
+                # 工具结果按原始调用顺序加入消息列表，继续下一轮迭代让LLM生成总结
+                messages.extend(tool_messages[position] for position in order)
+                logger.info(f"[Agent] {len(tool_calls)} 个工具调用处理完成, 当前消息数: {len(messages)}")
                     
             except Exception as e:
                 logger.error(f"[Agent] Agent 流式执行失败: {str(e)}")
-                yield f"[ERROR:Agent 流式执行失败: {str(e)}]"
+                yield Error(f"Agent 流式执行失败: {str(e)}")
                 return
+            finally:
+                # 出错或客户端断开时取消仍在执行的工具
+                for task in tasks:
+                    if not task.done():
+                        task.cancel()
         
         logger.error(f"[Agent] 达到最大迭代次数 {max_iterations}, 任务未完成")
-        yield "[ERROR:达到最大迭代次数，任务未完成]"
+        yield Error("达到最大迭代次数，任务未完成")
+
+    def _dispatch_tool_call(
+        self,
+        index: int,
+        tool_name: str,
+        arguments: Dict[str, Any],
+        previous: Optional["asyncio.Task"] = None
+    ) -> "asyncio.Task":
+        """
+        立即开始执行一个工具调用（受本次运行的并发上限约束）
+
+        Args:
+            index: 调用序号
+            tool_name: 工具名
+            arguments: 参数
+            previous: 串行模式下的上一个调用，等它结束后再执行
+
+        Returns:
+            结果为 (序号, 工具结果, 异常) 的任务
+        """
+        async def run():
+            if previous is not None:
+                await asyncio.wait([previous])
+            async with self._tool_semaphore:
+                try:
+                    return index, await tool_manager.execute_tool(tool_name, arguments), None
+                except Exception as e:
+                    return index, None, e
+
+        return asyncio.create_task(run())
+
+    async def _tool_status(
+        self,
+        task: "asyncio.Task",
+        tool_calls: List[ToolCallEnd],
+        tool_messages: List[Optional[Dict[str, Any]]],
+        output_shaper: ToolOutputShaper
+    ) -> ToolStatus:
+        """记录已完成调用的工具结果消息，返回给前端的状态"""
+        position, tool_result, tool_error = task.result()
+        call = tool_calls[position]
+        if tool_error is not None:
+            logger.error(f"[Agent] 工具执行失败: {tool_error}")
+            tool_result = {"success": False, "error": str(tool_error)}
+        else:
+            logger.info(f"[Agent] 工具执行结果: {tool_result}")
+        # 将工具结果按 token 预算整形为JSON文本传给大模型（在工具线程池中计数，不阻塞其他流）
+        tool_messages[position] = {
+            "role": "tool",
+            "tool_call_id": call.id,
+            "name": call.name,
+            "content": await output_shaper.shape_async(call.name, tool_result)
+        }
+        status = "执行成功" if tool_error is None else "执行失败"
+        return ToolStatus(call.index, call.id, call.name, tool_error is None, f"【{call.name}】{status}")
+
+    def _previous_call(self, tasks: List["asyncio.Task"]) -> Optional["asyncio.Task"]:
+        """串行模式下新调用需要等待的上一个调用"""
+        if self.parallel_tool_calls or not tasks:
+            return None
+        return tasks[-1]
+
+    async def _run_tool_calls(
+        self,
+        calls: List[Tuple[str, Dict[str, Any]]]
+    ) -> AsyncGenerator[Tuple[int, Any, Optional[BaseException]], None]:
+        """
+        执行一轮中的全部工具调用
+
+        并行模式下所有调用同时开始（受本次运行的并发上限约束），按完成顺序产出结果；
+        串行模式下按原始顺序逐个执行。
+
+        Args:
+            calls: (工具名, 参数) 列表
+
+        Yields:
+            (原始序号, 工具结果, 异常)
+        """
+        tasks: List[asyncio.Task] = []
+        for index, (tool_name, arguments) in enumerate(calls):
+            tasks.append(self._dispatch_tool_call(index, tool_name, arguments, self._previous_call(tasks)))
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
 
     def _build_system_prompt(self, tools: Optional[List[Dict[str, Any]]]) -> str:
         """
@@ -0,0 +1,143 @@
+# ============================================================================
+# Circuit Breaker Module
+# ============================================================================
+import time
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+from app.core.config import settings
+
+
+class CircuitState:
+    """熔断器状态"""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """熔断器
+
+    连续失败（异常或超时）达到阈值后打开，打开期间直接拒绝调用；
+    冷却时间过后进入半开状态，只放行一个探测调用，成功则关闭，失败则重新打开。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: Optional[int] = None,
+        recovery_timeout: Optional[float] = None,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold or settings.TOOL_BREAKER_FAILURE_THRESHOLD
+        self.recovery_timeout = recovery_timeout or settings.TOOL_BREAKER_RECOVERY_TIMEOUT
+        self.state = CircuitState.CLOSED
+        self.consecutive_failures = 0
+        self.total_failures = 0
+        self.total_successes = 0
+        self.rejected = 0
+        self.opened_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        """是否放行本次调用"""
+        if self.state == CircuitState.OPEN:
+            if time.monotonic() - self.opened_at < self.recovery_timeout:
+                self.rejected += 1
+                return False
+            self.state = CircuitState.HALF_OPEN
+            logger.info(f"熔断器 {self.name} 进入半开状态，放行探测调用")
+
+        if self.state == CircuitState.HALF_OPEN:
+            if self._probe_in_flight:
+                self.rejected += 1
+                return False
+            self._probe_in_flight = True
+        return True
+
+    def record_success(self):
+        """记录一次成功调用"""
+        self.total_successes += 1
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+        if self.state != CircuitState.CLOSED:
+            logger.info(f"熔断器 {self.name} 探测成功，恢复关闭状态")
+            self.state = CircuitState.CLOSED
+            self.opened_at = None
+
+    def record_failure(self, error: str = ""):
+        """记录一次失败调用"""
+        self.total_failures += 1
+        self.consecutive_failures += 1
+        self.last_error = error or None
+        self._probe_in_flight = False
+        if self.state == CircuitState.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != CircuitState.OPEN:
+                logger.warning(
+                    f"熔断器 {self.name} 打开（连续失败 {self.consecutive_failures} 次），"
+                    f"{self.recovery_timeout} 秒内拒绝调用"
+                )
+            self.state = CircuitState.OPEN
+            self.opened_at = time.monotonic()
+
+    def release_probe(self):
+        """探测调用被取消、未产生结果时归还探测名额"""
+        self._probe_in_flight = False
+
+    def retry_after(self) -> float:
+        """距离可以再次探测的秒数"""
+        if self.state != CircuitState.OPEN or self.opened_at is None:
+            return 0.0
+        return max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at))
+
+    def reset(self):
+        """强制恢复关闭状态"""
+        self.state = CircuitState.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "recovery_timeout": self.recovery_timeout,
+            "retry_after": round(self.retry_after(), 2),
+            "total_failures": self.total_failures,
+            "total_successes": self.total_successes,
+            "rejected": self.rejected,
+            "last_error": self.last_error,
+        }
+
+
+class CircuitBreakerRegistry:
+    """熔断器注册表 - 按名称（内置工具名或 MCP 服务器）懒创建熔断器"""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, name: str) -> CircuitBreaker:
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name)
+            self._breakers[name] = breaker
+        return breaker
+
+    def remove(self, name: str):
+        self._breakers.pop(name, None)
+
+    def reset(self, name: Optional[str] = None) -> int:
+        """重置指定熔断器，不指定时重置全部，返回重置数量"""
+        targets = [self._breakers[name]] if name in self._breakers else []
+        if name is None:
+            targets = list(self._breakers.values())
+        for breaker in targets:
+            breaker.reset()
+        return len(targets)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {name: breaker.snapshot() for name, breaker in sorted(self._breakers.items())}
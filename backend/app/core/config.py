@@ -2,7 +2,7 @@
 # Configuration Module
 # ============================================================================
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, List, Optional
 
 
 class Settings(BaseSettings):
@@ -33,9 +33,116 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    # Admin
+    ADMIN_USERNAMES: List[str] = []  # 可调用管理接口（清空工具缓存、重置熔断器）的用户名，为空时所有用户都不可调用
+
     # CORS
     BACKEND_CORS_ORIGINS: list[str] = ["http://localhost:3000", "http://localhost:5173"]
 
+    # MCP Session Pool
+    MCP_SESSION_POOL_MAX_SIZE: int = 32
+    MCP_SESSION_IDLE_TTL: int = 600
+    MCP_SESSION_REAP_INTERVAL: int = 60
+    MCP_CONNECT_TIMEOUT: float = 10.0
+    MCP_LOAD_TOTAL_TIMEOUT: float = 20.0
+    MCP_DEGRADED_COOLDOWN: int = 300
+
+    # MCP STDIO Workers
+    MCP_STDIO_WORKERS: int = 2
+    MCP_STDIO_KEEP_WARM: bool = True
+    MCP_STDIO_HEALTH_INTERVAL: int = 30
+    MCP_STDIO_PING_TIMEOUT: float = 5.0
+    MCP_STDIO_RESTART_BACKOFF: float = 1.0
+    MCP_STDIO_RESTART_BACKOFF_MAX: float = 60.0
+
+    # MCP Tool Catalog
+    MCP_CATALOG_REFRESH_INTERVAL: int = 1800
+
+    # HTTP Client Pool
+    HTTP_CLIENT_MAX_CONNECTIONS: int = 100
+    HTTP_CLIENT_MAX_KEEPALIVE: int = 20
+    HTTP_CLIENT_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_CLIENT_CONNECT_TIMEOUT: float = 10.0
+    HTTP_CLIENT_READ_TIMEOUT: float = 60.0
+    HTTP_CLIENT_HTTP2: bool = False
+
+    # LLM Client Pool
+    LLM_CLIENT_TIMEOUT: float = 60.0
+    LLM_CLIENT_CONNECT_TIMEOUT: float = 10.0
+    LLM_CLIENT_MAX_RETRIES: int = 3
+    LLM_CLIENT_MAX_CONNECTIONS: int = 100
+    LLM_CLIENT_MAX_KEEPALIVE: int = 20
+    LLM_CLIENT_KEEPALIVE_EXPIRY: float = 60.0
+    LLM_STREAM_INCLUDE_USAGE: bool = True  # 流式请求附带 stream_options，服务不支持时设为 False
+
+    # Tool Result Cache
+    TOOL_CACHE_ENABLED: bool = True
+    TOOL_CACHE_MAX_ENTRIES: int = 256
+    TOOL_CACHE_DEFAULT_TTL: int = 300
+    TOOL_CURSOR_TTL: int = 300
+    TOOL_CURSOR_MAX_ENTRIES: int = 1000
+
+    # Tool Timeouts & Circuit Breaker
+    TOOL_TIMEOUT_DEFAULT: float = 60.0
+    TOOL_TIMEOUTS: Dict[str, float] = {"web_search": 30.0}
+    TOOL_BREAKER_FAILURE_THRESHOLD: int = 5
+    TOOL_BREAKER_RECOVERY_TIMEOUT: float = 30.0
+
+    # Tool Execution
+    TOOL_THREAD_POOL_SIZE: int = 8
+
+    # Tool Output Budget (tokens)
+    TOOL_OUTPUT_TOKENIZER: str = "cl100k_base"
+    TOOL_OUTPUT_MAX_TOKENS: int = 4000
+    TOOL_OUTPUT_TOKEN_BUDGETS: Dict[str, int] = {
+        "file_read": 6000, "file_read_many": 12000, "file_search": 3000, "web_search": 3000,
+        "web_fetch": 12000,
+    }
+    TOOL_OUTPUT_RUN_BUDGET: int = 24000
+    TOOL_OUTPUT_MIN_TOKENS: int = 256
+    TOOL_OUTPUT_DROP_FIELDS: Dict[str, List[str]] = {"file_search": ["absolute_path", "match"]}
+
+    # Web Search
+    WEB_SEARCH_BACKEND: str = "duckduckgo"  # duckduckgo | stub（本地桩，不访问网络）
+    WEB_SEARCH_CACHE_TTL: int = 600
+    WEB_SEARCH_CACHE_MAX_ENTRIES: int = 256
+
+    # Web Fetch
+    WEB_FETCH_MAX_URLS: int = 10
+    WEB_FETCH_PER_HOST_CONCURRENCY: int = 2
+    WEB_FETCH_TIMEOUT: float = 15.0
+    WEB_FETCH_MAX_BYTES: int = 2 * 1024 * 1024
+    WEB_FETCH_MAX_CHARS: int = 20000
+    WEB_FETCH_MAX_REDIRECTS: int = 5
+    WEB_FETCH_CACHE_TTL: int = 300
+    WEB_FETCH_CACHE_MAX_ENTRIES: int = 128
+    WEB_FETCH_ALLOW_PRIVATE_NETWORKS: bool = False  # 访问本地测试服务器时设为 True
+    WEB_FETCH_USER_AGENT: str = "Mozilla/5.0 (compatible; AgentApp/1.0)"
+
+    # File Read
+    FILE_READ_MAX_BYTES: int = 1024 * 1024
+    FILE_READ_LINE_INDEX_STRIDE: int = 1000
+    FILE_READ_LINE_INDEX_CACHE_SIZE: int = 64
+    FILE_READ_MANY_MAX_FILES: int = 20
+    FILE_READ_MANY_MAX_BYTES: int = 256 * 1024
+
+    # File Search
+    FILE_SEARCH_MAX_FILE_SIZE: int = 32 * 1024 * 1024
+    FILE_SEARCH_MAX_LINE_LENGTH: int = 2000
+    FILE_SEARCH_EXCLUDE_DIRS: List[str] = [
+        ".git", ".hg", ".svn", "node_modules", "__pycache__", ".venv", "venv",
+        ".tox", ".nox", ".mypy_cache", ".pytest_cache", ".search_index",
+    ]
+    FILE_SEARCH_WORKERS: Optional[int] = None  # 默认为 CPU 核数
+    FILE_SEARCH_BATCH_SIZE: int = 64
+    FILE_SEARCH_INDEX_ENABLED: bool = False
+    FILE_SEARCH_INDEX_DIR: str = ".search_index"
+    FILE_SEARCH_INDEX_MAX_FILE_SIZE: int = 4 * 1024 * 1024
+
+    # Agent
+    AGENT_PARALLEL_TOOL_CALLS: bool = True
+    AGENT_TOOL_CONCURRENCY: int = 4
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         if not self.DATABASE_URL:
@@ -0,0 +1,85 @@
+# ============================================================================
+# HTTP Client Registry Module
+# ============================================================================
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from loguru import logger
+
+from app.core.config import settings
+
+
+def get_origin(url: str) -> str:
+    """提取 URL 的源（scheme://host:port）"""
+    parts = urlsplit(url)
+    scheme = (parts.scheme or "http").lower()
+    port = parts.port or (443 if scheme == "https" else 80)
+    return f"{scheme}://{(parts.hostname or '').lower()}:{port}"
+
+
+def _http2_available() -> bool:
+    """HTTP/2 需要额外安装 h2 库"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class HTTPClientRegistry:
+    """HTTP客户端注册表 - 按源复用 httpx.AsyncClient，保持长连接"""
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._http2: Optional[bool] = None
+
+    def start(self):
+        """应用启动时调用，检查 HTTP/2 支持"""
+        self._http2 = settings.HTTP_CLIENT_HTTP2 and _http2_available()
+        if settings.HTTP_CLIENT_HTTP2 and not self._http2:
+            logger.warning("已启用 HTTP_CLIENT_HTTP2 但未安装 h2 库，回退到 HTTP/1.1")
+
+    def _build_client(self) -> httpx.AsyncClient:
+        """按配置创建客户端"""
+        if self._http2 is None:
+            self.start()
+        return httpx.AsyncClient(
+            http2=bool(self._http2),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_CLIENT_MAX_KEEPALIVE,
+                keepalive_expiry=settings.HTTP_CLIENT_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(
+                settings.HTTP_CLIENT_READ_TIMEOUT,
+                connect=settings.HTTP_CLIENT_CONNECT_TIMEOUT,
+            ),
+        )
+
+    def get(self, url: str) -> httpx.AsyncClient:
+        """获取目标 URL 所属源的共享客户端"""
+        return self._get_or_create(get_origin(url))
+
+    def named(self, name: str) -> httpx.AsyncClient:
+        """获取按用途命名的共享客户端（如访问任意站点的 web_fetch，不按源拆分连接池）"""
+        return self._get_or_create(f"name:{name}")
+
+    def _get_or_create(self, key: str) -> httpx.AsyncClient:
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            client = self._build_client()
+            self._clients[key] = client
+        return client
+
+    async def aclose(self):
+        """关闭所有客户端"""
+        for origin, client in list(self._clients.items()):
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.error(f"关闭HTTP客户端 {origin} 失败: {str(e)}")
+        self._clients.clear()
+
+
+http_clients = HTTPClientRegistry()
@@ -1,9 +1,202 @@
 # ============================================================================
 # LLM Client Module
 # ============================================================================
-from typing import Optional, List, Dict, Any, AsyncGenerator
+from typing import Optional, List, Dict, Any, AsyncGenerator, Set, Tuple
 from openai import AsyncOpenAI
+import hashlib
+import httpx
 import json
+import re
+
+from loguru import logger
+
+from app.core.config import settings
+from app.core.http_client import get_origin
+from app.core.stream_events import (
+    Done, Error, ReasoningDelta, StreamEvent, TextDelta, ToolCallArgsDelta, ToolCallEnd, ToolCallStart, Usage,
+)
+
+# (provider, base_url, api_key 哈希, 超时, 重试次数)
+ClientKey = Tuple[str, str, str, float, int]
+
+
+class LLMClientRegistry:
+    """AsyncOpenAI 客户端注册表 - 进程内复用客户端，避免每次对话都新建连接池并重新握手
+
+    客户端按 (provider, base_url, api_key 哈希, 超时, 重试次数) 复用；同一源（scheme://host:port）
+    的客户端共享一个 httpx 连接池，连接数限制由 LLM_CLIENT_* 配置。
+    LLMConfig 更新或删除时由 LLMService 调用 evict_config 移除对应的客户端；
+    连接池不随之关闭（可能仍有进行中的流式响应），应用关闭时统一关闭。
+    """
+
+    def __init__(self):
+        self._clients: Dict[ClientKey, Tuple[AsyncOpenAI, httpx.AsyncClient]] = {}
+        self._pools: Dict[str, httpx.AsyncClient] = {}
+        self._config_keys: Dict[int, Set[ClientKey]] = {}
+
+    @staticmethod
+    def _key(provider: str, api_key: Optional[str], base_url: Optional[str]) -> ClientKey:
+        key_hash = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()
+        return (
+            provider or "",
+            (base_url or "").rstrip("/"),
+            key_hash,
+            settings.LLM_CLIENT_TIMEOUT,
+            settings.LLM_CLIENT_MAX_RETRIES,
+        )
+
+    def _pool(self, base_url: Optional[str]) -> httpx.AsyncClient:
+        """base_url 所属源的共享连接池（未指定 base_url 时为 OpenAI 官方地址）"""
+        origin = get_origin(base_url or "https://api.openai.com")
+        pool = self._pools.get(origin)
+        if pool is None or pool.is_closed:
+            pool = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_CLIENT_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.LLM_CLIENT_MAX_KEEPALIVE,
+                    keepalive_expiry=settings.LLM_CLIENT_KEEPALIVE_EXPIRY,
+                ),
+                timeout=httpx.Timeout(settings.LLM_CLIENT_TIMEOUT, connect=settings.LLM_CLIENT_CONNECT_TIMEOUT),
+                follow_redirects=True,
+            )
+            self._pools[origin] = pool
+        return pool
+
+    def get(
+        self,
+        provider: str,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        config_id: Optional[int] = None
+    ) -> AsyncOpenAI:
+        """获取（或创建）共享的 AsyncOpenAI 客户端；config_id 用于配置变更时定向移除"""
+        key = self._key(provider, api_key, base_url)
+        pool = self._pool(base_url)
+        client, client_pool = self._clients.get(key, (None, None))
+        # 连接池被关闭重建后，旧客户端不能再用
+        if client is None or client_pool is not pool:
+            client = AsyncOpenAI(
+                api_key=api_key or "dummy",
+                base_url=base_url,
+                max_retries=settings.LLM_CLIENT_MAX_RETRIES,
+                timeout=httpx.Timeout(settings.LLM_CLIENT_TIMEOUT, connect=settings.LLM_CLIENT_CONNECT_TIMEOUT),
+                http_client=pool,
+            )
+            self._clients[key] = (client, pool)
+            logger.info(f"已创建 LLM 客户端: {provider} {base_url or '默认地址'}")
+        if config_id is not None:
+            self._config_keys.setdefault(config_id, set()).add(key)
+        return client
+
+    def evict_config(self, config_id: int) -> int:
+        """移除某个 LLMConfig 使用过的客户端，返回移除的数量"""
+        keys = self._config_keys.pop(config_id, set())
+        removed = 0
+        for key in keys:
+            if self._clients.pop(key, None) is not None:
+                removed += 1
+        if removed:
+            logger.info(f"LLM 配置 {config_id} 已变更，移除 {removed} 个客户端")
+        return removed
+
+    async def aclose(self):
+        """关闭所有连接池"""
+        self._clients.clear()
+        self._config_keys.clear()
+        for origin, pool in list(self._pools.items()):
+            try:
+                await pool.aclose()
+            except Exception as e:
+                logger.error(f"关闭LLM连接池 {origin} 失败: {str(e)}")
+        self._pools.clear()
+
+
+llm_clients = LLMClientRegistry()
+
+
+def parse_tool_arguments(tool_name: str, arguments: str) -> Dict[str, Any]:
+    """解析工具调用的参数文本；为空时返回空对象，缺少末尾闭合括号时尝试补全，仍无法解析时返回空对象"""
+    if not arguments or not arguments.strip():
+        return {}
+    try:
+        return json.loads(arguments)
+    except json.JSONDecodeError as e:
+        logger.warning(f"[LLM] 工具 {tool_name} 参数 JSON 解析失败: {e}, 参数: '{arguments}'")
+    if not arguments.strip().endswith('}'):
+        try:
+            return json.loads(arguments + '}')
+        except json.JSONDecodeError:
+            pass
+    logger.error(f"[LLM] 工具 {tool_name} 参数修复失败，使用空对象")
+    return {}
+
+
+# 字符串内只关心引号与转义符，字符串外只关心括号与引号
+_STRING_SPECIAL = re.compile(r'["\\]')
+_STRUCTURE_SPECIAL = re.compile(r'[{}\[\]"]')
+
+
+class _ToolCallBuffer:
+    """累积一个工具调用的参数片段，并增量跟踪参数 JSON 的括号是否已经闭合
+
+    每个片段只扫描一次（按正则跳到下一个有意义的字符），闭合后再整体解析确认，
+    使工具调用的参数一旦完整即可结束，不必等待整个响应的 finish_reason。
+    """
+
+    __slots__ = ("id", "name", "fragments", "depth", "started", "in_string", "escaped", "ended")
+
+    def __init__(self):
+        self.id: Optional[str] = None
+        self.name: Optional[str] = None
+        self.fragments: List[str] = []
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escaped = False
+        self.ended = False
+
+    def feed(self, fragment: str) -> bool:
+        """追加参数片段，返回顶层 JSON 值的括号是否已闭合"""
+        self.fragments.append(fragment)
+        position = 0
+        if self.escaped:
+            # 上一个片段以转义符结尾，跳过被转义的字符
+            self.escaped = False
+            position = 1
+        length = len(fragment)
+        while position < length:
+            match = (_STRING_SPECIAL if self.in_string else _STRUCTURE_SPECIAL).search(fragment, position)
+            if match is None:
+                break
+            char = match.group()
+            position = match.end()
+            if self.in_string:
+                if char == '"':
+                    self.in_string = False
+                elif position < length:
+                    position += 1
+                else:
+                    self.escaped = True
+            elif char == '"':
+                self.in_string = True
+            elif char in "{[":
+                self.depth += 1
+                self.started = True
+            else:
+                self.depth -= 1
+        return self.started and self.depth <= 0
+
+    @property
+    def arguments(self) -> str:
+        return "".join(self.fragments)
+
+    def complete_arguments(self) -> Optional[Dict[str, Any]]:
+        """参数已是完整的 JSON 对象时返回解析结果，否则返回 None"""
+        try:
+            arguments = json.loads(self.arguments)
+        except json.JSONDecodeError:
+            return None
+        return arguments if isinstance(arguments, dict) else None
 
 
 class LLMClient:
@@ -17,7 +210,8 @@ class LLMClient:
         base_url: Optional[str] = None,
         max_tokens: int = 4096,
         temperature: float = 0.7,
-        top_p: float = 1.0
+        top_p: float = 1.0,
+        config_id: Optional[int] = None
     ):
         self.provider = provider
         self.model_name = model_name
@@ -25,13 +219,8 @@ class LLMClient:
         self.temperature = temperature
         self.top_p = top_p
 
-        # 初始化 OpenAI 兼容客户端
-        self.client = AsyncOpenAI(
-            api_key=api_key or "dummy",
-            base_url=base_url,
-            max_retries=3,
-            timeout=60.0
-        )
+        # OpenAI 兼容客户端从注册表获取，跨请求复用连接
+        self.client = llm_clients.get(provider, api_key, base_url, config_id)
 
     async def chat_completion(
         self,
@@ -99,16 +288,18 @@ class LLMClient:
         self,
         messages: List[Dict[str, str]],
         tools: Optional[List[Dict[str, Any]]] = None
-    ) -> AsyncGenerator[str, None]:
-        """流式聊天完成请求"""
-        from loguru import logger
-        
-        logger.info("=" * 60)
-        logger.info("[LLM] ========== 开始流式聊天完成 ==========")
-        logger.info(f"[LLM] 模型: {self.model_name}")
-        logger.info(f"[LLM] 消息数量: {len(messages)}")
-        logger.info(f"[LLM] 工具数量: {len(tools) if tools else 0}")
-        
+    ) -> AsyncGenerator[StreamEvent, None]:
+        """
+        流式聊天完成请求
+
+        Yields:
+            TextDelta / ReasoningDelta 内容增量；工具调用依次产出 ToolCallStart、ToolCallArgsDelta，
+            参数构成完整的 JSON 对象时立即产出 ToolCallEnd（其余调用仍在生成），参数不完整的调用
+            在 finish_reason 后修复并产出；服务返回用量时产出 Usage；最后为 Done 或 Error
+        """
+        logger.info(f"[LLM] 开始流式聊天完成, 模型: {self.model_name}, 消息数量: {len(messages)}, "
+                    f"工具数量: {len(tools) if tools else 0}")
+
         try:
             kwargs = {
                 "model": self.model_name,
@@ -121,127 +312,82 @@ class LLMClient:
 
             if tools:
                 kwargs["tools"] = tools
-                logger.info(f"[LLM] 可用工具: {[t.get('function', {}).get('name', 'unknown') for t in tools]}")
+            if settings.LLM_STREAM_INCLUDE_USAGE:
+                kwargs["stream_options"] = {"include_usage": True}
 
-            logger.info("[LLM] 调用 LLM API...")
             response = await self.client.chat.completions.create(**kwargs)
-            logger.info("[LLM] LLM API 连接成功, 开始接收流式数据...")
-
-            # 使用 index 作为 key 来累积工具调用数据
-            tool_call_buffer = {}
-            reasoning_buffer = ""
-            in_reasoning = False
-            in_content = False
-            
+
+            # 按 index 累积工具调用
+            tool_call_buffer: Dict[int, _ToolCallBuffer] = {}
+            finish_reason = None
+
             async for chunk in response:
-                delta = chunk.choices[0].delta if chunk.choices else None
-                
+                # 开启 include_usage 时，用量在最后一个 choices 为空的 chunk 中返回
+                if getattr(chunk, "usage", None):
+                    yield Usage(
+                        chunk.usage.prompt_tokens or 0,
+                        chunk.usage.completion_tokens or 0,
+                        chunk.usage.total_tokens or 0,
+                    )
+                if not chunk.choices:
+                    continue
+
+                choice = chunk.choices[0]
+                delta = choice.delta
                 if delta:
-                    # 检查是否有 reasoning 字段
-                    if hasattr(delta, 'reasoning') and delta.reasoning:
-                        if not in_reasoning:
-                            in_reasoning = True
-                            yield "<think>"
-                            in_content = False
-                        reasoning_buffer += delta.reasoning
-                    
-                    if hasattr(delta, 'content') and delta.content:
-                        # 如果之前在 reasoning 中，现在结束了
-                        if in_reasoning:
-                            yield f"{reasoning_buffer}"
-                            yield "</think>"
-                            reasoning_buffer = ""
-                            in_reasoning = False
-                        
-                        if not in_content:
-                            in_content = True
-                        
-                        yield delta.content
-                    
-                    if hasattr(delta, 'tool_calls') and delta.tool_calls:
-                        from loguru import logger
-                        logger.info(f"[LLM] 收到工具调用 delta: {delta.tool_calls}")
-                        for tool_call in delta.tool_calls:
-                            # 使用 index 作为 key
-                            index = getattr(tool_call, 'index', 0)
-                            
-                            if index not in tool_call_buffer:
-                                tool_call_buffer[index] = {
-                                    "name": None,
-                                    "arguments": ""
-                                }
-                            
-                            if hasattr(tool_call, 'function'):
-                                func = tool_call.function
-                                
-                                # 累积工具名
-                                if hasattr(func, 'name') and func.name:
-                                    tool_call_buffer[index]["name"] = func.name
-                                    logger.info(f"[LLM] 工具名[{index}]: {func.name}")
-                                
-                                # 累积参数
-                                if hasattr(func, 'arguments') and func.arguments:
-                                    tool_call_buffer[index]["arguments"] += func.arguments
-                                    logger.info(f"[LLM] 工具参数累积[{index}]: '{func.arguments}'")
-                    
-                    # 检查是否有 finish_reason
-                    finish_reason = getattr(chunk.choices[0], 'finish_reason', None)
-                    if finish_reason:
-                        from loguru import logger
-                        logger.info(f"[LLM] 流式响应结束，finish_reason: {finish_reason}")
-                        logger.info(f"[LLM] 工具调用缓冲区: {tool_call_buffer}")
-                        
-                        # 如果还有未输出的 reasoning
-                        if in_reasoning:
-                            yield f"{reasoning_buffer}"
-                            yield "</think>"
-                        
-                        # 输出工具调用
-                        for index, tool_data in tool_call_buffer.items():
-                            tool_name = tool_data["name"]
-                            arguments_str = tool_data["arguments"]
-                            
-                            if not tool_name:
-                                logger.warning(f"[LLM] 工具[{index}] 没有名称，跳过")
-                                continue
-                            
-                            logger.info(f"[LLM] 准备输出工具调用[{index}]: {tool_name}, 参数: '{arguments_str}'")
-                            try:
-                                import json
-                                if arguments_str and arguments_str.strip():
-                                    # 验证 JSON 是否有效
-                                    arguments = json.loads(arguments_str)
-                                    tool_call_msg = f"[TOOL_CALL:{tool_name}:{arguments_str}]"
-                                    logger.info(f"[LLM] 输出: {tool_call_msg}")
-                                    yield tool_call_msg
-                                else:
-                                    # 如果参数为空，使用空对象
-                                    tool_call_msg = f"[TOOL_CALL:{tool_name}:{{}}]"
-                                    logger.info(f"[LLM] 输出(空参数): {tool_call_msg}")
-                                    yield tool_call_msg
-                            except json.JSONDecodeError as e:
-                                logger.warning(f"[LLM] JSON 解析失败: {e}, 参数: '{arguments_str}'")
-                                # JSON 解析失败，尝试修复或返回空对象
-                                try:
-                                    # 尝试添加缺失的闭合括号
-                                    if arguments_str and not arguments_str.strip().endswith('}'):
-                                        arguments_str = arguments_str + '}'
-                                    arguments = json.loads(arguments_str)
-                                    tool_call_msg = f"[TOOL_CALL:{tool_name}:{arguments_str}]"
-                                    logger.info(f"[LLM] 输出(修复后): {tool_call_msg}")
-                                    yield tool_call_msg
-                                except Exception as e2:
-                                    logger.error(f"[LLM] 修复失败: {e2}, 返回空对象")
-                                    # 如果仍然失败，返回空对象
-                                    tool_call_msg = f"[TOOL_CALL:{tool_name}:{{}}]"
-                                    yield tool_call_msg
-                        
-                        logger.info("[LLM] 流式响应完成, 发送 [DONE]")
-                        yield "[DONE]"
-                        
+                    reasoning = getattr(delta, "reasoning", None) or getattr(delta, "reasoning_content", None)
+                    if reasoning:
+                        yield ReasoningDelta(reasoning)
+
+                    if delta.content:
+                        yield TextDelta(delta.content)
+
+                    for tool_call in delta.tool_calls or ():
+                        index = tool_call.index or 0
+                        buffered = tool_call_buffer.get(index)
+                        if buffered is None:
+                            buffered = tool_call_buffer[index] = _ToolCallBuffer()
+                        if tool_call.id:
+                            buffered.id = tool_call.id
+                        func = tool_call.function
+                        if func is None:
+                            continue
+                        if func.name and buffered.name is None:
+                            buffered.name = func.name
+                            buffered.id = buffered.id or f"call_{index}"
+                            yield ToolCallStart(index, buffered.id, func.name)
+                        if not func.arguments:
+                            continue
+                        if buffered.ended:
+                            if func.arguments.strip():
+                                logger.warning(f"[LLM] 工具[{index}] 参数已完整，忽略多余的片段: '{func.arguments}'")
+                            continue
+                        yield ToolCallArgsDelta(index, func.arguments)
+                        if buffered.feed(func.arguments) and buffered.name:
+                            arguments = buffered.complete_arguments()
+                            if arguments is not None:
+                                buffered.ended = True
+                                yield ToolCallEnd(index, buffered.id, buffered.name, arguments)
+
+                if choice.finish_reason:
+                    finish_reason = choice.finish_reason
+                    logger.info(f"[LLM] 流式响应结束，finish_reason: {finish_reason}")
+                    for index, buffered in sorted(tool_call_buffer.items()):
+                        if buffered.ended:
+                            continue
+                        if not buffered.name:
+                            logger.warning(f"[LLM] 工具[{index}] 没有名称，跳过")
+                            continue
+                        yield ToolCallEnd(
+                            index, buffered.id, buffered.name, parse_tool_arguments(buffered.name, buffered.arguments)
+                        )
+                    tool_call_buffer.clear()
+
+            yield Done(finish_reason)
+
         except Exception as e:
             logger.error(f"[LLM] 流式处理异常: {str(e)}")
-            yield f"[ERROR:{str(e)}]"
+            yield Error(str(e))
 
     @staticmethod
     def create_llm_client(config) -> "LLMClient":
@@ -253,5 +399,6 @@ class LLMClient:
             base_url=config.base_url,
             max_tokens=config.max_tokens,
             temperature=float(config.temperature),
-            top_p=float(config.top_p) if config.top_p else 1.0
+            top_p=float(config.top_p) if config.top_p else 1.0,
+            config_id=getattr(config, "id", None)
         )
@@ -0,0 +1,202 @@
+# ============================================================================
+# MCP Streamable HTTP Transport Module
+# ============================================================================
+import asyncio
+import json
+import uuid
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Set
+from urllib.parse import urlsplit
+
+from loguru import logger
+
+from app.core.http_client import http_clients
+
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+
+class SSEEvent:
+    """一个 Server-Sent Events 事件"""
+
+    __slots__ = ("event", "data", "id")
+
+    def __init__(self, event: str = "message", data: str = "", id: Optional[str] = None):
+        self.event = event
+        self.data = data
+        self.id = id
+
+
+async def iter_sse_events(lines: AsyncIterator[str]) -> AsyncIterator[SSEEvent]:
+    """按行增量解析 SSE 帧，遇到空行时产出一个事件"""
+    event_type = "message"
+    data_lines = []
+    event_id = None
+    async for line in lines:
+        line = line.rstrip("\r\n")
+        if not line:
+            if data_lines:
+                yield SSEEvent(event_type, "\n".join(data_lines), event_id)
+            event_type, data_lines, event_id = "message", [], None
+            continue
+        if line.startswith(":"):
+            continue
+        field, _, value = line.partition(":")
+        if value.startswith(" "):
+            value = value[1:]
+        if field == "data":
+            data_lines.append(value)
+        elif field == "event":
+            event_type = value or "message"
+        elif field == "id":
+            event_id = value
+    if data_lines:
+        yield SSEEvent(event_type, "\n".join(data_lines), event_id)
+
+
+def is_legacy_sse_url(connection_params: Dict[str, Any]) -> bool:
+    """是否为旧版 HTTP+SSE 传输（GET /sse 建立事件流，再向 endpoint 事件给出的地址 POST）"""
+    transport = connection_params.get("transport")
+    if transport:
+        return transport == "sse"
+    url = connection_params.get("url") or ""
+    return urlsplit(url).path.rstrip("/").endswith("/sse")
+
+
+class StreamableHTTPTransport:
+    """MCP Streamable HTTP 传输
+
+    响应既可能是普通 JSON，也可能是 SSE 事件流。事件流按帧增量解析，
+    进度通知即时回调，拿到与请求 ID 对应的响应后立即结束读取。
+    """
+
+    def __init__(self, url: str, headers: Optional[Dict[str, str]] = None):
+        self.url = url
+        self.headers = dict(headers or {})
+        self.session_id: Optional[str] = None
+        self._cancel_notices: Set[asyncio.Task] = set()
+
+    async def request(
+        self,
+        method: str,
+        params: Optional[Dict[str, Any]] = None,
+        on_progress: Optional[ProgressCallback] = None,
+    ) -> Dict[str, Any]:
+        """发送 JSON-RPC 请求并返回 result 字段"""
+        request_id = uuid.uuid4().hex
+        payload: Dict[str, Any] = {"jsonrpc": "2.0", "method": method, "id": request_id}
+        if params is not None:
+            payload["params"] = dict(params)
+        if on_progress is not None:
+            payload.setdefault("params", {})["_meta"] = {"progressToken": request_id}
+
+        headers = {"Accept": "application/json, text/event-stream", **self.headers}
+        if self.session_id:
+            headers["Mcp-Session-Id"] = self.session_id
+
+        try:
+            message = await self._post(payload, headers, request_id, on_progress)
+        except asyncio.CancelledError:
+            # 退出 stream 上下文会中断 HTTP 请求，同时通知服务器停止处理
+            self._notify_cancelled(request_id)
+            raise
+
+        if "error" in message:
+            error = message["error"] or {}
+            raise Exception(f"MCP错误 {error.get('code')}: {error.get('message')}")
+        if "result" not in message:
+            raise Exception("响应中未找到result字段")
+        return message["result"]
+
+    async def _post(
+        self,
+        payload: Dict[str, Any],
+        headers: Dict[str, str],
+        request_id: str,
+        on_progress: Optional[ProgressCallback],
+    ) -> Dict[str, Any]:
+        """POST 请求并读取响应消息"""
+        client = http_clients.get(self.url)
+        async with client.stream("POST", self.url, headers=headers, json=payload) as response:
+            if response.status_code != 200:
+                raise Exception(f"HTTP请求失败，状态码: {response.status_code}")
+
+            self.session_id = response.headers.get("mcp-session-id", self.session_id)
+            content_type = response.headers.get("content-type", "")
+
+            if content_type.startswith("text/event-stream"):
+                message = await self._read_event_stream(response, request_id, on_progress)
+            else:
+                body = await response.aread()
+                try:
+                    message = json.loads(body)
+                except ValueError:
+                    raise Exception("响应不是有效的JSON格式")
+        return message
+
+    def _notify_cancelled(self, request_id: str, reason: str = "客户端已取消"):
+        """后台发送 notifications/cancelled，尽力而为"""
+        async def send():
+            headers = {"Accept": "application/json, text/event-stream", **self.headers}
+            if self.session_id:
+                headers["Mcp-Session-Id"] = self.session_id
+            notification = {
+                "jsonrpc": "2.0",
+                "method": "notifications/cancelled",
+                "params": {"requestId": request_id, "reason": reason},
+            }
+            try:
+                await http_clients.get(self.url).post(self.url, headers=headers, json=notification, timeout=5.0)
+            except Exception as e:
+                logger.debug(f"[MCP] 发送取消通知失败: {str(e)}")
+
+        task = asyncio.create_task(send())
+        self._cancel_notices.add(task)
+        task.add_done_callback(self._cancel_notices.discard)
+
+    @staticmethod
+    async def _read_event_stream(
+        response,
+        request_id: str,
+        on_progress: Optional[ProgressCallback],
+    ) -> Dict[str, Any]:
+        """读取 SSE 事件流直到收到本请求的响应"""
+        async for event in iter_sse_events(response.aiter_lines()):
+            if event.event != "message" or not event.data:
+                continue
+            try:
+                message = json.loads(event.data)
+            except ValueError:
+                logger.debug(f"[MCP] 忽略无法解析的SSE事件: {event.data[:200]}")
+                continue
+
+            if message.get("id") == request_id and ("result" in message or "error" in message):
+                return message
+
+            if message.get("method") == "notifications/progress":
+                progress = message.get("params") or {}
+                if on_progress is not None and progress.get("progressToken") == request_id:
+                    on_progress(progress)
+                continue
+
+            logger.debug(f"[MCP] 忽略SSE消息: {message.get('method') or message.get('id')}")
+
+        raise Exception("SSE事件流已结束，但未收到响应")
+
+    async def list_tools(self) -> list:
+        """获取工具列表"""
+        result = await self.request("tools/list")
+        if "tools" not in result:
+            raise Exception("响应中未找到tools字段")
+        return result.get("tools", [])
+
+    async def call_tool(
+        self,
+        name: str,
+        arguments: Dict[str, Any],
+        on_progress: Optional[ProgressCallback] = None,
+    ) -> Dict[str, Any]:
+        """调用工具"""
+        return await self.request(
+            "tools/call",
+            {"name": name, "arguments": arguments},
+            on_progress=on_progress,
+        )
@@ -0,0 +1,349 @@
+# ============================================================================
+# MCP Session Pool Module
+# ============================================================================
+import asyncio
+import hashlib
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from app.core.config import settings
+from app.core.mcp_http_transport import StreamableHTTPTransport, is_legacy_sse_url
+from app.models.mcp_server import MCPServer, ServerType
+
+
+def connection_signature(mcp_server: MCPServer) -> str:
+    """计算服务器连接参数的签名，参数变化后旧会话不再复用"""
+    raw = json.dumps(
+        {"type": str(mcp_server.server_type), "params": mcp_server.connection_params or {}},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class PooledSession:
+    """池化的MCP会话
+
+    STDIO 与旧版 HTTP+SSE 会话由一个独立的宿主任务持有：进入/退出传输与 ClientSession
+    上下文必须在同一个任务中完成，否则 anyio 的取消域会报错，子进程也无法被回收。
+    Streamable HTTP 会话是无状态的请求/响应，只保存传输对象。
+    """
+
+    def __init__(self, mcp_server: MCPServer):
+        self.server_id: int = mcp_server.id
+        self.server_name: str = mcp_server.name
+        self.server_type = mcp_server.server_type
+        self.connection_params: Dict[str, Any] = dict(mcp_server.connection_params or {})
+        self.signature: str = connection_signature(mcp_server)
+        self.session: Any = None
+        self.url: Optional[str] = self.connection_params.get("url")
+        self.transport: Optional[StreamableHTTPTransport] = None
+        self.tools: List[Dict[str, Any]] = []
+        self.created_at: float = time.monotonic()
+        self.last_used: float = self.created_at
+        self.in_use: int = 0
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._owner_task: Optional[asyncio.Task] = None
+        self._error: Optional[BaseException] = None
+        self._alive = False
+        self.opening = False
+        self.keep_warm = False
+
+    @property
+    def uses_client_session(self) -> bool:
+        """是否通过 SDK 的 ClientSession 通信（STDIO 或旧版 HTTP+SSE）"""
+        return self.server_type == ServerType.STDIO or is_legacy_sse_url(self.connection_params)
+
+    @property
+    def is_alive(self) -> bool:
+        """会话是否仍可用"""
+        if self.uses_client_session:
+            return self._alive and self._owner_task is not None and not self._owner_task.done()
+        return self._alive
+
+    def touch(self):
+        """刷新最近使用时间"""
+        self.last_used = time.monotonic()
+
+    def idle_seconds(self) -> float:
+        """空闲时长（秒）"""
+        return time.monotonic() - self.last_used
+
+    async def open(self):
+        """建立连接并获取工具列表"""
+        self.opening = True
+        try:
+            if self.server_type not in (ServerType.STDIO, ServerType.STREAMABLE_HTTP):
+                raise Exception(f"不支持的MCP服务器类型: {self.server_type}")
+            if self.server_type == ServerType.STREAMABLE_HTTP and not self.url:
+                raise Exception("缺少STREAMABLE_HTTP服务器URL")
+
+            if self.uses_client_session:
+                self._owner_task = asyncio.create_task(self._run_client_session())
+                await self._ready.wait()
+                if self._error is not None:
+                    raise self._error
+            else:
+                self.transport = StreamableHTTPTransport(self.url, self.connection_params.get("headers"))
+                self.tools = await self.transport.list_tools()
+            self._alive = True
+        finally:
+            self.opening = False
+
+    def _open_transport(self):
+        """创建 SDK 传输上下文"""
+        if self.server_type == ServerType.STREAMABLE_HTTP:
+            from mcp.client.sse import sse_client
+            return sse_client(self.url, headers=self.connection_params.get("headers"))
+
+        from mcp import StdioServerParameters
+        from mcp.client.stdio import stdio_client
+
+        command = self.connection_params.get("command")
+        args = list(self.connection_params.get("args", []))
+        env = self.connection_params.get("env") or None
+        if isinstance(command, list):
+            command, args = command[0], list(command[1:]) + args
+        if not command:
+            raise Exception("缺少STDIO服务器命令")
+
+        return stdio_client(StdioServerParameters(command=command, args=args, env=env))
+
+    async def _run_client_session(self):
+        """会话宿主任务：持有传输与 ClientSession 上下文直到收到关闭信号"""
+        try:
+            from mcp import ClientSession
+
+            async with self._open_transport() as (read_stream, write_stream):
+                async with ClientSession(read_stream, write_stream) as session:
+                    await session.initialize()
+                    tools = await session.list_tools()
+                    self.session = session
+                    self.tools = [tool.model_dump() for tool in tools.tools]
+                    self._alive = True
+                    self._ready.set()
+                    await self._closing.wait()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._error = e
+        finally:
+            self._alive = False
+            self.session = None
+            self._ready.set()
+
+    async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Any:
+        """通过 ClientSession 调用工具"""
+        return await self.session.call_tool(tool_name, arguments)
+
+    async def refresh_tools(self) -> List[Dict[str, Any]]:
+        """重新拉取工具列表（复用当前会话，不重新建立连接）"""
+        if not self.is_alive:
+            raise Exception(f"MCP服务器 {self.server_name} 会话已失效")
+        if self.uses_client_session:
+            tools = await self.session.list_tools()
+            self.tools = [tool.model_dump() for tool in tools.tools]
+        else:
+            self.tools = await self.transport.list_tools()
+        self.touch()
+        return self.tools
+
+    async def close(self, timeout: float = 5.0):
+        """关闭会话，STDIO 类型会等待子进程退出"""
+        self._alive = False
+        self._closing.set()
+        task = self._owner_task
+        if task is None or task.done():
+            return
+        if not self._ready.is_set():
+            # 尚未完成握手（如连接超时被取消），无需等待正常退出
+            await self._cancel_owner(task)
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(task), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"MCP服务器 {self.server_name} 会话关闭超时，强制取消")
+            await self._cancel_owner(task)
+        except Exception as e:
+            logger.error(f"关闭MCP服务器 {self.server_name} 会话失败: {str(e)}")
+
+    @staticmethod
+    async def _cancel_owner(task: asyncio.Task, attempts: int = 3):
+        """取消宿主任务
+
+        第一次取消会被 stdio_client 内部的任务组吸收，随后它会等待子进程自行退出；
+        对不响应 stdin 关闭的子进程需要再次取消，才会触发 kill。
+        """
+        for _ in range(attempts):
+            task.cancel()
+            done, _ = await asyncio.wait({task}, timeout=0.5)
+            if done:
+                break
+        if task.done() and not task.cancelled():
+            task.exception()
+
+
+class MCPSessionPool:
+    """MCP会话池 - 按服务器ID复用长连接，空闲超时回收，限制最大会话数
+
+    STDIO 服务器的条目是工作进程组（StdioWorkerGroup），保持预热时不参与空闲回收。
+    """
+
+    def __init__(
+        self,
+        max_size: Optional[int] = None,
+        idle_ttl: Optional[float] = None,
+        reap_interval: Optional[float] = None,
+    ):
+        self.max_size = max_size or settings.MCP_SESSION_POOL_MAX_SIZE
+        self.idle_ttl = idle_ttl or settings.MCP_SESSION_IDLE_TTL
+        self.reap_interval = reap_interval or settings.MCP_SESSION_REAP_INTERVAL
+        self._sessions: Dict[int, PooledSession] = {}
+        self._locks: Dict[int, asyncio.Lock] = {}
+        self._pool_lock = asyncio.Lock()
+        self._reaper_task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, server_id: int) -> bool:
+        return server_id in self._sessions
+
+    def get(self, server_id: int) -> Optional[PooledSession]:
+        """获取存活的会话，不存在或已失效时返回 None"""
+        entry = self._sessions.get(server_id)
+        if entry is None or not entry.is_alive:
+            return None
+        return entry
+
+    async def acquire(self, mcp_server: MCPServer) -> PooledSession:
+        """获取服务器会话，存在可复用的存活会话时直接返回"""
+        lock = self._locks.setdefault(mcp_server.id, asyncio.Lock())
+        async with lock:
+            entry = self._sessions.get(mcp_server.id)
+            if entry is not None:
+                if entry.is_alive and entry.signature == connection_signature(mcp_server):
+                    entry.touch()
+                    return entry
+                await self._discard(mcp_server.id)
+
+            async with self._pool_lock:
+                await self._ensure_capacity()
+                entry = self._create_entry(mcp_server)
+                self._sessions[mcp_server.id] = entry
+
+            try:
+                await entry.open()
+            except BaseException:
+                self._sessions.pop(mcp_server.id, None)
+                await entry.close()
+                raise
+
+            logger.info(f"MCP服务器 {mcp_server.name} 会话已建立，当前会话数: {len(self._sessions)}")
+            return entry
+
+    @staticmethod
+    def _create_entry(mcp_server: MCPServer):
+        """STDIO 服务器使用受监督的工作进程组，其余类型使用单个会话"""
+        if mcp_server.server_type == ServerType.STDIO:
+            from app.core.mcp_supervisor import StdioWorkerGroup  # 避免循环导入
+            return StdioWorkerGroup(mcp_server)
+        return PooledSession(mcp_server)
+
+    @asynccontextmanager
+    async def lease(self, server_id: int):
+        """租用会话执行调用，期间会话不会被回收"""
+        entry = self.get(server_id)
+        if entry is None:
+            raise Exception(f"MCP服务器 {server_id} 未连接")
+        entry.in_use += 1
+        entry.touch()
+        try:
+            yield entry
+        finally:
+            entry.in_use -= 1
+            entry.touch()
+
+    async def _ensure_capacity(self):
+        """会话数达到上限时回收最久未使用的空闲会话"""
+        for server_id in [sid for sid, e in self._sessions.items() if not e.is_alive and not e.opening]:
+            await self._discard(server_id)
+
+        while len(self._sessions) >= self.max_size:
+            idle = [e for e in self._sessions.values() if e.in_use == 0 and not e.opening]
+            if not idle:
+                raise Exception(f"MCP会话池已满（上限 {self.max_size}），且所有会话都在使用中")
+            victim = min(idle, key=lambda e: e.last_used)
+            logger.info(f"MCP会话池已满，回收最久未使用的会话: {victim.server_name}")
+            await self._discard(victim.server_id)
+
+    async def _discard(self, server_id: int):
+        """移除并关闭会话"""
+        entry = self._sessions.pop(server_id, None)
+        if entry is not None:
+            await entry.close()
+
+    async def release(self, server_id: int):
+        """主动关闭指定服务器的会话"""
+        lock = self._locks.setdefault(server_id, asyncio.Lock())
+        async with lock:
+            await self._discard(server_id)
+        self._locks.pop(server_id, None)
+
+    async def evict_idle(self) -> int:
+        """回收空闲超时或已失效的会话，返回回收数量"""
+        expired = [
+            server_id
+            for server_id, entry in self._sessions.items()
+            if not entry.opening
+            and (
+                not entry.is_alive
+                or (not entry.keep_warm and entry.in_use == 0 and entry.idle_seconds() >= self.idle_ttl)
+            )
+        ]
+        for server_id in expired:
+            lock = self._locks.setdefault(server_id, asyncio.Lock())
+            async with lock:
+                entry = self._sessions.get(server_id)
+                if entry is None or entry.opening:
+                    continue
+                if entry.is_alive and (
+                    entry.keep_warm or entry.in_use > 0 or entry.idle_seconds() < self.idle_ttl
+                ):
+                    continue
+                await self._discard(server_id)
+                logger.info(f"已回收空闲MCP会话: {entry.server_name}")
+        return len(expired)
+
+    async def _reap_loop(self):
+        """后台定期回收空闲会话"""
+        while True:
+            await asyncio.sleep(self.reap_interval)
+            try:
+                await self.evict_idle()
+            except Exception as e:
+                logger.error(f"回收空闲MCP会话失败: {str(e)}")
+
+    def start(self):
+        """启动后台回收任务"""
+        if self._reaper_task is None or self._reaper_task.done():
+            self._reaper_task = asyncio.create_task(self._reap_loop())
+
+    async def close_all(self):
+        """停止回收任务并关闭所有会话"""
+        if self._reaper_task is not None:
+            self._reaper_task.cancel()
+            try:
+                await self._reaper_task
+            except asyncio.CancelledError:
+                pass
+            self._reaper_task = None
+
+        for server_id in list(self._sessions.keys()):
+            await self._discard(server_id)
+        self._locks.clear()
@@ -0,0 +1,265 @@
+# ============================================================================
+# MCP STDIO Worker Supervisor Module
+# ============================================================================
+import asyncio
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Set
+
+import anyio
+from loguru import logger
+
+from app.core.config import settings
+from app.core.mcp_session_pool import PooledSession, connection_signature
+from app.models.mcp_server import MCPServer
+
+
+_STREAM_ERRORS = (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream)
+
+
+class _WorkerSlot:
+    """工作进程槽位，进程崩溃重启后沿用同一个槽位"""
+
+    __slots__ = ("index", "worker", "busy", "failures", "retry_at", "restarting", "started_at")
+
+    def __init__(self, index: int):
+        self.index = index
+        self.worker: Optional[PooledSession] = None
+        self.busy = False
+        self.failures = 0
+        self.retry_at = 0.0
+        self.restarting = False
+        self.started_at = 0.0
+
+    @property
+    def alive(self) -> bool:
+        return self.worker is not None and self.worker.is_alive
+
+
+class StdioWorkerGroup:
+    """STDIO服务器工作进程组
+
+    每个 STDIO 服务器保持若干个预热的子进程，工具调用分派到空闲的进程，
+    同一服务器可以并发处理多个调用。后台监督任务定期 ping 空闲进程，
+    进程退出或无响应时按指数退避重启。对会话池暴露与 PooledSession 相同的接口。
+    """
+
+    def __init__(self, mcp_server: MCPServer, size: Optional[int] = None):
+        self.server_id: int = mcp_server.id
+        self.server_name: str = mcp_server.name
+        self.server_type = mcp_server.server_type
+        self.connection_params: Dict[str, Any] = dict(mcp_server.connection_params or {})
+        self.signature: str = connection_signature(mcp_server)
+        self.url: Optional[str] = None
+        self.transport = None
+        self.tools: List[Dict[str, Any]] = []
+        self.created_at: float = time.monotonic()
+        self.last_used: float = self.created_at
+        self.in_use: int = 0
+        self.opening = False
+        self.keep_warm: bool = settings.MCP_STDIO_KEEP_WARM
+        # 重启工作进程时使用的服务器快照，不持有 ORM 实例
+        self._server = SimpleNamespace(
+            id=self.server_id,
+            name=self.server_name,
+            server_type=self.server_type,
+            connection_params=self.connection_params,
+        )
+        size = size or int(self.connection_params.get("workers") or settings.MCP_STDIO_WORKERS)
+        self._slots: List[_WorkerSlot] = [_WorkerSlot(i) for i in range(max(1, size))]
+        self._idle = asyncio.Event()
+        self._supervisor_task: Optional[asyncio.Task] = None
+        self._retiring: Set[asyncio.Task] = set()
+        self._closed = False
+
+    @property
+    def uses_client_session(self) -> bool:
+        return True
+
+    @property
+    def is_alive(self) -> bool:
+        """至少有一个工作进程存活"""
+        return not self._closed and any(slot.alive for slot in self._slots)
+
+    def touch(self):
+        """刷新最近使用时间"""
+        self.last_used = time.monotonic()
+
+    def idle_seconds(self) -> float:
+        """空闲时长（秒）"""
+        return time.monotonic() - self.last_used
+
+    async def open(self):
+        """并发启动所有工作进程，至少一个成功即视为可用"""
+        self.opening = True
+        try:
+            results = await asyncio.gather(
+                *(self._spawn(slot) for slot in self._slots), return_exceptions=True
+            )
+            alive = [slot for slot in self._slots if slot.alive]
+            if not alive:
+                errors = [r for r in results if isinstance(r, BaseException)]
+                raise errors[0] if errors else Exception(f"MCP服务器 {self.server_name} 工作进程启动失败")
+
+            self.tools = alive[0].worker.tools
+            self._supervisor_task = asyncio.create_task(self._supervise())
+            logger.info(
+                f"MCP服务器 {self.server_name} 已预热 {len(alive)}/{len(self._slots)} 个工作进程"
+            )
+        finally:
+            self.opening = False
+
+    async def _spawn(self, slot: _WorkerSlot):
+        """在槽位上启动一个工作进程"""
+        worker = PooledSession(self._server)
+        slot.worker = worker
+        try:
+            await worker.open()
+        except BaseException as e:
+            await worker.close()
+            self._schedule_retry(slot)
+            if isinstance(e, Exception):
+                logger.warning(f"MCP服务器 {self.server_name} 工作进程 #{slot.index} 启动失败: {str(e)}")
+            raise
+        slot.started_at = time.monotonic()
+        self._idle.set()
+
+    def _schedule_retry(self, slot: _WorkerSlot):
+        """记录一次失败并计算下次重启时间（指数退避）"""
+        # 稳定运行过一段时间的进程退出后从头计算退避
+        if slot.started_at and time.monotonic() - slot.started_at >= settings.MCP_STDIO_RESTART_BACKOFF_MAX:
+            slot.failures = 0
+        slot.failures += 1
+        delay = min(
+            settings.MCP_STDIO_RESTART_BACKOFF * (2 ** (slot.failures - 1)),
+            settings.MCP_STDIO_RESTART_BACKOFF_MAX,
+        )
+        slot.retry_at = time.monotonic() + delay
+        slot.started_at = 0.0
+
+    async def _restart(self, slot: _WorkerSlot):
+        """关闭旧进程并在同一槽位启动新进程"""
+        slot.restarting = True
+        try:
+            if slot.worker is not None:
+                await slot.worker.close()
+            await asyncio.wait_for(self._spawn(slot), timeout=settings.MCP_CONNECT_TIMEOUT)
+            slot.failures = 0
+            logger.info(f"MCP服务器 {self.server_name} 工作进程 #{slot.index} 已重启")
+        except asyncio.TimeoutError:
+            logger.warning(f"MCP服务器 {self.server_name} 工作进程 #{slot.index} 重启超时")
+        except Exception:
+            pass
+        finally:
+            slot.restarting = False
+
+    async def _supervise(self):
+        """监督任务：重启退出的工作进程，定期 ping 空闲进程"""
+        next_ping = time.monotonic() + settings.MCP_STDIO_HEALTH_INTERVAL
+        while not self._closed:
+            await asyncio.sleep(1.0)
+            now = time.monotonic()
+
+            for slot in self._slots:
+                if slot.alive or slot.restarting or slot.busy:
+                    continue
+                if slot.started_at:
+                    logger.warning(f"MCP服务器 {self.server_name} 工作进程 #{slot.index} 已退出")
+                    self._schedule_retry(slot)
+                if now >= slot.retry_at:
+                    await self._restart(slot)
+
+            if now >= next_ping:
+                next_ping = now + settings.MCP_STDIO_HEALTH_INTERVAL
+                await asyncio.gather(
+                    *(self._ping(slot) for slot in self._slots if slot.alive and not slot.busy)
+                )
+
+    async def _ping(self, slot: _WorkerSlot):
+        """健康检查，无响应的进程会被关闭并等待重启"""
+        slot.busy = True
+        try:
+            await asyncio.wait_for(slot.worker.session.send_ping(), timeout=settings.MCP_STDIO_PING_TIMEOUT)
+        except Exception as e:
+            logger.warning(
+                f"MCP服务器 {self.server_name} 工作进程 #{slot.index} 健康检查失败: {str(e) or type(e).__name__}"
+            )
+            self._retire(slot)
+        finally:
+            self._release(slot)
+
+    async def _checkout(self) -> _WorkerSlot:
+        """取得一个空闲的工作进程，全部忙碌时等待"""
+        while True:
+            if self._closed:
+                raise Exception(f"MCP服务器 {self.server_name} 工作进程组已关闭")
+            alive = [slot for slot in self._slots if slot.alive]
+            if not alive:
+                raise Exception(f"MCP服务器 {self.server_name} 没有存活的工作进程")
+            for slot in alive:
+                if not slot.busy:
+                    slot.busy = True
+                    return slot
+            self._idle.clear()
+            await self._idle.wait()
+
+    def _retire(self, slot: _WorkerSlot):
+        """将工作进程移出槽位并在后台关闭，由监督任务在该槽位重启"""
+        worker = slot.worker
+        if worker is None:
+            return
+        slot.worker = None
+        task = asyncio.create_task(worker.close())
+        self._retiring.add(task)
+        task.add_done_callback(self._retiring.discard)
+
+    def _release(self, slot: _WorkerSlot):
+        slot.busy = False
+        self._idle.set()
+
+    async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Any:
+        """在空闲的工作进程上调用工具"""
+        slot = await self._checkout()
+        try:
+            return await slot.worker.session.call_tool(tool_name, arguments)
+        except _STREAM_ERRORS:
+            logger.warning(f"MCP服务器 {self.server_name} 工作进程 #{slot.index} 连接已断开")
+            self._retire(slot)
+            raise
+        except asyncio.CancelledError:
+            # 当前 SDK 不支持发送取消通知，结束该进程才能真正中止服务器端的执行
+            logger.warning(f"MCP服务器 {self.server_name} 工作进程 #{slot.index} 上的调用被取消，回收该进程")
+            self._retire(slot)
+            raise
+        finally:
+            self._release(slot)
+
+    async def refresh_tools(self) -> List[Dict[str, Any]]:
+        """通过一个工作进程重新拉取工具列表"""
+        slot = await self._checkout()
+        try:
+            self.tools = await slot.worker.refresh_tools()
+        finally:
+            self._release(slot)
+        self.touch()
+        return self.tools
+
+    async def close(self, timeout: float = 5.0):
+        """停止监督任务并关闭所有工作进程，等待子进程退出"""
+        self._closed = True
+        self._idle.set()
+        task = self._supervisor_task
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._supervisor_task = None
+
+        workers = [slot.worker for slot in self._slots if slot.worker is not None]
+        await asyncio.gather(
+            *(worker.close(timeout) for worker in workers), *self._retiring, return_exceptions=True
+        )
+        for slot in self._slots:
+            slot.worker = None
@@ -0,0 +1,83 @@
+# ============================================================================
+# Stream Events Module
+# ============================================================================
+import json
+from typing import Any, Dict, NamedTuple, Optional, Union
+
+
+class TextDelta(NamedTuple):
+    """回复正文增量"""
+    text: str
+    event = "text"
+
+
+class ReasoningDelta(NamedTuple):
+    """思考内容增量"""
+    text: str
+    event = "reasoning"
+
+
+class ToolCallStart(NamedTuple):
+    """模型开始生成一个工具调用（index 为本轮中的序号）"""
+    index: int
+    id: str
+    name: str
+    event = "tool_call_start"
+
+
+class ToolCallArgsDelta(NamedTuple):
+    """工具调用参数（JSON 文本）增量"""
+    index: int
+    delta: str
+    event = "tool_call_delta"
+
+
+class ToolCallEnd(NamedTuple):
+    """工具调用参数生成完毕，arguments 为解析后的参数"""
+    index: int
+    id: str
+    name: str
+    arguments: Dict[str, Any]
+    event = "tool_call_end"
+
+
+class ToolStatus(NamedTuple):
+    """工具执行结果状态"""
+    index: int
+    id: str
+    name: str
+    success: bool
+    message: str
+    event = "tool_status"
+
+
+class Usage(NamedTuple):
+    """token 用量"""
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+    event = "usage"
+
+
+class Done(NamedTuple):
+    """响应结束"""
+    finish_reason: Optional[str]
+    event = "done"
+
+
+class Error(NamedTuple):
+    """错误，之后不再有其他事件"""
+    message: str
+    event = "error"
+
+
+StreamEvent = Union[
+    TextDelta, ReasoningDelta, ToolCallStart, ToolCallArgsDelta, ToolCallEnd,
+    ToolStatus, Usage, Done, Error,
+]
+
+
+def encode_sse(event: StreamEvent) -> str:
+    """编码为具名 SSE 事件：event 行为事件类型，data 行为紧凑 JSON（JSON 中不含换行，内容不会破坏协议）"""
+    data = json.dumps(event._asdict(), ensure_ascii=False, separators=(",", ":"))
+    return f"event: {event.event}\ndata: {data}\n\n"
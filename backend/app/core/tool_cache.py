@@ -0,0 +1,272 @@
+# ============================================================================
+# Tool Result Cache Module
+# ============================================================================
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from loguru import logger
+
+from app.core.config import settings
+from app.tools.executor import tool_executor
+from app.tools.search.walker import walk_files
+
+
+class CachePolicy:
+    """工具结果缓存策略
+
+    Args:
+        key: 根据参数计算缓存键，返回 None 表示本次调用不缓存
+        ttl: 过期时间（秒），None 表示使用 TOOL_CACHE_DEFAULT_TTL
+        tags: 根据参数返回结果关联的路径，用于写操作后的定向失效
+        invalidates: 写工具根据参数返回需要失效的路径
+    """
+
+    def __init__(
+        self,
+        key: Optional[Callable[[Dict[str, Any]], Optional[Hashable]]] = None,
+        ttl: Optional[float] = None,
+        tags: Optional[Callable[[Dict[str, Any]], List[str]]] = None,
+        invalidates: Optional[Callable[[Dict[str, Any]], List[str]]] = None,
+    ):
+        self.key = key
+        self.ttl = ttl
+        self.tags = tags
+        self.invalidates = invalidates
+
+    @property
+    def cacheable(self) -> bool:
+        return self.key is not None
+
+
+class _CacheEntry:
+    __slots__ = ("value", "expires_at", "tags")
+
+    def __init__(self, value: Any, expires_at: Optional[float], tags: List[str]):
+        self.value = value
+        self.expires_at = expires_at
+        self.tags = tags
+
+
+class ToolResultCache:
+    """工具结果缓存 - LRU + TTL，按工具声明的策略计算键与失效范围"""
+
+    def __init__(self, max_entries: Optional[int] = None, enabled: Optional[bool] = None):
+        self.max_entries = max_entries or settings.TOOL_CACHE_MAX_ENTRIES
+        self.enabled = settings.TOOL_CACHE_ENABLED if enabled is None else enabled
+        self._policies: Dict[str, CachePolicy] = {}
+        self._entries: "OrderedDict[Tuple[str, Hashable], _CacheEntry]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def set_policy(self, tool_name: str, policy: Optional[CachePolicy]):
+        """登记工具的缓存策略"""
+        if policy is None:
+            self._policies.pop(tool_name, None)
+            return
+        self._policies[tool_name] = policy
+
+    def get_policy(self, tool_name: str) -> Optional[CachePolicy]:
+        return self._policies.get(tool_name)
+
+    async def call(
+        self,
+        tool_name: str,
+        arguments: Dict[str, Any],
+        func: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """经过缓存执行工具调用"""
+        policy = self._policies.get(tool_name)
+        if not self.enabled or policy is None:
+            return await func()
+
+        if policy.invalidates is not None:
+            result = await func()
+            for path in await tool_executor.run(policy.invalidates, arguments):
+                self.invalidate_path(path)
+            return result
+
+        if not policy.cacheable:
+            return await func()
+
+        # 键中可能包含文件状态或目录指纹，计算过程涉及磁盘 I/O
+        try:
+            key = await tool_executor.run(policy.key, arguments)
+        except Exception as e:
+            logger.debug(f"计算工具 {tool_name} 缓存键失败: {str(e)}")
+            key = None
+        if key is None:
+            return await func()
+
+        cache_key = (tool_name, key)
+        entry = self._entries.get(cache_key)
+        if entry is not None:
+            if entry.expires_at is None or entry.expires_at > time.monotonic():
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+                return entry.value
+            del self._entries[cache_key]
+
+        self.misses += 1
+        result = await func()
+        if _is_success(result):
+            ttl = policy.ttl if policy.ttl is not None else settings.TOOL_CACHE_DEFAULT_TTL
+            tags = policy.tags(arguments) if policy.tags else []
+            self._store(cache_key, _CacheEntry(result, time.monotonic() + ttl if ttl else None, tags))
+        return result
+
+    def _store(self, cache_key: Tuple[str, Hashable], entry: _CacheEntry):
+        self._entries[cache_key] = entry
+        self._entries.move_to_end(cache_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate_path(self, path: str) -> int:
+        """使与路径相关的缓存失效：该文件本身，以及包含该文件的目录的搜索结果"""
+        target = os.path.abspath(path)
+        stale = [
+            cache_key
+            for cache_key, entry in self._entries.items()
+            if any(target == tag or target.startswith(tag.rstrip(os.sep) + os.sep) for tag in entry.tags)
+        ]
+        for cache_key in stale:
+            del self._entries[cache_key]
+        self.invalidations += len(stale)
+        return len(stale)
+
+    def invalidate_tool(self, tool_name: str) -> int:
+        """清除某个工具的全部缓存"""
+        stale = [cache_key for cache_key in self._entries if cache_key[0] == tool_name]
+        for cache_key in stale:
+            del self._entries[cache_key]
+        self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """命中、未命中、淘汰等统计信息"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "policies": sorted(self._policies.keys()),
+        }
+
+
+def _is_success(result: Any) -> bool:
+    """只缓存成功的结果"""
+    if isinstance(result, dict):
+        return result.get("success", True) is not False and "error" not in result
+    return result is not None
+
+
+# ============================================================================
+# 内置工具缓存策略
+# ============================================================================
+def _file_read_key(arguments: Dict[str, Any]) -> Optional[Hashable]:
+    """file_read: 路径 + mtime + 大小 + 读取范围"""
+    path = os.path.abspath(arguments.get("file_path", ""))
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (
+        path,
+        stat.st_mtime_ns,
+        stat.st_size,
+        arguments.get("encoding") or "utf-8",
+        arguments.get("start_line"),
+        arguments.get("end_line"),
+        arguments.get("offset"),
+        arguments.get("length"),
+    )
+
+
+def _file_read_many_key(arguments: Dict[str, Any]) -> Optional[Hashable]:
+    """file_read_many: 每个文件的路径 + mtime + 大小 + 行范围，以及编码与预算"""
+    parts = []
+    for item in arguments.get("files") or []:
+        spec = {"path": item} if isinstance(item, str) else dict(item)
+        path = os.path.abspath(spec.get("path", ""))
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        parts.append((path, stat.st_mtime_ns, stat.st_size, spec.get("start_line"), spec.get("end_line")))
+    if not parts:
+        return None
+    return (tuple(parts), arguments.get("encoding") or "utf-8", arguments.get("max_total_bytes"))
+
+
+def _directory_fingerprint(directory: str, file_pattern: Optional[str]) -> str:
+    """目录指纹：file_search 会扫描的文件（遵守忽略规则与文件名过滤）的相对路径、mtime 与大小的哈希
+
+    与 file_search 使用同一个遍历，node_modules、.git 等被排除的目录不会被逐个 stat。
+    """
+    digest = hashlib.sha1()
+    for rel_path, entry in walk_files(directory):
+        if file_pattern and not Path(rel_path).match(file_pattern):
+            continue
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue
+        digest.update(f"{rel_path}\0{stat.st_mtime_ns}\0{stat.st_size}\n".encode("utf-8", "surrogateescape"))
+    return digest.hexdigest()
+
+
+def _file_search_key(arguments: Dict[str, Any]) -> Optional[Hashable]:
+    """file_search: 目录 + 搜索参数 + 目录指纹"""
+    directory = os.path.abspath(arguments.get("directory", ""))
+    if not os.path.isdir(directory):
+        return None
+    pattern = arguments.get("pattern")
+    if isinstance(pattern, list):
+        pattern = tuple(pattern)
+    return (
+        directory,
+        pattern,
+        arguments.get("file_pattern"),
+        bool(arguments.get("case_sensitive", False)),
+        arguments.get("max_results", 100),
+        arguments.get("cursor"),
+        _directory_fingerprint(directory, arguments.get("file_pattern")),
+    )
+
+
+def _file_read_many_tags(arguments: Dict[str, Any]) -> List[str]:
+    return [
+        os.path.abspath(item if isinstance(item, str) else item.get("path", ""))
+        for item in arguments.get("files") or []
+    ]
+
+
+def _path_tag(argument: str) -> Callable[[Dict[str, Any]], List[str]]:
+    def tags(arguments: Dict[str, Any]) -> List[str]:
+        value = arguments.get(argument)
+        return [os.path.abspath(value)] if value else []
+    return tags
+
+
+BUILTIN_CACHE_POLICIES: Dict[str, CachePolicy] = {
+    "file_read": CachePolicy(key=_file_read_key, tags=_path_tag("file_path")),
+    "file_read_many": CachePolicy(key=_file_read_many_key, tags=_file_read_many_tags),
+    # 结果中的 next_cursor 在服务端有有效期，缓存不能比游标活得更久
+    "file_search": CachePolicy(key=_file_search_key, ttl=settings.TOOL_CURSOR_TTL, tags=_path_tag("directory")),
+    # web_search / web_fetch 的缓存分别在 app.tools.web.search / app.tools.web.fetch 中完成
+    "file_save": CachePolicy(invalidates=_path_tag("filepath")),
+}
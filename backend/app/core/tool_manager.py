@@ -1,10 +1,15 @@
-import importlib
-import inspect
-from typing import Any, Dict, List, Optional
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from loguru import logger
-from app.models.mcp_server import MCPServer, ServerType
+from app.core.circuit_breaker import CircuitBreakerRegistry
+from app.core.config import settings
+from app.core.mcp_session_pool import MCPSessionPool, PooledSession
+from app.core.tool_cache import BUILTIN_CACHE_POLICIES, ToolResultCache
+from app.models.mcp_server import MCPServer
+from app.tools.registry import BuiltinToolRegistry, ToolArgumentError
 
 
 class ToolManager:
@@ -12,156 +17,222 @@ class ToolManager:
 
     def __init__(self):
         self.builtin_tools: Dict[str, Any] = {}
+        self.builtin_registry = BuiltinToolRegistry()
         self.external_tools: Dict[str, Any] = {}
         self._tool_definitions: Dict[str, Dict[str, Any]] = {}
-        self._mcp_clients: Dict[int, Any] = {}
+        self._mcp_servers: Dict[int, MCPServer] = {}
+        self._degraded: Dict[int, float] = {}
+        self.session_pool = MCPSessionPool()
+        self.result_cache = ToolResultCache()
+        self.breakers = CircuitBreakerRegistry()
 
     async def load_builtin_tools(self):
         """加载所有内置工具"""
         try:
-            from app.tools.builtin import file_save, file_read, file_search, web_search
+            from app.tools.builtin import file_save, file_read, file_read_many, file_search, web_search, web_fetch
 
-            self.builtin_tools["file_save"] = file_save.mcp
-            self.builtin_tools["file_read"] = file_read.mcp
-            self.builtin_tools["file_search"] = file_search.mcp
-            self.builtin_tools["web_search"] = web_search.mcp
-
-            for tool_name, tool_mcp in self.builtin_tools.items():
-                tools_list = await tool_mcp.list_tools()
-                if tools_list:
-                    for tool_def in tools_list:
-                        self._tool_definitions[tool_name] = tool_def.model_dump()
+            # FastMCP 服务保留用于对外暴露；进程内调用走注册表中的原始函数
+            for module in (file_save, file_read, file_read_many, file_search, web_search, web_fetch):
+                for tool in await self.builtin_registry.register_module(module):
+                    self.builtin_tools[tool.name] = module.mcp
+                    self._tool_definitions[tool.name] = tool.definition
+                    self.result_cache.set_policy(tool.name, BUILTIN_CACHE_POLICIES.get(tool.name))
 
             logger.info(f"已加载 {len(self.builtin_tools)} 个内置工具")
         except Exception as e:
             logger.error(f"加载内置工具失败: {str(e)}")
 
-    async def load_external_mcp_tools(self, db: AsyncSession, user_id: int):
-        """加载用户配置的外部MCP工具"""
+    async def load_external_mcp_tools(
+        self, db: AsyncSession, user_id: Optional[int] = None
+    ) -> Dict[int, List[Dict[str, Any]]]:
+        """连接外部MCP服务器并拉取最新工具列表
+
+        不指定 user_id 时处理所有启用的服务器（供工具目录定时刷新使用）。
+
+        Returns:
+            服务器ID -> 工具定义列表，连接失败的服务器不包含在内
+        """
+        fetched: Dict[int, List[Dict[str, Any]]] = {}
         try:
             from sqlalchemy import select
             from app.models.mcp_server import MCPServer, ServerStatus
 
-            result = await db.execute(
-                select(MCPServer)
-                .where((MCPServer.user_id == user_id) & (MCPServer.status == ServerStatus.ACTIVE))
-            )
-            mcp_servers = list(result.scalars().all())
+            query = select(MCPServer).where(MCPServer.status == ServerStatus.ACTIVE)
+            if user_id is not None:
+                query = query.where(MCPServer.user_id == user_id)
+            result = await db.execute(query)
+            mcp_servers = [s for s in result.scalars().all() if not self.is_degraded(s.id)]
+            if not mcp_servers:
+                return fetched
 
-            for mcp_server in mcp_servers:
+            async def fetch(mcp_server: MCPServer):
                 try:
-                    await self._connect_mcp_server(mcp_server)
+                    fetched[mcp_server.id] = await self.fetch_server_tools_with_timeout(mcp_server)
+                except asyncio.TimeoutError:
+                    pass
                 except Exception as e:
                     logger.error(f"连接MCP服务器 {mcp_server.name} 失败: {str(e)}")
 
-            logger.info(f"已加载 {len(self.external_tools)} 个外部MCP工具")
+            # 所有服务器并发连接，总耗时受最慢的健康服务器与总时限约束
+            tasks = {asyncio.create_task(fetch(s)): s for s in mcp_servers}
+            _, pending = await asyncio.wait(tasks.keys(), timeout=settings.MCP_LOAD_TOTAL_TIMEOUT)
+            for task in pending:
+                task.cancel()
+                self._mark_degraded(tasks[task], "超出总加载时限")
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+            logger.info(f"已从 {len(fetched)} 个MCP服务器拉取工具列表")
         except Exception as e:
             logger.error(f"加载外部MCP工具失败: {str(e)}")
+        return fetched
+
+    @staticmethod
+    def _connect_timeout(mcp_server: MCPServer) -> float:
+        """单个服务器的连接时限，可在 connection_params.connect_timeout 中覆盖"""
+        params = mcp_server.connection_params or {}
+        return float(params.get("connect_timeout") or settings.MCP_CONNECT_TIMEOUT)
 
-    async def _connect_mcp_server(self, mcp_server: MCPServer):
-        """连接到MCP服务器并加载工具"""
+    def _mark_degraded(self, mcp_server: MCPServer, reason: str):
+        """标记服务器为降级状态，冷却期内跳过该服务器"""
+        self._degraded[mcp_server.id] = time.monotonic() + settings.MCP_DEGRADED_COOLDOWN
+        logger.warning(
+            f"MCP服务器 {mcp_server.name} {reason}，标记为降级，"
+            f"{settings.MCP_DEGRADED_COOLDOWN} 秒内跳过"
+        )
+
+    def is_degraded(self, mcp_server_id: int) -> bool:
+        """服务器是否处于降级冷却期"""
+        until = self._degraded.get(mcp_server_id)
+        if until is None:
+            return False
+        if time.monotonic() >= until:
+            self._degraded.pop(mcp_server_id, None)
+            return False
+        return True
+
+    async def fetch_server_tools(self, mcp_server: MCPServer) -> List[Dict[str, Any]]:
+        """拉取单个服务器的最新工具列表，已有存活会话时复用该会话"""
+        reused = self.session_pool.get(mcp_server.id) is not None
+        pooled = await self._connect_mcp_server(mcp_server)
+        if reused:
+            await pooled.refresh_tools()
+        self._register_external_tools(mcp_server, pooled.tools)
+        self._degraded.pop(mcp_server.id, None)
+        return pooled.tools
+
+    async def fetch_server_tools_with_timeout(self, mcp_server: MCPServer) -> List[Dict[str, Any]]:
+        """在连接时限内拉取工具列表，超时则标记服务器为降级并抛出 asyncio.TimeoutError"""
         try:
-            from mcp import ClientSession
-            
-            if mcp_server.server_type == ServerType.STDIO:
-                from mcp.client.stdio import stdio_client
-                command = mcp_server.connection_params.get("command")
-                args = mcp_server.connection_params.get("args", [])
-                env = mcp_server.connection_params.get("env", {})
-                
-                read_stream, write_stream = await stdio_client(command, args, env).__aenter__()
-                session = ClientSession(read_stream, write_stream)
-                
-                await session.initialize()
-                
-                self._mcp_clients[mcp_server.id] = {
-                    "client": session,
-                    "context": (read_stream, write_stream),
-                    "server": mcp_server
-                }
-                
-                tools = await session.list_tools()
-                for tool in tools.tools:
-                    tool_key = f"mcp_{mcp_server.id}_{tool.name}"
-                    self.external_tools[tool_key] = {
-                        "mcp_server_id": mcp_server.id,
-                        "tool_name": tool.name,
-                        "tool": tool
-                    }
-                    self._tool_definitions[tool_key] = tool.model_dump()
-                
-                logger.info(f"MCP服务器 {mcp_server.name} 连接成功，加载了 {len(tools.tools)} 个工具")
-                
-            elif mcp_server.server_type == ServerType.STREAMABLE_HTTP:
-                import httpx
-                url = mcp_server.connection_params.get("url")
-                
-                async with httpx.AsyncClient() as client:
-                    response = await client.post(url, headers={
-                        "Accept": "application/json, text/event-stream"
-                    }, json={
-                        "jsonrpc": "2.0",
-                        "method": "tools/list",
-                        "id": "96d57e63-2"
-                    })
-                    
-                    if response.status_code != 200:
-                        raise Exception(f"HTTP请求失败，状态码: {response.status_code}")
-                    
-                    data = response.json()
-                    
-                    if "result" not in data or "tools" not in data.get("result", {}):
-                        raise Exception("响应中未找到tools字段")
-                    
-                    tools_data = data.get("result", {}).get("tools", [])
-                    
-                    self._mcp_clients[mcp_server.id] = {
-                        "url": url,
-                        "server": mcp_server
-                    }
-                    
-                    for tool_data in tools_data:
-                        tool_key = f"mcp_{mcp_server.id}_{tool_data.get('name', '')}"
-                        self.external_tools[tool_key] = {
-                            "mcp_server_id": mcp_server.id,
-                            "tool_name": tool_data.get('name', ''),
-                            "tool": tool_data
-                        }
-                        self._tool_definitions[tool_key] = tool_data
-                    
-                    logger.info(f"MCP服务器 {mcp_server.name} 连接成功，加载了 {len(tools_data)} 个工具")
-                
+            return await asyncio.wait_for(
+                self.fetch_server_tools(mcp_server),
+                timeout=self._connect_timeout(mcp_server)
+            )
+        except asyncio.TimeoutError:
+            self._mark_degraded(mcp_server, "连接超时")
+            raise
+
+    async def _connect_mcp_server(self, mcp_server: MCPServer) -> PooledSession:
+        """连接到MCP服务器（复用会话池中的存活会话）"""
+        try:
+            reused = self.session_pool.get(mcp_server.id) is not None
+            pooled = await self.session_pool.acquire(mcp_server)
+            self._mcp_servers[mcp_server.id] = mcp_server
+
+            if reused:
+                logger.debug(f"MCP服务器 {mcp_server.name} 复用已有会话")
+            else:
+                logger.info(f"MCP服务器 {mcp_server.name} 连接成功，发现 {len(pooled.tools)} 个工具")
+            return pooled
+
         except Exception as e:
             logger.error(f"连接MCP服务器失败: {str(e)}")
             raise
 
-    def get_all_tools(self) -> List[Dict[str, Any]]:
-        """获取所有工具的OpenAI格式定义"""
+    def _register_external_tools(self, mcp_server: MCPServer, tools: List[Dict[str, Any]]):
+        """登记外部工具，执行时据此找到所属服务器"""
+        self._mcp_servers[mcp_server.id] = mcp_server
+        for tool_data in tools:
+            tool_key = f"mcp_{mcp_server.id}_{tool_data.get('name', '')}"
+            self.external_tools[tool_key] = {
+                "mcp_server_id": mcp_server.id,
+                "tool_name": tool_data.get('name', ''),
+                "tool": tool_data
+            }
+
+    async def unload_mcp_server(self, mcp_server_id: int):
+        """卸载MCP服务器的工具并关闭其会话"""
+        for tool_key in [k for k, v in self.external_tools.items() if v["mcp_server_id"] == mcp_server_id]:
+            self.external_tools.pop(tool_key, None)
+        self._mcp_servers.pop(mcp_server_id, None)
+        self._degraded.pop(mcp_server_id, None)
+        self.breakers.remove(f"mcp:{mcp_server_id}")
+        await self.session_pool.release(mcp_server_id)
+
+    async def get_all_tools(self, db: AsyncSession, user_id: int) -> List[Dict[str, Any]]:
+        """获取用户可用工具的OpenAI格式定义
+
+        外部工具从持久化的工具目录读取，不会触发任何 MCP 连接或 tools/list 调用。
+        """
+        from sqlalchemy import select
+        from sqlalchemy.orm import contains_eager
+        from app.models.mcp_server import ServerStatus
+        from app.models.mcp_tool import MCPToolCatalog
+
         tools = []
         
         for tool_name, tool_def in self._tool_definitions.items():
-            tools.append({
-                "type": "function",
-                "function": {
-                    "name": tool_name,
-                    "description": tool_def.get("description", f"{tool_name}工具"),
-                    "parameters": tool_def.get("inputSchema", {
-                        "type": "object",
-                        "properties": {},
-                        "required": []
-                    })
-                }
-            })
+            tools.append(self._to_openai_tool(tool_name, tool_def.get("description"), tool_def.get("inputSchema")))
+
+        result = await db.execute(
+            select(MCPToolCatalog)
+            .join(MCPToolCatalog.server)
+            .options(contains_eager(MCPToolCatalog.server))
+            .where((MCPServer.user_id == user_id) & (MCPServer.status == ServerStatus.ACTIVE))
+            .order_by(MCPToolCatalog.server_id, MCPToolCatalog.tool_name)
+        )
+        for entry in result.scalars().all():
+            if self.is_degraded(entry.server_id):
+                continue
+            tool_key = f"mcp_{entry.server_id}_{entry.tool_name}"
+            self._register_external_tools(entry.server, [{"name": entry.tool_name}])
+            tools.append(self._to_openai_tool(tool_key, entry.description, entry.input_schema))
         
         return tools
 
+    @staticmethod
+    def _to_openai_tool(tool_name: str, description: Optional[str], input_schema: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """转换为OpenAI工具定义格式"""
+        return {
+            "type": "function",
+            "function": {
+                "name": tool_name,
+                "description": description or f"{tool_name}工具",
+                "parameters": input_schema or {
+                    "type": "object",
+                    "properties": {},
+                    "required": []
+                }
+            }
+        }
+
     async def execute_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """执行工具调用"""
         try:
             if tool_name in self.builtin_tools:
-                return await self._execute_builtin_tool(tool_name, arguments)
+                return await self.result_cache.call(
+                    tool_name, arguments,
+                    lambda: self._run_guarded(
+                        f"builtin:{tool_name}", tool_name, self._tool_timeout(tool_name),
+                        lambda: self._execute_builtin_tool(tool_name, arguments)
+                    )
+                )
             elif tool_name in self.external_tools:
-                return await self._execute_external_tool(tool_name, arguments)
+                mcp_server_id = self.external_tools[tool_name]["mcp_server_id"]
+                return await self._run_guarded(
+                    f"mcp:{mcp_server_id}", tool_name, self._tool_timeout(tool_name),
+                    lambda: self._execute_external_tool(tool_name, arguments)
+                )
             else:
                 return {
                     "success": False,
@@ -174,45 +245,82 @@ class ToolManager:
                 "error": f"执行工具失败: {str(e)}"
             }
 
+    def _tool_timeout(self, tool_name: str) -> float:
+        """工具执行时限
+
+        外部工具依次查找 connection_params.tool_timeouts[工具名]、connection_params.tool_timeout，
+        之后与内置工具一样查找 TOOL_TIMEOUTS[工具名]，最后使用 TOOL_TIMEOUT_DEFAULT。
+        """
+        external_tool = self.external_tools.get(tool_name)
+        if external_tool is not None:
+            mcp_server = self._mcp_servers.get(external_tool["mcp_server_id"])
+            params = (mcp_server.connection_params or {}) if mcp_server is not None else {}
+            timeout = (params.get("tool_timeouts") or {}).get(external_tool["tool_name"]) or params.get("tool_timeout")
+            if timeout:
+                return float(timeout)
+        return float(settings.TOOL_TIMEOUTS.get(tool_name) or settings.TOOL_TIMEOUT_DEFAULT)
+
+    async def _run_guarded(
+        self,
+        breaker_name: str,
+        tool_name: str,
+        timeout: float,
+        func: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """在熔断器与执行时限保护下调用工具
+
+        超时会取消执行中的调用，取消会传递到 MCP 会话或 HTTP 请求。
+        异常与超时计为失败；返回 success=False 的结果属于业务错误（如文件不存在），不影响熔断器。
+        """
+        breaker = self.breakers.get(breaker_name)
+        if not breaker.allow():
+            return {
+                "success": False,
+                "error": f"工具 {tool_name} 暂时不可用（熔断中，{breaker.retry_after():.0f} 秒后重试）"
+            }
+
+        try:
+            result = await asyncio.wait_for(func(), timeout=timeout)
+        except asyncio.TimeoutError:
+            breaker.record_failure(f"执行超时（{timeout:g} 秒）")
+            logger.warning(f"工具 {tool_name} 执行超时（{timeout:g} 秒），已取消")
+            return {
+                "success": False,
+                "error": f"工具 {tool_name} 执行超时（{timeout:g} 秒）"
+            }
+        except asyncio.CancelledError:
+            breaker.release_probe()
+            raise
+        except Exception as e:
+            breaker.record_failure(str(e))
+            raise
+
+        if isinstance(result, dict) and result.get("success") is False:
+            breaker.release_probe()
+        else:
+            breaker.record_success()
+        return result
+
     async def _execute_builtin_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
-        """执行内置工具"""
+        """执行内置工具：校验参数后直接调用函数，结果为原生字典"""
         try:
-            tool_mcp = self.builtin_tools[tool_name]
-            
-            result = await tool_mcp.call_tool(tool_name, arguments)
-            
-            if isinstance(result, dict) and "content" in result:
-                content = result["content"]
-                if isinstance(content, list) and len(content) > 0:
-                    content = content[0]
-                    # 处理 TextContent 对象
-                    if hasattr(content, 'text'):
-                        text_value = content.text
-                        # 尝试解析为 JSON，如果不是则直接返回文本
-                        try:
-                            return json.loads(text_value) if isinstance(text_value, str) else text_value
-                        except (json.JSONDecodeError, TypeError):
-                            return {"text": text_value}
-                    if isinstance(content, dict) and "text" in content:
-                        text_value = content["text"]
-                        try:
-                            return json.loads(text_value) if isinstance(text_value, str) else text_value
-                        except (json.JSONDecodeError, TypeError):
-                            return {"text": text_value}
-                    # 如果是其他对象类型，转换为字典
-                    if hasattr(content, '__dict__'):
-                        return {"result": str(content)}
-                    return content
-                return content
-            
+            result = await self.builtin_registry.call(tool_name, arguments)
+        except ToolArgumentError as e:
             return {
-                "success": True,
-                "result": result
+                "success": False,
+                "error": f"工具 {tool_name} 参数错误: {str(e)}"
             }
         except Exception as e:
             logger.error(f"执行内置工具 {tool_name} 失败: {str(e)}")
             raise
 
+        if isinstance(result, dict):
+            return result
+        return {
+            "success": True,
+            "result": result
+        }
+
     async def _execute_external_tool(self, tool_key: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """执行外部MCP工具"""
         try:
@@ -220,86 +328,87 @@ class ToolManager:
             mcp_server_id = external_tool["mcp_server_id"]
             tool_name = external_tool["tool_name"]
             
-            if mcp_server_id not in self._mcp_clients:
-                return {
-                    "success": False,
-                    "error": f"MCP服务器 {mcp_server_id} 未连接"
-                }
-            
-            client_info = self._mcp_clients[mcp_server_id]
-            server = client_info["server"]
+            if self.session_pool.get(mcp_server_id) is None:
+                mcp_server = self._mcp_servers.get(mcp_server_id)
+                if mcp_server is None:
+                    return {
+                        "success": False,
+                        "error": f"MCP服务器 {mcp_server_id} 未连接"
+                    }
+                if self.is_degraded(mcp_server_id):
+                    return {
+                        "success": False,
+                        "error": f"MCP服务器 {mcp_server.name} 暂时不可用（已降级）"
+                    }
+                # 工具列表来自工具目录，会话在首次调用时才建立
+                try:
+                    await asyncio.wait_for(
+                        self._connect_mcp_server(mcp_server),
+                        timeout=self._connect_timeout(mcp_server)
+                    )
+                except asyncio.TimeoutError:
+                    self._mark_degraded(mcp_server, "连接超时")
+                    return {
+                        "success": False,
+                        "error": f"MCP服务器 {mcp_server.name} 连接超时"
+                    }
             
-            if server.server_type == ServerType.STREAMABLE_HTTP:
-                import httpx
-                url = client_info["url"]
-                
-                async with httpx.AsyncClient() as client:
-                    response = await client.post(url, headers={
-                        "Accept": "application/json, text/event-stream"
-                    }, json={
-                        "jsonrpc": "2.0",
-                        "method": "tools/call",
-                        "id": "96d57e63-2",
-                        "params": {
-                            "name": tool_name,
-                            "arguments": arguments
-                        }
-                    })
-                    
-                    if response.status_code != 200:
-                        raise Exception(f"HTTP请求失败，状态码: {response.status_code}")
-                    
-                    data = response.json()
-                    
-                    if "result" not in data:
-                        raise Exception("响应中未找到result字段")
-                    
-                    result = data.get("result", {})
-                    
-                    if isinstance(result, dict) and "content" in result:
-                        content = result["content"]
-                        if isinstance(content, list) and len(content) > 0:
-                            content = content[0]
-                            if isinstance(content, dict) and "text" in content:
-                                return content["text"]
-                            return content
-                        return content
-                    return result
-            else:
-                from mcp import ClientSession
-                session = client_info["client"]
-                
-                result = await session.call_tool(tool_name, arguments)
-                
-                if isinstance(result, dict) and "content" in result:
-                    content = result["content"]
-                    if isinstance(content, list) and len(content) > 0:
-                        content = content[0]
-                        if isinstance(content, dict) and "text" in content:
-                            return content["text"]
-                        return content
-                    return content
-                
-                return {
-                    "success": True,
-                    "result": result
-                }
+            async with self.session_pool.lease(mcp_server_id) as pooled:
+                return await self._call_pooled_tool(pooled, tool_name, arguments)
         except Exception as e:
             logger.error(f"执行外部工具 {tool_key} 失败: {str(e)}")
             raise
 
+    async def _call_pooled_tool(self, pooled: PooledSession, tool_name: str, arguments: Dict[str, Any]) -> Any:
+        """通过池化会话调用外部工具"""
+        if pooled.transport is not None:
+            def on_progress(progress: Dict[str, Any]):
+                pooled.touch()
+                logger.info(
+                    f"[MCP] {pooled.server_name}/{tool_name} 进度: "
+                    f"{progress.get('progress')}/{progress.get('total', '?')}"
+                )
+
+            result = await pooled.transport.call_tool(tool_name, arguments, on_progress=on_progress)
+            
+            if isinstance(result, dict) and "content" in result:
+                content = result["content"]
+                if isinstance(content, list) and len(content) > 0:
+                    content = content[0]
+                    if isinstance(content, dict) and "text" in content:
+                        return content["text"]
+                    return content
+                return content
+            return result
+
+        result = await pooled.call_tool(tool_name, arguments)
+        
+        if isinstance(result, dict) and "content" in result:
+            content = result["content"]
+            if isinstance(content, list) and len(content) > 0:
+                content = content[0]
+                if isinstance(content, dict) and "text" in content:
+                    return content["text"]
+                return content
+            return content
+        
+        return {
+            "success": True,
+            "result": result
+        }
+
+    def start(self):
+        """启动后台任务（会话池空闲回收）"""
+        self.session_pool.start()
+
     async def cleanup(self):
         """清理资源，断开所有MCP连接"""
-        for mcp_server_id, client_info in self._mcp_clients.items():
-            try:
-                context = client_info.get("context")
-                if context and hasattr(context, '__aexit__'):
-                    await context.__aexit__(None, None, None)
-                logger.info(f"已断开MCP服务器 {mcp_server_id} 的连接")
-            except Exception as e:
-                logger.error(f"断开MCP服务器 {mcp_server_id} 连接失败: {str(e)}")
+        try:
+            await self.session_pool.close_all()
+            logger.info("已断开所有MCP服务器连接")
+        except Exception as e:
+            logger.error(f"断开MCP服务器连接失败: {str(e)}")
         
-        self._mcp_clients.clear()
         self.external_tools.clear()
 
 
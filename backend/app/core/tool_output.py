@@ -0,0 +1,393 @@
+# ============================================================================
+# Tool Output Shaping Module
+# ============================================================================
+import json
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from app.core.config import settings
+from app.tools.executor import tool_executor
+
+# 省略标记自身占用的 token 预留
+_MARKER_RESERVE = 24
+# 最多收缩的字段数，避免病态结构导致反复计算
+_MAX_SHRINK_PASSES = 8
+
+_encoding: Any = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    """懒加载 tiktoken 编码器，未安装或加载失败时返回 None（使用估算）"""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(settings.TOOL_OUTPUT_TOKENIZER)
+        except Exception as e:
+            logger.warning(f"tiktoken 不可用，工具输出按估算计数: {str(e)}")
+            _encoding = None
+    return _encoding
+
+
+def load_tokenizer() -> bool:
+    """预加载编码器（首次加载可能需要下载词表，应在启动时放到线程中执行），返回是否可精确计数"""
+    return _get_encoding() is not None
+
+
+_WIDE_CHARS = re.compile("[\u2e80-\U0010ffff]")
+# 二分截断位置时允许的误差（字符数），足够接近后不再继续计数
+_BISECT_TOLERANCE = 32
+
+
+def _estimate_tokens(text: str) -> int:
+    """估算 token 数：CJK 字符约 1 个 token，其余字符约 4 个一 token"""
+    wide = len(_WIDE_CHARS.findall(text))
+    return wide + (len(text) - wide + 3) // 4
+
+
+def count_tokens(text: str) -> int:
+    """计算文本的 token 数"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return _estimate_tokens(text)
+
+
+def _fitting_length(text: str, max_tokens: int, from_end: bool = False) -> int:
+    """不超过 max_tokens 的最长前缀（from_end 时为后缀）的字符数
+
+    从按 4 字符一 token 估计的长度开始倍增，越界后在字符偏移上二分；
+    每次只对候选的前缀 / 后缀计数，不对整段文本编码。
+    """
+    if max_tokens <= 0 or not text:
+        return 0
+
+    def fits(length: int) -> bool:
+        return count_tokens(text[len(text) - length:] if from_end else text[:length]) <= max_tokens
+
+    lo, hi = 0, min(len(text), max_tokens * 4)
+    while fits(hi):
+        if hi == len(text):
+            return hi
+        lo, hi = hi, min(len(text), hi * 2)
+    while hi - lo > _BISECT_TOLERANCE:
+        middle = (lo + hi) // 2
+        if fits(middle):
+            lo = middle
+        else:
+            hi = middle
+    return lo
+
+
+def truncate_middle(text: str, max_tokens: int, total: Optional[int] = None) -> str:
+    """保留开头与结尾，中间替换为省略标记（尽量在行边界截断）
+
+    total 为已知（或估算）的 token 数，不传时计算一次；截断位置只对保留部分计数。
+    """
+    total = count_tokens(text) if total is None else total
+    if total <= max_tokens:
+        return text
+
+    keep = max(max_tokens - _MARKER_RESERVE, 0)
+    head = text[:_fitting_length(text, keep * 2 // 3)]
+    tail_length = _fitting_length(text[len(head):], keep - keep * 2 // 3, from_end=True)
+    tail = text[len(text) - tail_length:] if tail_length else ""
+    if len(head) + len(tail) >= len(text):
+        return text
+
+    newline = head.rfind("\n")
+    if newline > len(head) // 2:
+        head = head[:newline + 1]
+    newline = tail.find("\n")
+    if 0 <= newline < len(tail) // 2:
+        tail = tail[newline + 1:]
+
+    omitted = text[len(head):len(text) - len(tail)]
+    omitted_tokens = max(total - count_tokens(head) - count_tokens(tail), 0)
+    omitted_lines = omitted.count("\n")
+    marker = f"\n...[已省略 {omitted_lines} 行，约 {omitted_tokens} tokens]...\n"
+    return head + marker + tail
+
+
+def _truncate_list(
+    items: List[Any],
+    max_tokens: int,
+    measure: Callable[[str], int] = count_tokens,
+    total: Optional[int] = None
+) -> List[Any]:
+    """保留列表开头与结尾的元素，中间替换为一个省略标记元素
+
+    measure 为元素的 token 计数方式；给出整个列表的 token 数 total 时只计量保留下来的元素，
+    省略部分按差值计算。
+    """
+    costs: Dict[int, int] = {}
+
+    def cost(index: int) -> int:
+        if index not in costs:
+            costs[index] = measure(_dumps(items[index])) + 1
+        return costs[index]
+
+    budget = max(max_tokens - _MARKER_RESERVE, 0)
+    head: List[Any] = []
+    tail: List[Any] = []
+    used = 0
+    lo, hi = 0, len(items) - 1
+    # 开头保留约 2/3 的预算，其余留给结尾
+    while lo <= hi and used + cost(lo) <= budget * 2 // 3:
+        head.append(items[lo])
+        used += cost(lo)
+        lo += 1
+    while hi >= lo and used + cost(hi) <= budget:
+        tail.append(items[hi])
+        used += cost(hi)
+        hi -= 1
+    tail.reverse()
+
+    omitted = hi - lo + 1
+    if omitted <= 0:
+        return items
+    if total is None:
+        omitted_tokens = sum(cost(index) for index in range(lo, hi + 1))
+    else:
+        omitted_tokens = max(total - used, 0)
+    return head + [_list_marker(omitted, omitted_tokens)] + tail
+
+
+def _list_marker(omitted: int, omitted_tokens: int) -> str:
+    return f"...[已省略 {omitted} 项，约 {omitted_tokens} tokens]..."
+
+
+def _to_jsonable(value: Any) -> Any:
+    """转换为可序列化的结构（pydantic 模型、MCP 内容对象等）"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, dict):
+        return {str(k): _to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [_to_jsonable(v) for v in value]
+    if hasattr(value, "model_dump"):
+        try:
+            return _to_jsonable(value.model_dump(exclude_none=True))
+        except Exception:
+            pass
+    return str(value)
+
+
+def _dumps(value: Any) -> str:
+    # 不转义中文，避免 \uXXXX 让 token 数成倍增加
+    return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+
+
+def _drop_fields(value: Any, fields: List[str]) -> Any:
+    """递归删除低价值字段"""
+    if isinstance(value, dict):
+        return {k: _drop_fields(v, fields) for k, v in value.items() if k not in fields}
+    if isinstance(value, list):
+        return [_drop_fields(v, fields) for v in value]
+    return value
+
+
+def _serialized_length(text: str) -> int:
+    """字符串序列化为 JSON 后的大致长度（引号与常见转义），不实际序列化"""
+    return len(text) + 2 + text.count('"') + text.count("\\") + text.count("\n")
+
+
+def _largest_leaf(value: Any, path: Tuple = ()) -> Optional[Tuple[Tuple, int]]:
+    """找到序列化后最长（字符数）的字符串或列表及其路径"""
+    if isinstance(value, str):
+        return path, _serialized_length(value)
+    if isinstance(value, dict):
+        children = value.items()
+    elif isinstance(value, list):
+        children = enumerate(value)
+    else:
+        return None
+
+    inner: Optional[Tuple[Tuple, int]] = None
+    for key, child in children:
+        found = _largest_leaf(child, path + (key,))
+        if found is not None and (inner is None or found[1] > inner[1]):
+            inner = found
+    if isinstance(value, dict):
+        return inner
+
+    # 列表内部某个字符串占了大半时（如单个超长文本块），优先截断该字符串
+    own = (path, len(_dumps(value)))
+    if inner is not None and inner[1] * 2 > own[1]:
+        return inner
+    return own
+
+
+def _replace(value: Any, path: Tuple, new: Any) -> Any:
+    if not path:
+        return new
+    key = path[0]
+    if isinstance(value, dict):
+        copied = dict(value)
+    else:
+        copied = list(value)
+    copied[key] = _replace(value[key], path[1:], new)
+    return copied
+
+
+def _get(value: Any, path: Tuple) -> Any:
+    for key in path:
+        value = value[key]
+    return value
+
+
+def _fit(value: Any, target: int, measure_value: Callable[[Any], int], measure_text: Callable[[str], int]) -> Any:
+    """把单个值压缩到约 target tokens
+
+    measure_value 为值序列化为 JSON 后的 token 数，measure_text 为文本的 token 数。
+    列表中连一个元素都放不下时保留第一个元素并压缩它，而不是丢弃全部元素；
+    对象依次压缩其中最大的字段。
+    """
+    if isinstance(value, str):
+        # 预算按序列化后的大小计算，换算为原始文本（转义会增加长度）
+        raw_target = max(target * len(value) // max(_serialized_length(value), 1), _MARKER_RESERVE)
+        return truncate_middle(value, raw_target, measure_text(value))
+    if isinstance(value, list):
+        total = measure_value(value)
+        shrunk = _truncate_list(value, target, measure_text, total)
+        if not value or len(shrunk) != 1 or shrunk == value:
+            return shrunk
+        first = _fit(value[0], max(target - _MARKER_RESERVE, _MARKER_RESERVE), measure_value, measure_text)
+        if len(value) == 1:
+            return [first]
+        return [first, _list_marker(len(value) - 1, max(total - measure_value(value[0]), 0))]
+    if isinstance(value, dict):
+        cost = measure_value(value)
+        for _ in range(_MAX_SHRINK_PASSES):
+            if cost <= target or not value:
+                break
+            costs = {key: measure_value(child) for key, child in value.items()}
+            key = max(costs, key=costs.get)
+            child_target = max(costs[key] - (cost - target), _MARKER_RESERVE)
+            child = _fit(value[key], child_target, measure_value, measure_text)
+            if child == value[key]:
+                break
+            value = dict(value)
+            value[key] = child
+            cost = measure_value(value)
+        return value
+    return value
+
+
+def _shrink(
+    data: Any,
+    text: str,
+    tokens: int,
+    budget: int,
+    measure_value: Callable[[Any], int],
+    measure_text: Callable[[str], int]
+) -> Tuple[Any, str, int]:
+    """逐个压缩最大的字符串或列表（保留首尾），直到不超过预算，返回 (数据, 文本, token 数)"""
+    passes = 0
+    while tokens > budget and isinstance(data, (dict, list)) and passes < _MAX_SHRINK_PASSES:
+        passes += 1
+        leaf = _largest_leaf(data)
+        if leaf is None:
+            break
+        path = leaf[0]
+        current = _get(data, path)
+        leaf_tokens = measure_value(current)
+        if leaf_tokens <= _MARKER_RESERVE:
+            break
+        target = max(leaf_tokens - (tokens - budget) - _MARKER_RESERVE, _MARKER_RESERVE)
+        shrunk = _fit(current, target, measure_value, measure_text)
+        if shrunk == current:
+            break
+        data = _replace(data, path, shrunk)
+        text = _dumps(data)
+        tokens = measure_text(text)
+    return data, text, tokens
+
+
+class ToolOutputShaper:
+    """工具输出整形器 - 按 token 预算压缩工具结果后再加入消息列表
+
+    每个工具调用有单次预算（TOOL_OUTPUT_TOKEN_BUDGETS / TOOL_OUTPUT_MAX_TOKENS），
+    一次 Agent 运行的所有工具输出共享总预算（TOOL_OUTPUT_RUN_BUDGET）。
+    超出预算时依次：删除低价值字段 → 截断最大的字符串或列表（保留首尾）→ 整体首尾截断，
+    并在结果中注明省略了多少内容。
+    """
+
+    def __init__(self, run_budget: Optional[int] = None):
+        self.run_budget = run_budget or settings.TOOL_OUTPUT_RUN_BUDGET
+        self.remaining = self.run_budget
+        self.omitted_tokens = 0
+
+    def budget_for(self, tool_name: str) -> int:
+        """本次调用可用的 token 预算"""
+        per_tool = settings.TOOL_OUTPUT_TOKEN_BUDGETS.get(tool_name) or settings.TOOL_OUTPUT_MAX_TOKENS
+        return max(min(per_tool, self.remaining), settings.TOOL_OUTPUT_MIN_TOKENS)
+
+    def shape(self, tool_name: str, result: Any) -> str:
+        """整形工具结果，返回加入消息列表的文本
+
+        完整结果只计数一次；压缩过程中按原文的平均每 token 字符数估算大小，
+        只对压缩后的文本重新精确计数。结果可能有数 MB，应通过 shape_async 在工具线程池中执行。
+        """
+        budget = self.budget_for(tool_name)
+        data = _to_jsonable(result)
+        text = _dumps(data)
+        original_tokens = count_tokens(text)
+        if original_tokens <= budget:
+            self.remaining = max(self.remaining - original_tokens, 0)
+            return text
+
+        chars_per_token = len(text) / original_tokens
+
+        def estimate(length: int) -> int:
+            return int(length / chars_per_token) + 1
+
+        def estimate_value(value: Any) -> int:
+            return estimate(_serialized_length(value) if isinstance(value, str) else len(_dumps(value)))
+
+        def count_value(value: Any) -> int:
+            return count_tokens(json.dumps(value, ensure_ascii=False))
+
+        tokens = original_tokens
+        drop_fields = settings.TOOL_OUTPUT_DROP_FIELDS.get(tool_name, [])
+        if drop_fields:
+            data = _drop_fields(data, drop_fields)
+            text = _dumps(data)
+            tokens = estimate(len(text))
+
+        # 先按估算收缩，再加上省略说明后精确计数；仍略超预算时按精确计数再收缩，
+        # 尽量不走整体首尾截断（会截断在字符串中间，结果不再是合法 JSON）
+        data, text, tokens = _shrink(
+            data, text, tokens, budget, estimate_value, lambda value: estimate(len(value))
+        )
+        tokens = count_tokens(text)
+        if tokens < original_tokens and isinstance(data, dict):
+            data = dict(data)
+            data["_omitted"] = (
+                f"工具输出超出预算，已省略约 {original_tokens - tokens} tokens"
+                f"（原始约 {original_tokens} tokens），如需完整内容请缩小读取或搜索范围"
+            )
+            text = _dumps(data)
+            tokens = count_tokens(text)
+        if tokens > budget:
+            data, text, tokens = _shrink(data, text, tokens, budget, count_value, count_tokens)
+
+        if tokens > budget:
+            text = truncate_middle(text, budget, tokens)
+            tokens = count_tokens(text)
+
+        if tokens < original_tokens:
+            logger.info(f"[Agent] 工具 {tool_name} 输出 {original_tokens} tokens，整形后 {tokens} tokens")
+            self.omitted_tokens += original_tokens - tokens
+        self.remaining = max(self.remaining - tokens, 0)
+        return text
+
+    async def shape_async(self, tool_name: str, result: Any) -> str:
+        """在工具线程池中整形，避免大结果的 token 计数阻塞事件循环（同一次运行中应逐个调用）"""
+        return await tool_executor.run(self.shape, tool_name, result)
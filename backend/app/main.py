@@ -4,10 +4,19 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
+import contextlib
 
 from app.core.config import settings
 from app.core.database import init_db
+from app.core.http_client import http_clients
+from app.core.llm_client import llm_clients
 from app.core.tool_manager import tool_manager
+from app.core.tool_output import load_tokenizer
+from app.services.mcp_catalog_service import MCPCatalogService
+from app.tools.executor import tool_executor
+from app.tools.search.parallel import search_pool
+from app.tools.search.trigram import trigram_indexes
 from app.api.v1 import api_router
 
 
@@ -15,9 +24,21 @@ from app.api.v1 import api_router
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
     await init_db()
+    http_clients.start()
+    await asyncio.to_thread(load_tokenizer)
     await tool_manager.load_builtin_tools()
+    tool_manager.start()
+    catalog_refresh_task = asyncio.create_task(MCPCatalogService.run_refresh_loop())
     yield
-    pass
+    catalog_refresh_task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await catalog_refresh_task
+    await tool_manager.cleanup()
+    trigram_indexes.close()
+    await asyncio.to_thread(search_pool.close)
+    await asyncio.to_thread(tool_executor.close)
+    await http_clients.aclose()
+    await llm_clients.aclose()
 
 
 # 创建FastAPI应用
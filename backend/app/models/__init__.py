@@ -1,6 +1,7 @@
 # Models module
 from app.models.user import User
 from app.models.mcp_server import MCPServer, ServerType, ServerStatus
+from app.models.mcp_tool import MCPToolCatalog
 from app.models.llm_config import LLMConfig, Provider
 
-__all__ = ["User", "MCPServer", "ServerType", "ServerStatus", "LLMConfig", "Provider"]
+__all__ = ["User", "MCPServer", "ServerType", "ServerStatus", "MCPToolCatalog", "LLMConfig", "Provider"]
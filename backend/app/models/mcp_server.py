@@ -40,6 +40,7 @@ class MCPServer(Base):
 
     # 关系
     user = relationship("User", back_populates="mcp_servers")
+    tools = relationship("MCPToolCatalog", back_populates="server", cascade="all, delete-orphan", passive_deletes=True)
 
     def __repr__(self):
         return f"<MCPServer(id={self.id}, name='{self.name}', type='{self.server_type}')>"
@@ -0,0 +1,28 @@
+# ============================================================================
+# MCP Tool Catalog Model
+# ============================================================================
+from sqlalchemy import Column, BigInteger, String, Text, JSON, DateTime, func, ForeignKey, UniqueConstraint
+from sqlalchemy.orm import relationship
+from app.core.database import Base
+
+
+class MCPToolCatalog(Base):
+    """MCP工具目录模型 - 持久化外部MCP服务器的工具定义"""
+    __tablename__ = "mcp_tool_catalog"
+    __table_args__ = (
+        UniqueConstraint("server_id", "tool_name", name="uk_server_tool"),
+    )
+
+    id = Column(BigInteger, primary_key=True, index=True, comment="工具目录ID")
+    server_id = Column(BigInteger, ForeignKey("mcp_servers.id", ondelete="CASCADE"), nullable=False, index=True, comment="所属MCP服务器ID")
+    tool_name = Column(String(100), nullable=False, comment="工具名称")
+    description = Column(Text, nullable=True, comment="工具描述")
+    input_schema = Column(JSON, nullable=False, comment="工具参数Schema(JSON格式)")
+    schema_hash = Column(String(64), nullable=False, comment="工具定义哈希值")
+    fetched_at = Column(DateTime, server_default=func.now(), nullable=False, comment="最近拉取时间")
+
+    # 关系
+    server = relationship("MCPServer", back_populates="tools")
+
+    def __repr__(self):
+        return f"<MCPToolCatalog(server_id={self.server_id}, tool='{self.tool_name}')>"
@@ -4,6 +4,7 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete, update
 from typing import List, Optional
+from app.core.llm_client import llm_clients
 from app.models.llm_config import LLMConfig
 
 
@@ -129,6 +130,8 @@ class LLMService:
 
         await db.commit()
         await db.refresh(config)
+        # 地址或密钥可能已变化，下次对话按新配置创建客户端
+        llm_clients.evict_config(config.id)
         return config
 
     @staticmethod
@@ -143,4 +146,6 @@ class LLMService:
             .where((LLMConfig.id == config_id) & (LLMConfig.user_id == user_id))
         )
         await db.commit()
+        if result.rowcount > 0:
+            llm_clients.evict_config(config_id)
         return result.rowcount > 0
@@ -0,0 +1,123 @@
+# ============================================================================
+# MCP Tool Catalog Service Module
+# ============================================================================
+import asyncio
+import hashlib
+import json
+from datetime import datetime
+from typing import List, Dict, Any
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.tool_manager import tool_manager
+from app.models.mcp_server import MCPServer
+from app.models.mcp_tool import MCPToolCatalog
+from loguru import logger
+
+
+def _schema_hash(description: str, input_schema: Dict[str, Any]) -> str:
+    """计算工具定义的哈希值"""
+    raw = json.dumps({"description": description, "inputSchema": input_schema}, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class MCPCatalogService:
+    """MCP工具目录服务类"""
+
+    @staticmethod
+    async def save_server_tools(
+        db: AsyncSession, server_id: int, tools: List[Dict[str, Any]]
+    ) -> List[MCPToolCatalog]:
+        """用最新的工具列表覆盖服务器的工具目录"""
+        result = await db.execute(
+            select(MCPToolCatalog).where(MCPToolCatalog.server_id == server_id)
+        )
+        existing = {entry.tool_name: entry for entry in result.scalars().all()}
+
+        now = datetime.now()
+        seen = set()
+        for tool in tools:
+            tool_name = tool.get("name")
+            if not tool_name or tool_name in seen:
+                continue
+            seen.add(tool_name)
+
+            description = tool.get("description") or ""
+            input_schema = tool.get("inputSchema") or {"type": "object", "properties": {}, "required": []}
+            schema_hash = _schema_hash(description, input_schema)
+
+            entry = existing.get(tool_name)
+            if entry is None:
+                db.add(MCPToolCatalog(
+                    server_id=server_id,
+                    tool_name=tool_name,
+                    description=description,
+                    input_schema=input_schema,
+                    schema_hash=schema_hash,
+                    fetched_at=now,
+                ))
+                continue
+
+            if entry.schema_hash != schema_hash:
+                entry.description = description
+                entry.input_schema = input_schema
+                entry.schema_hash = schema_hash
+            entry.fetched_at = now
+
+        stale = [name for name in existing if name not in seen]
+        if stale:
+            await db.execute(
+                delete(MCPToolCatalog).where(
+                    (MCPToolCatalog.server_id == server_id) & (MCPToolCatalog.tool_name.in_(stale))
+                )
+            )
+
+        await db.commit()
+        result = await db.execute(
+            select(MCPToolCatalog)
+            .where(MCPToolCatalog.server_id == server_id)
+            .order_by(MCPToolCatalog.tool_name)
+        )
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def get_server_tools(db: AsyncSession, server_id: int) -> List[MCPToolCatalog]:
+        """获取服务器的工具目录"""
+        result = await db.execute(
+            select(MCPToolCatalog)
+            .where(MCPToolCatalog.server_id == server_id)
+            .order_by(MCPToolCatalog.tool_name)
+        )
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def refresh_server_catalog(db: AsyncSession, server: MCPServer) -> List[MCPToolCatalog]:
+        """连接服务器拉取工具列表并写入工具目录，连接超时则标记服务器为降级并抛出 asyncio.TimeoutError"""
+        tools = await tool_manager.fetch_server_tools_with_timeout(server)
+        return await MCPCatalogService.save_server_tools(db, server.id, tools)
+
+    @staticmethod
+    async def refresh_all_catalogs() -> int:
+        """刷新所有启用服务器的工具目录，返回刷新成功的服务器数量"""
+        async with AsyncSessionLocal() as db:
+            fetched = await tool_manager.load_external_mcp_tools(db)
+            for server_id, tools in fetched.items():
+                try:
+                    await MCPCatalogService.save_server_tools(db, server_id, tools)
+                except Exception as e:
+                    await db.rollback()
+                    logger.error(f"保存MCP服务器 {server_id} 工具目录失败: {str(e)}")
+            return len(fetched)
+
+    @staticmethod
+    async def run_refresh_loop(interval: int = 0):
+        """后台刷新工具目录：启动时先刷新一次（同时预热 STDIO 工作进程），之后按固定间隔刷新"""
+        interval = interval or settings.MCP_CATALOG_REFRESH_INTERVAL
+        while True:
+            try:
+                refreshed = await MCPCatalogService.refresh_all_catalogs()
+                logger.info(f"MCP工具目录刷新完成，共 {refreshed} 个服务器")
+            except Exception as e:
+                logger.error(f"MCP工具目录刷新失败: {str(e)}")
+            await asyncio.sleep(interval)
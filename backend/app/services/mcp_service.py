@@ -6,7 +6,9 @@ import asyncio
 from typing import List, Optional, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete
+from app.core.mcp_http_transport import StreamableHTTPTransport, is_legacy_sse_url
 from app.models.mcp_server import MCPServer, ServerType, ServerStatus
+from app.services.mcp_catalog_service import MCPCatalogService
 from loguru import logger
 
 
@@ -34,6 +36,7 @@ class MCPService:
         db.add(mcp_server)
         await db.commit()
         await db.refresh(mcp_server)
+        await MCPService.sync_tool_catalog(db, mcp_server)
         return mcp_server
 
     @staticmethod
@@ -68,6 +71,10 @@ class MCPService:
         status: Optional[ServerStatus] = None,
     ) -> MCPServer:
         """更新MCP服务器配置"""
+        needs_sync = (
+            (connection_params is not None and connection_params != server.connection_params)
+            or (status == ServerStatus.ACTIVE and server.status != ServerStatus.ACTIVE)
+        )
         if name is not None:
             server.name = name
         if description is not None:
@@ -78,8 +85,40 @@ class MCPService:
             server.status = status
         await db.commit()
         await db.refresh(server)
+        if needs_sync and server.status == ServerStatus.ACTIVE:
+            await MCPService.sync_tool_catalog(db, server)
         return server
 
+    @staticmethod
+    async def sync_tool_catalog(db: AsyncSession, server: MCPServer) -> bool:
+        """拉取服务器工具列表写入工具目录，失败时仅记录日志"""
+        try:
+            await MCPCatalogService.refresh_server_catalog(db, server)
+            return True
+        except asyncio.TimeoutError:
+            await db.rollback()
+            logger.error(f"同步MCP服务器 {server.name} 工具目录超时，冷却期后由后台刷新重试")
+            return False
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"同步MCP服务器 {server.name} 工具目录失败: {str(e)}")
+            return False
+
+    @staticmethod
+    async def test_mcp_server(db: AsyncSession, server: MCPServer) -> dict:
+        """测试MCP服务器连接，成功时同时更新工具目录"""
+        test_result = await MCPService.test_mcp_connection(
+            connection_params=server.connection_params,
+            server_type=server.server_type
+        )
+        if test_result.get("success"):
+            try:
+                await MCPCatalogService.save_server_tools(db, server.id, test_result.get("tools", []))
+            except Exception as e:
+                await db.rollback()
+                logger.error(f"保存MCP服务器 {server.name} 工具目录失败: {str(e)}")
+        return test_result
+
     @staticmethod
     async def delete_mcp_server(db: AsyncSession, server_id: int, user_id: int) -> bool:
         """删除MCP服务器配置"""
@@ -119,10 +158,13 @@ class MCPService:
     async def _test_stdio_connection(connection_params: dict) -> dict:
         """测试STDIO类型的MCP服务器连接"""
         try:
-            from mcp import ClientSession
+            from mcp import ClientSession, StdioServerParameters
             from mcp.client.stdio import stdio_client
 
             command = connection_params.get("command")
+            args = list(connection_params.get("args", []))
+            if isinstance(command, list) and command:
+                command, args = command[0], list(command[1:]) + args
             if not command:
                 return {
                     "success": False,
@@ -130,12 +172,11 @@ class MCPService:
                     "tools_found": 0,
                 }
 
-            args = connection_params.get("args", [])
-            env = connection_params.get("env", {})
-
-            async with stdio_client(command, args, env) as (read_stream, write_stream):
-                session = ClientSession(read_stream, write_stream)
+            env = connection_params.get("env") or None
 
+            params = StdioServerParameters(command=command, args=args, env=env)
+            async with stdio_client(params) as (read_stream, write_stream), \
+                    ClientSession(read_stream, write_stream) as session:
                 await session.initialize()
 
                 tools = await session.list_tools()
@@ -144,14 +185,9 @@ class MCPService:
                     "success": True,
                     "message": f"MCP STDIO服务器连接成功，找到 {len(tools.tools)} 个工具",
                     "tools_found": len(tools.tools),
-                    "tools": [
-                        {"name": tool.name, "description": tool.description}
-                        for tool in tools.tools
-                    ],
+                    "tools": [tool.model_dump() for tool in tools.tools],
                 }
 
-                await session.close()
-
                 return result
         except Exception as e:
             logger.error(f"STDIO连接测试失败: {str(e)}")
@@ -165,8 +201,6 @@ class MCPService:
     async def _test_streamable_http_connection(connection_params: dict) -> dict:
         """测试STREAMABLE_HTTP类型的MCP服务器连接"""
         try:
-            import httpx
-            
             url = connection_params.get("url")
             if not url:
                 return {
@@ -175,46 +209,17 @@ class MCPService:
                     "tools_found": 0,
                 }
 
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url,headers={
-                                                        "Accept": "application/json, text/event-stream"
-                                                    }, json={
-                                                        "jsonrpc": "2.0",
-                                                        "method": "tools/list",
-                                                        "id": "96d57e63-2"
-                                                    })                                   
-                
-                if response.status_code != 200:
-                    return {
-                        "success": False,
-                        "message": f"HTTP请求失败，状态码: {response.status_code}",
-                        "tools_found": 0,
-                    }
-                
-                try:
-                    data = response.json()
-                except Exception:
-                    return {
-                        "success": False,
-                        "message": "响应不是有效的JSON格式",
-                        "tools_found": 0,
-                    }
-                
-                if "result" not in data or "tools" not in data.get("result", {}):
-                    return {
-                        "success": False,
-                        "message": "响应中未找到tools字段",
-                        "tools_found": 0,
-                    }
-                
-                tools = data.get("result", {}).get("tools", [])
+            if is_legacy_sse_url(connection_params):
+                return await MCPService._test_sse_connection(connection_params)
 
-                return {
-                    "success": True,
-                    "message": f"MCP STREAMABLE_HTTP服务器连接成功，找到 {len(tools)} 个工具",
-                    "tools_found": len(tools),
-                    "tools": tools,
-                }
+            tools = await StreamableHTTPTransport(url, connection_params.get("headers")).list_tools()
+
+            return {
+                "success": True,
+                "message": f"MCP STREAMABLE_HTTP服务器连接成功，找到 {len(tools)} 个工具",
+                "tools_found": len(tools),
+                "tools": tools,
+            }
         except Exception as e:
             logger.error(f"STREAMABLE_HTTP连接测试失败: {str(e)}")
             return {
@@ -222,3 +227,22 @@ class MCPService:
                 "message": f"STREAMABLE_HTTP连接测试失败: {str(e)}",
                 "tools_found": 0,
             }
+
+    @staticmethod
+    async def _test_sse_connection(connection_params: dict) -> dict:
+        """测试旧版 HTTP+SSE 传输的MCP服务器连接"""
+        from mcp import ClientSession
+        from mcp.client.sse import sse_client
+
+        async with sse_client(connection_params["url"], headers=connection_params.get("headers")) as (read_stream, write_stream), \
+                ClientSession(read_stream, write_stream) as session:
+            await session.initialize()
+
+            tools = await session.list_tools()
+
+            return {
+                "success": True,
+                "message": f"MCP SSE服务器连接成功，找到 {len(tools.tools)} 个工具",
+                "tools_found": len(tools.tools),
+                "tools": [tool.model_dump() for tool in tools.tools],
+            }
@@ -3,25 +3,43 @@ from typing import Optional
 
 from fastmcp import FastMCP
 
+from app.tools.executor import tool_executor
+from app.tools.line_index import read_window
+
 mcp = FastMCP("file_read")
 
 
 @mcp.tool()
-async def file_read(file_path: str, encoding: Optional[str] = "utf-8") -> dict:
+async def file_read(
+    file_path: str,
+    encoding: Optional[str] = "utf-8",
+    start_line: Optional[int] = None,
+    end_line: Optional[int] = None,
+    offset: Optional[int] = None,
+    length: Optional[int] = None
+) -> dict:
     """
-    读取文件内容
+    读取文件内容，支持按行或按字节范围读取大文件的一部分
 
     Args:
         file_path: 文件路径（绝对路径或相对路径）
         encoding: 文件编码，默认为utf-8
+        start_line: 起始行号（从 1 开始，含），与 end_line 配合按行读取
+        end_line: 结束行号（含），不指定时读到文件末尾
+        offset: 起始字节偏移，未指定行号时按字节范围读取
+        length: 读取的字节数，不指定时读到文件末尾
 
     Returns:
         dict: 包含操作结果的字典
             - success: 是否成功
             - message: 操作消息
             - file_path: 文件路径
-            - content: 文件内容
+            - content: 文件内容（超过单次读取上限时按行截断）
             - size: 文件大小（字节）
+            - total_lines: 文件总行数
+            - start_line / end_line: 本次返回内容的行范围
+            - offset / length: 本次返回内容的字节范围
+            - truncated: 内容是否因超过单次读取上限被截断
     """
     try:
         path = Path(file_path)
@@ -44,15 +62,29 @@ async def file_read(file_path: str, encoding: Optional[str] = "utf-8") -> dict:
                 "size": 0
             }
         
-        content = path.read_text(encoding=encoding)
-        size = path.stat().st_size
+        window = await tool_executor.run(
+            read_window, str(path), encoding or "utf-8", offset, length, start_line, end_line
+        )
+        
+        message = f"文件已成功读取: {file_path}"
+        if window.truncated:
+            message = (
+                f"文件内容超过单次读取上限，已返回第 {window.start_line}-{window.end_line} 行"
+                f"（共 {window.total_lines} 行），可用 start_line/end_line 继续读取"
+            )
         
         return {
             "success": True,
-            "message": f"文件已成功读取: {file_path}",
+            "message": message,
             "file_path": str(path.absolute()),
-            "content": content,
-            "size": size
+            "content": window.content,
+            "size": window.size,
+            "total_lines": window.total_lines,
+            "start_line": window.start_line,
+            "end_line": window.end_line,
+            "offset": window.offset,
+            "length": window.length,
+            "truncated": window.truncated
         }
     except PermissionError:
         return {
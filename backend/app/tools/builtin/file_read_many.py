@@ -0,0 +1,200 @@
+import asyncio
+import codecs
+from pathlib import Path
+from typing import List, Optional, Union
+
+import aiofiles
+import aiofiles.os
+from fastmcp import FastMCP
+from pydantic import BaseModel, Field
+
+from app.core.config import settings
+
+mcp = FastMCP("file_read_many")
+
+# 逐块读取文件时每次读取的字节数
+_CHUNK_SIZE = 64 * 1024
+
+
+class FileReadRequest(BaseModel):
+    """单个文件的读取请求"""
+    path: str = Field(description="文件路径（绝对路径或相对路径）")
+    start_line: Optional[int] = Field(default=None, description="起始行号（从 1 开始，含）")
+    end_line: Optional[int] = Field(default=None, description="结束行号（含），不指定时读到文件末尾")
+
+
+def _decode(data: bytes, encoding: str, final: bool) -> str:
+    """解码读取到的字节；未读到文件末尾时丢弃末尾不完整的多字节字符"""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    return decoder.decode(data, final=final)
+
+
+async def _read_lines(f, start_line: int, end_line: Optional[int], limit: int):
+    """逐块读取，只保留 [start_line, end_line] 行，最多 limit 字节；返回 (字节, 结束行号, 是否截断, 是否读到末尾)"""
+    line = 1
+    kept = bytearray()
+    while True:
+        chunk = await f.read(_CHUNK_SIZE)
+        if not chunk:
+            if not kept:
+                return b"", start_line - 1, False, True
+            return bytes(kept), line if not kept.endswith(b"\n") else line - 1, False, True
+        position = 0
+        while position < len(chunk):
+            newline = chunk.find(b"\n", position)
+            piece_end = len(chunk) if newline < 0 else newline + 1
+            if line >= start_line:
+                if len(kept) + piece_end - position > limit:
+                    kept += chunk[position:position + limit - len(kept)]
+                    cut = kept.rfind(b"\n")
+                    if cut >= 0:
+                        del kept[cut + 1:]
+                        return bytes(kept), line - 1, True, False
+                    return bytes(kept), line, True, False
+                kept += chunk[position:piece_end]
+            if newline < 0:
+                break
+            if end_line is not None and line >= end_line:
+                return bytes(kept), line, False, False
+            line += 1
+            position = piece_end
+
+
+async def _read_one(request: FileReadRequest, encoding: str, limit: int) -> dict:
+    """读取单个文件，内容不超过 limit 字节"""
+    path = Path(request.path)
+    result = {
+        "file_path": request.path,
+        "success": False,
+        "content": "",
+        "size": 0,
+    }
+    try:
+        if not await aiofiles.os.path.exists(path):
+            result["message"] = f"文件不存在: {request.path}"
+            return result
+        if not await aiofiles.os.path.isfile(path):
+            result["message"] = f"路径不是文件: {request.path}"
+            return result
+
+        result["file_path"] = str(path.absolute())
+        async with aiofiles.open(path, "rb") as f:
+            result["size"] = (await aiofiles.os.stat(path)).st_size
+            if request.start_line is not None or request.end_line is not None:
+                start_line = max(request.start_line or 1, 1)
+                data, end_line, truncated, at_eof = await _read_lines(f, start_line, request.end_line, limit)
+                result["start_line"] = start_line
+                result["end_line"] = end_line
+            else:
+                data = await f.read(limit + 1)
+                truncated = len(data) > limit
+                if truncated:
+                    data = data[:limit]
+                    cut = data.rfind(b"\n")
+                    if cut >= 0:
+                        data = data[:cut + 1]
+                at_eof = not truncated
+
+        result["content"] = _decode(data, encoding, final=at_eof)
+        result["truncated"] = truncated
+        result["success"] = True
+    except PermissionError:
+        result["message"] = f"权限不足，无法读取文件: {request.path}"
+    except UnicodeDecodeError:
+        result["message"] = f"文件编码错误，无法解码: {request.path}"
+    except Exception as e:
+        result["message"] = f"读取文件失败: {str(e)}"
+    return result
+
+
+def _fit(result: dict, encoding: str, remaining: int) -> int:
+    """按共享预算裁剪单个文件的内容（在行边界截断），返回占用的字节数"""
+    if not result["success"]:
+        return 0
+    data = result["content"].encode(encoding)
+    if len(data) <= remaining:
+        return len(data)
+    data = data[:max(remaining, 0)]
+    cut = data.rfind(b"\n")
+    if cut >= 0:
+        data = data[:cut + 1]
+    result["content"] = _decode(data, encoding, final=False)
+    result["truncated"] = True
+    if "end_line" in result:
+        content = result["content"]
+        lines = content.count("\n") + (1 if content and not content.endswith("\n") else 0)
+        result["end_line"] = result["start_line"] + lines - 1
+    return len(data)
+
+
+@mcp.tool()
+async def file_read_many(
+    files: List[Union[str, FileReadRequest]],
+    encoding: Optional[str] = "utf-8",
+    max_total_bytes: Optional[int] = None
+) -> dict:
+    """
+    一次读取多个文件（并发读取），可为每个文件指定行范围
+
+    Args:
+        files: 文件列表，每项为文件路径，或 {"path": 路径, "start_line": 起始行, "end_line": 结束行}
+        encoding: 文件编码，默认为utf-8
+        max_total_bytes: 所有文件共享的读取字节上限，按列表顺序分配，默认为 FILE_READ_MANY_MAX_BYTES
+
+    Returns:
+        dict: 包含操作结果的字典
+            - success: 是否成功
+            - message: 操作消息
+            - results: 每个文件的读取结果（与 files 顺序一致）
+                - file_path: 文件路径
+                - success: 是否读取成功
+                - message: 失败原因（仅失败时返回）
+                - content: 文件内容
+                - size: 文件大小（字节）
+                - start_line / end_line: 返回内容的行范围（仅按行读取时返回）
+                - truncated: 内容是否因超过预算被截断
+            - total_bytes: 返回内容的总字节数
+    """
+    try:
+        if not files:
+            return {"success": False, "message": "文件列表为空", "results": [], "total_bytes": 0}
+        if len(files) > settings.FILE_READ_MANY_MAX_FILES:
+            return {
+                "success": False,
+                "message": f"一次最多读取 {settings.FILE_READ_MANY_MAX_FILES} 个文件",
+                "results": [],
+                "total_bytes": 0
+            }
+
+        encoding = encoding or "utf-8"
+        budget = max_total_bytes or settings.FILE_READ_MANY_MAX_BYTES
+        specs = [FileReadRequest(path=item) if isinstance(item, str) else item for item in files]
+
+        # 并发读取，每个文件最多读取整个预算；再按列表顺序分配共享预算
+        results = await asyncio.gather(*(_read_one(spec, encoding, budget) for spec in specs))
+        remaining = budget
+        for result in results:
+            remaining -= _fit(result, encoding, remaining)
+
+        succeeded = sum(1 for result in results if result["success"])
+        truncated = sum(1 for result in results if result.get("truncated"))
+        message = f"已读取 {succeeded}/{len(results)} 个文件"
+        if truncated:
+            message += f"，其中 {truncated} 个文件超出预算被截断，可按行范围分批读取"
+        return {
+            "success": succeeded > 0,
+            "message": message,
+            "results": results,
+            "total_bytes": budget - remaining
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"读取文件失败: {str(e)}",
+            "results": [],
+            "total_bytes": 0
+        }
+
+
+if __name__ == "__main__":
+    mcp.run()
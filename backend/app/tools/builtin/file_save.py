@@ -1,21 +1,92 @@
-import os
 from pathlib import Path
-from typing import Optional
+from typing import List, Literal, Optional
 
 from fastmcp import FastMCP
+from pydantic import BaseModel, Field
+
+from app.tools.executor import tool_executor
+from app.tools.file_edit import PatchError, apply_edits, apply_unified_diff, atomic_write, content_hash
+from app.tools.search.trigram import trigram_indexes
 
 mcp = FastMCP("file_save")
 
 
+class TextEdit(BaseModel):
+    """一处查找替换"""
+    search: str = Field(description="要替换的原文（需与文件内容完全一致，包括缩进）")
+    replace: str = Field(description="替换后的内容")
+    replace_all: bool = Field(default=False, description="替换所有出现的位置；为 false 时 search 必须在文件中唯一")
+
+
+def _save(
+    path: Path,
+    mode: str,
+    text: Optional[str],
+    diff: Optional[str],
+    edits: Optional[List[TextEdit]],
+    encoding: str,
+    expected_sha256: Optional[str],
+) -> dict:
+    """同步计算新内容并原子写入，返回大小、哈希与应用的修改数"""
+    exists = path.is_file()
+    if mode == "overwrite":
+        original = None
+    elif exists:
+        original = path.read_bytes()
+    elif mode == "replace":
+        raise PatchError(f"文件不存在，无法替换内容: {path}")
+    else:
+        original = b""
+
+    if expected_sha256 and exists:
+        current = original if original is not None else path.read_bytes()
+        if content_hash(current) != expected_sha256.lower():
+            raise PatchError("文件内容已被修改（sha256 与 expected_sha256 不一致），请重新读取后再修改")
+
+    applied = 1
+    if mode == "overwrite":
+        data = text.encode(encoding)
+    elif mode == "append":
+        data = original + text.encode(encoding)
+    elif mode == "patch":
+        content, applied = apply_unified_diff(original.decode(encoding), diff)
+        data = content.encode(encoding)
+    else:
+        content, applied = apply_edits(
+            original.decode(encoding), [(edit.search, edit.replace, edit.replace_all) for edit in edits]
+        )
+        data = content.encode(encoding)
+
+    atomic_write(str(path), data)
+    trigram_indexes.mark_changed(str(path))
+    return {"size": len(data), "sha256": content_hash(data), "applied": applied}
+
+
 @mcp.tool()
-async def file_save(filepath: str, text: str, file_encoding: Optional[str] = "utf-8") -> dict:
+async def file_save(
+    filepath: str,
+    text: Optional[str] = None,
+    file_encoding: Optional[str] = "utf-8",
+    mode: Literal["overwrite", "append", "patch", "replace"] = "overwrite",
+    diff: Optional[str] = None,
+    edits: Optional[List[TextEdit]] = None,
+    expected_sha256: Optional[str] = None
+) -> dict:
     """
-    保存内容到文件
+    保存内容到文件，支持整体覆盖、追加、统一 diff 补丁和查找替换；修改已有文件时优先使用 patch 或 replace
 
     Args:
         filepath: 文件路径（绝对路径或相对路径）
-        text: 要保存的文本内容
+        text: 要保存的文本内容（overwrite / append 模式）
         file_encoding: 文件编码，默认为utf-8
+        mode: 写入方式
+            - overwrite: 用 text 覆盖整个文件（默认）
+            - append: 把 text 追加到文件末尾
+            - patch: 应用 diff 中的统一 diff（@@ -起始行,行数 +起始行,行数 @@ 格式，带上下文行）
+            - replace: 按顺序应用 edits 中的查找替换
+        diff: 统一 diff 文本（patch 模式）
+        edits: 查找替换列表，每项为 {"search": 原文, "replace": 新内容, "replace_all": 是否全部替换}（replace 模式）
+        expected_sha256: 期望的文件当前内容哈希（上次保存返回的 sha256），不一致时拒绝写入
 
     Returns:
         dict: 包含操作结果的字典
@@ -23,23 +94,44 @@ async def file_save(filepath: str, text: str, file_encoding: Optional[str] = "ut
             - message: 操作消息
             - file_path: 文件路径
             - size: 文件大小（字节）
+            - sha256: 写入后文件内容的 sha256
     """
     try:
         path = Path(filepath)
-        
-        parent_dir = path.parent
-        if not parent_dir.exists():
-            parent_dir.mkdir(parents=True, exist_ok=True)
-        
-        path.write_text(text, encoding=file_encoding)
-        
-        size = path.stat().st_size
-        
+
+        if mode in ("overwrite", "append") and text is None:
+            raise PatchError(f"{mode} 模式需要提供 text")
+        if mode == "patch" and not diff:
+            raise PatchError("patch 模式需要提供 diff")
+        if mode == "replace" and not edits:
+            raise PatchError("replace 模式需要提供 edits")
+
+        # 先写临时文件再替换，写入失败或补丁无法应用时原文件保持不变
+        saved = await tool_executor.run(
+            _save, path, mode, text, diff, edits, file_encoding or "utf-8", expected_sha256
+        )
+
+        message = f"文件已成功保存到 {filepath}"
+        if mode == "append":
+            message = f"内容已追加到 {filepath}"
+        elif mode == "patch":
+            message = f"已应用 {saved['applied']} 个 hunk: {filepath}"
+        elif mode == "replace":
+            message = f"已完成 {saved['applied']} 处替换: {filepath}"
+
         return {
             "success": True,
-            "message": f"文件已成功保存到 {filepath}",
+            "message": message,
             "file_path": str(path.absolute()),
-            "size": size
+            "size": saved["size"],
+            "sha256": saved["sha256"]
+        }
+    except PatchError as e:
+        return {
+            "success": False,
+            "message": str(e),
+            "file_path": filepath,
+            "size": 0
         }
     except PermissionError:
         return {
@@ -48,6 +140,13 @@ async def file_save(filepath: str, text: str, file_encoding: Optional[str] = "ut
             "file_path": filepath,
             "size": 0
         }
+    except UnicodeDecodeError:
+        return {
+            "success": False,
+            "message": f"文件编码错误，无法按 {file_encoding} 解码: {filepath}",
+            "file_path": filepath,
+            "size": 0
+        }
     except Exception as e:
         return {
             "success": False,
@@ -1,29 +1,113 @@
-import re
+import os
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
 from fastmcp import FastMCP
 
+from app.tools.cursor import cursors
+from app.tools.executor import tool_executor
+from app.tools.search.parallel import search_pool
+from app.tools.search.trigram import regex_trigram_query, trigram_indexes
+from app.tools.search.walker import IgnoreFilter, walk_files, walk_order_key
+
 mcp = FastMCP("file_search")
 
 
+def _files_to_search(
+    dir_path: Path,
+    pattern: Union[str, List[str]],
+    file_pattern: Optional[str],
+    case_sensitive: bool,
+    resume_from: Optional[str] = None,
+) -> Iterator[str]:
+    """确定需要扫描的文件（惰性产出绝对路径）
+
+    索引就绪且正则包含可用字面量时只扫描候选文件，否则遍历目录；两种方式都遵守忽略规则，
+    并按相同的遍历顺序产出，续页时从 resume_from（含）开始。
+    """
+    root = str(dir_path.absolute())
+    ignore = IgnoreFilter(root)
+    index = trigram_indexes.get(root)
+    query = regex_trigram_query(pattern, ignore_case=not case_sensitive) if index is not None else None
+    if index is not None and query is not None:
+        index.sync()
+        candidates = sorted(index.candidates(query), key=walk_order_key)
+        if resume_from:
+            resume_key = walk_order_key(resume_from)
+            candidates = [rel_path for rel_path in candidates if walk_order_key(rel_path) >= resume_key]
+        # 索引中可能残留忽略规则变更前登记的文件
+        rel_paths = (rel_path for rel_path in candidates if not ignore.is_ignored(rel_path))
+    else:
+        rel_paths = (rel_path for rel_path, _ in walk_files(root, ignore=ignore, resume_from=resume_from))
+
+    for rel_path in rel_paths:
+        if file_pattern and not Path(rel_path).match(file_pattern):
+            continue
+        yield os.path.join(root, rel_path)
+
+
+def _search(
+    dir_path: Path,
+    pattern: Union[str, List[str]],
+    file_pattern: Optional[str],
+    case_sensitive: bool,
+    max_results: int,
+    state: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """遍历并并行扫描文件，按遍历顺序汇总命中（在线程中执行，不阻塞事件循环）
+
+    返回 (本页结果, 续页状态)。多取一个命中来判断是否还有下一页；续页状态记录
+    本页最后一个命中所在的文件与字节偏移，以及累计返回的命中数。
+    """
+    if max_results <= 0:
+        return [], None
+    root = str(dir_path.absolute())
+    resume = None
+    if state:
+        resume = (os.path.join(root, state["path"]), state["offset"])
+    files_to_search = _files_to_search(
+        dir_path, pattern, file_pattern, case_sensitive, state["path"] if state else None
+    )
+    results = []
+    last: Optional[Tuple[str, int]] = None
+    for file_path, hits in search_pool.search(files_to_search, pattern, case_sensitive, max_results + 1, resume):
+        for hit in hits:
+            if len(results) >= max_results:
+                matches = (state["matches"] if state else 0) + len(results)
+                return results, {"path": last[0], "offset": last[1], "matches": matches}
+            result = {
+                "file_path": os.path.relpath(file_path, root),
+                "absolute_path": file_path,
+                "line_number": hit.line_number,
+                "line_content": hit.line_content,
+                "match": hit.match
+            }
+            if hit.pattern is not None:
+                result["pattern"] = hit.pattern
+            results.append(result)
+            last = (result["file_path"], hit.offset)
+    return results, None
+
+
 @mcp.tool()
 async def file_search(
     directory: str,
-    pattern: str,
+    pattern: Union[str, List[str]],
     file_pattern: Optional[str] = None,
     case_sensitive: Optional[bool] = False,
-    max_results: Optional[int] = 100
+    max_results: Optional[int] = 100,
+    cursor: Optional[str] = None
 ) -> dict:
     """
     在目录中搜索文件内容
 
     Args:
         directory: 搜索目录（绝对路径或相对路径）
-        pattern: 搜索模式（支持正则表达式）
+        pattern: 搜索模式（支持正则表达式）；传入列表时一次扫描同时搜索多个模式
         file_pattern: 文件名过滤模式（支持通配符，如 *.py, *.txt）
         case_sensitive: 是否区分大小写，默认为False
-        max_results: 最大返回结果数，默认为100
+        max_results: 最大返回结果数（每页），默认为100
+        cursor: 上一次搜索返回的 next_cursor，用于获取下一页（其余参数需保持不变）
 
     Returns:
         dict: 包含搜索结果的字典
@@ -36,7 +120,9 @@ async def file_search(
                 - line_number: 行号
                 - line_content: 行内容
                 - match: 匹配内容
-            - total_matches: 总匹配数
+                - pattern: 命中的模式（仅 pattern 为列表时返回）
+            - total_matches: 本页匹配数
+            - next_cursor: 还有更多结果时返回，传入 cursor 参数继续搜索；没有更多结果时为 None
     """
     try:
         dir_path = Path(directory)
@@ -61,54 +147,36 @@ async def file_search(
                 "total_matches": 0
             }
         
-        flags = 0 if case_sensitive else re.IGNORECASE
-        regex = re.compile(pattern, flags)
-        
-        results = []
-        total_matches = 0
+        # 续页时除 cursor 与 max_results 外的参数必须与首次搜索一致
+        query = {
+            "directory": str(dir_path.absolute()),
+            "pattern": pattern,
+            "file_pattern": file_pattern,
+            "case_sensitive": bool(case_sensitive)
+        }
+        state = cursors.resume(cursor, "file_search", query) if cursor else None
         
-        files_to_search = []
-        if file_pattern:
-            files_to_search = list(dir_path.rglob(file_pattern))
-        else:
-            files_to_search = list(dir_path.rglob("*"))
+        results, next_state = await tool_executor.run(
+            _search, dir_path, pattern, file_pattern, bool(case_sensitive), max_results, state
+        )
+        total_matches = len(results)
+        next_cursor = cursors.issue("file_search", query, next_state) if next_state else None
         
-        for file_path in files_to_search:
-            if not file_path.is_file():
-                continue
-            
-            try:
-                content = file_path.read_text(encoding="utf-8", errors="ignore")
-                lines = content.split("\n")
-                
-                for line_number, line in enumerate(lines, 1):
-                    matches = regex.findall(line)
-                    if matches:
-                        for match in matches:
-                            if total_matches >= max_results:
-                                break
-                            
-                            results.append({
-                                "file_path": str(file_path.relative_to(dir_path)),
-                                "absolute_path": str(file_path.absolute()),
-                                "line_number": line_number,
-                                "line_content": line.strip(),
-                                "match": match
-                            })
-                            total_matches += 1
-                
-                if total_matches >= max_results:
-                    break
-            except Exception:
-                continue
+        message = f"搜索完成，找到 {total_matches} 个匹配"
+        if next_cursor:
+            message = (
+                f"搜索完成，本页返回 {total_matches} 个匹配（累计 {next_state['matches']} 个），"
+                f"还有更多结果，传入 cursor=\"{next_cursor}\" 可继续获取"
+            )
         
         return {
             "success": True,
-            "message": f"搜索完成，找到 {total_matches} 个匹配",
+            "message": message,
             "directory": str(dir_path.absolute()),
             "pattern": pattern,
             "results": results,
-            "total_matches": total_matches
+            "total_matches": total_matches,
+            "next_cursor": next_cursor
         }
     except Exception as e:
         return {
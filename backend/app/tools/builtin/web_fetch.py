@@ -0,0 +1,92 @@
+import asyncio
+from typing import List, Optional
+
+from fastmcp import FastMCP
+
+from app.core.config import settings
+from app.tools.web.fetch import FetchError, web_fetcher
+
+mcp = FastMCP("web_fetch")
+
+
+async def _fetch_one(url: str, max_chars: int) -> dict:
+    """抓取单个页面，失败时返回带错误信息的结果，不影响其他页面"""
+    result = {"url": url, "success": False}
+    try:
+        page, cached = await web_fetcher.fetch(url)
+        content = page.content[:max_chars]
+        result.update({
+            "success": True,
+            "final_url": page.final_url,
+            "title": page.title,
+            "content": content,
+            "content_type": page.content_type,
+            "truncated": page.truncated or len(page.content) > max_chars,
+            "cached": cached
+        })
+    except FetchError as e:
+        result["message"] = str(e)
+    except asyncio.TimeoutError:
+        result["message"] = f"抓取超时（{settings.WEB_FETCH_TIMEOUT} 秒）: {url}"
+    except Exception as e:
+        result["message"] = f"抓取失败: {str(e) or type(e).__name__}"
+    return result
+
+
+@mcp.tool()
+async def web_fetch(urls: List[str], max_chars: Optional[int] = 6000) -> dict:
+    """
+    并发抓取多个网页并提取正文（通常在 web_search 之后获取搜索结果的内容）
+
+    Args:
+        urls: 网页地址列表（http/https）
+        max_chars: 每个页面返回的最大字符数，默认为6000
+
+    Returns:
+        dict: 包含抓取结果的字典
+            - success: 是否成功
+            - message: 操作消息
+            - results: 每个页面的结果（与 urls 顺序一致）
+                - url: 请求的地址
+                - success: 是否抓取成功
+                - message: 失败原因（仅失败时返回）
+                - final_url: 重定向后的最终地址
+                - title: 页面标题
+                - content: 提取的正文
+                - content_type: 内容类型
+                - truncated: 正文是否被截断
+                - cached: 是否来自缓存
+    """
+    try:
+        if not urls:
+            return {"success": False, "message": "网址列表为空", "results": []}
+        if len(urls) > settings.WEB_FETCH_MAX_URLS:
+            return {
+                "success": False,
+                "message": f"一次最多抓取 {settings.WEB_FETCH_MAX_URLS} 个网页",
+                "results": []
+            }
+
+        max_chars = min(max(max_chars or 6000, 1), settings.WEB_FETCH_MAX_CHARS)
+        # 重复的地址只抓取一次
+        unique = list(dict.fromkeys(url.strip() for url in urls))
+        fetched = await asyncio.gather(*(_fetch_one(url, max_chars) for url in unique))
+        by_url = dict(zip(unique, fetched))
+        results = [dict(by_url[url.strip()]) for url in urls]
+
+        succeeded = sum(1 for result in results if result["success"])
+        return {
+            "success": succeeded > 0,
+            "message": f"已抓取 {succeeded}/{len(results)} 个网页",
+            "results": results
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"抓取网页失败: {str(e)}",
+            "results": []
+        }
+
+
+if __name__ == "__main__":
+    mcp.run()
@@ -1,7 +1,10 @@
-from typing import List, Optional
+from typing import Optional
 
 from fastmcp import FastMCP
 
+from app.tools.cursor import cursors
+from app.tools.web.search import web_search_service
+
 mcp = FastMCP("web_search")
 
 
@@ -10,7 +13,8 @@ async def web_search(
     query: str,
     max_results: Optional[int] = 10,
     region: Optional[str] = "wt-wt",
-    time: Optional[str] = None
+    time: Optional[str] = None,
+    cursor: Optional[str] = None
 ) -> dict:
     """
     网络搜索工具
@@ -20,6 +24,7 @@ async def web_search(
         max_results: 最大返回结果数，默认为10
         region: 搜索区域，默认为"wt-wt"（全球）
         time: 时间范围（如 "d"=今天, "w"=本周, "m"=本月, "y"=今年）
+        cursor: 上一次搜索返回的 next_cursor，用于获取下一页（其余参数需保持不变）
 
     Returns:
         dict: 包含搜索结果的字典
@@ -30,40 +35,38 @@ async def web_search(
                 - title: 标题
                 - url: 链接
                 - snippet: 摘要
-            - total_results: 总结果数
+            - total_results: 本页结果数
+            - next_cursor: 可能还有更多结果时返回，传入 cursor 参数获取下一页；没有更多结果时为 None
     """
     try:
-        from duckduckgo_search import DDGS
-        
-        results = []
-        total_results = 0
-        
-        with DDGS() as ddgs:
-            # 构建搜索参数，只传递非 None 的参数
-            search_kwargs = {
-                "keywords": query,
-                "max_results": max_results,
-                "region": region
-            }
-            if time:
-                search_kwargs["timelimit"] = time
-            
-            search_results = list(ddgs.text(**search_kwargs))
-            
-            for result in search_results:
-                results.append({
-                    "title": result.get("title", ""),
-                    "url": result.get("href", ""),
-                    "snippet": result.get("body", "")
-                })
-                total_results += 1
-        
+        page_size = max_results or 10
+        # 续页时除 cursor 与 max_results 外的参数必须与首次搜索一致
+        params = {"query": query, "region": region, "time": time}
+        state = cursors.resume(cursor, "web_search", params) if cursor else None
+        offset = state["offset"] if state else 0
+
+        # 搜索后端不支持偏移量，按 offset + 本页条数请求后截取本页；
+        # 相同查询（规范化后）在有效期内直接返回缓存，并发的相同查询合并为一次请求
+        window = await web_search_service.search(query, offset + page_size, region, time)
+        results = window[offset:]
+        total_results = len(results)
+        # 后端返回的条数达到请求数时可能还有下一页
+        next_cursor = (
+            cursors.issue("web_search", params, {"offset": offset + total_results})
+            if len(window) >= offset + page_size else None
+        )
+
+        message = f"搜索完成，找到 {total_results} 个结果"
+        if next_cursor:
+            message = f"搜索完成，本页返回 {total_results} 个结果，传入 cursor=\"{next_cursor}\" 可获取下一页"
+
         return {
             "success": True,
-            "message": f"搜索完成，找到 {total_results} 个结果",
+            "message": message,
             "query": query,
             "results": results,
-            "total_results": total_results
+            "total_results": total_results,
+            "next_cursor": next_cursor
         }
     except ImportError:
         return {
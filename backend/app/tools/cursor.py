@@ -0,0 +1,82 @@
+# ============================================================================
+# Tool Cursor Module
+# ============================================================================
+import hashlib
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+
+
+class CursorError(Exception):
+    """游标无效、已过期或与本次调用的参数不匹配"""
+
+
+class _CursorEntry:
+    __slots__ = ("tool", "fingerprint", "state", "expires_at")
+
+    def __init__(self, tool: str, fingerprint: str, state: Dict[str, Any], expires_at: float):
+        self.tool = tool
+        self.fingerprint = fingerprint
+        self.state = state
+        self.expires_at = expires_at
+
+
+def _fingerprint(params: Dict[str, Any]) -> str:
+    """查询参数指纹（不含游标本身），续页时参数必须与签发时一致"""
+    data = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+class CursorStore:
+    """分页游标存储 - 服务端保存续页状态，对外只暴露不透明的令牌
+
+    返回列表的内置工具在结果被截断时调用 issue 保存“下一页从哪里开始”的状态，
+    并把令牌作为 next_cursor 返回；下次调用携带 cursor 时用 resume 取回状态继续，
+    不必从头重新计算。状态内容由各工具自行定义，需可被 JSON 序列化。
+    游标在 TOOL_CURSOR_TTL 秒后过期，超过 TOOL_CURSOR_MAX_ENTRIES 时淘汰最早签发的游标。
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: Optional[int] = None):
+        self.ttl = ttl or settings.TOOL_CURSOR_TTL
+        self.max_entries = max_entries or settings.TOOL_CURSOR_MAX_ENTRIES
+        self._entries: "OrderedDict[str, _CursorEntry]" = OrderedDict()
+        # 内置工具可能在线程池中执行
+        self._lock = threading.Lock()
+
+    def issue(self, tool: str, params: Dict[str, Any], state: Dict[str, Any]) -> str:
+        """保存续页状态，返回游标令牌"""
+        token = secrets.token_urlsafe(12)
+        entry = _CursorEntry(tool, _fingerprint(params), dict(state), time.monotonic() + self.ttl)
+        with self._lock:
+            self._purge()
+            self._entries[token] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return token
+
+    def resume(self, token: str, tool: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """取回游标对应的状态；游标在有效期内可重复使用（便于重试）"""
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                del self._entries[token]
+                entry = None
+        if entry is None:
+            raise CursorError("游标无效或已过期，请不带 cursor 重新查询")
+        if entry.tool != tool or entry.fingerprint != _fingerprint(params):
+            raise CursorError("游标与本次查询参数不匹配，续页时请保持其他参数不变")
+        return dict(entry.state)
+
+    def _purge(self):
+        now = time.monotonic()
+        expired = [token for token, entry in self._entries.items() if entry.expires_at <= now]
+        for token in expired:
+            del self._entries[token]
+
+
+cursors = CursorStore()
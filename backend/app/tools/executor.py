@@ -0,0 +1,63 @@
+# ============================================================================
+# Tool Executor Module
+# ============================================================================
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from loguru import logger
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+
+class ToolExecutor:
+    """内置工具的阻塞代码执行池
+
+    事件循环只有一个，工具中的同步文件读写、同步 HTTP 客户端等阻塞调用都通过 run
+    提交到独立的有界线程池（TOOL_THREAD_POOL_SIZE），不占用 asyncio 默认线程池，
+    大量并发工具调用时多出的任务排队等待，不会无限创建线程。
+    CPU 密集的文件内容扫描由 app.tools.search.parallel.search_pool 进程池执行，
+    其中目录遍历等 I/O 部分仍在本线程池中运行。
+
+    注意：线程中的任务无法被取消，工具超时后调用方立即返回，任务在后台执行完毕。
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self._max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers or settings.TOOL_THREAD_POOL_SIZE
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="tool"
+                )
+                logger.info(f"工具线程池已创建，线程数: {self.max_workers}")
+            return self._executor
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """在线程池中执行阻塞函数并等待结果（保留调用方的 contextvars）"""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, func, *args, **kwargs)
+        return await loop.run_in_executor(self._get_executor(), call)
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+tool_executor = ToolExecutor()
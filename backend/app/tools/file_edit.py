@@ -0,0 +1,222 @@
+# ============================================================================
+# File Edit Module
+# ============================================================================
+import hashlib
+import os
+import re
+import stat
+import tempfile
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+
+class PatchError(Exception):
+    """补丁或替换无法应用（格式错误、上下文不匹配、内容已变化等）"""
+
+
+class Hunk(NamedTuple):
+    """统一 diff 中的一个 hunk（行内容不含换行符）"""
+    old_start: int
+    old_lines: List[str]
+    new_lines: List[str]
+    # "\ No newline at end of file" 标记：原内容 / 新内容的最后一行没有换行
+    old_no_newline: bool
+    new_no_newline: bool
+
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _split_lines(content: str) -> List[Tuple[str, str]]:
+    """拆分为 (行内容, 换行符)，保留每行原有的换行符"""
+    lines = []
+    for line in content.splitlines(keepends=True):
+        body = line.rstrip("\r\n")
+        lines.append((body, line[len(body):]))
+    return lines
+
+
+def _detect_newline(content: str) -> str:
+    """文件使用的换行符，以第一个换行为准"""
+    position = content.find("\n")
+    if position > 0 and content[position - 1] == "\r":
+        return "\r\n"
+    return "\n"
+
+
+def parse_unified_diff(diff: str) -> List[Hunk]:
+    """解析单个文件的统一 diff
+
+    --- / +++ 等文件头会被忽略；hunk 的范围以下一个 @@ 为界，不依赖头部的行数统计，
+    因此手写补丁中行数不准确也能解析。hunk 内的空行视为内容为空的上下文行。
+    """
+    hunks: List[Hunk] = []
+    current = None
+    raw_lines = diff.splitlines()
+    while raw_lines and not raw_lines[-1].strip():
+        raw_lines.pop()
+
+    for number, line in enumerate(raw_lines, start=1):
+        header = _HUNK_HEADER.match(line)
+        if header:
+            current = Hunk(int(header.group(1)), [], [], False, False)
+            hunks.append(current)
+            continue
+        if current is None:
+            # 第一个 hunk 之前的 diff --git / index / --- / +++ 等文件头
+            continue
+        if (line.startswith("--- ") and number + 1 < len(raw_lines)
+                and raw_lines[number].startswith("+++ ") and raw_lines[number + 1].startswith("@@")):
+            raise PatchError("补丁只能包含当前文件的修改")
+        tag, body = line[:1], line[1:]
+        if tag == " " or not line:
+            current.old_lines.append(body)
+            current.new_lines.append(body)
+        elif tag == "-":
+            current.old_lines.append(body)
+        elif tag == "+":
+            current.new_lines.append(body)
+        elif tag == "\\":
+            previous = raw_lines[number - 2][:1] or " "
+            no_newline = {"old_no_newline": previous in (" ", "-"), "new_no_newline": previous in (" ", "+")}
+            hunks[-1] = current = current._replace(
+                old_no_newline=current.old_no_newline or no_newline["old_no_newline"],
+                new_no_newline=current.new_no_newline or no_newline["new_no_newline"],
+            )
+        else:
+            raise PatchError(f"补丁第 {number} 行格式错误（应以空格、+、- 或 @@ 开头）: {line[:80]}")
+    return hunks
+
+
+def _find_hunk(lines: List[Tuple[str, str]], old: List[str], expected: int, lower: int) -> Optional[int]:
+    """在 lower 之后查找与 old 匹配的位置，优先选择离 expected 最近的；先精确匹配，再忽略行尾空白"""
+    last = len(lines) - len(old)
+    if last < lower:
+        return None
+    expected = min(max(expected, lower), last)
+    for normalize in (lambda text: text, str.rstrip):
+        wanted = [normalize(text) for text in old]
+        for distance in range(0, max(expected - lower, last - expected) + 1):
+            for start in (expected - distance, expected + distance):
+                if lower <= start <= last and all(
+                    normalize(lines[start + i][0]) == wanted[i] for i in range(len(old))
+                ):
+                    return start
+    return None
+
+
+def apply_unified_diff(content: str, diff: str) -> Tuple[str, int]:
+    """把统一 diff 应用到文本，返回 (新文本, 应用的 hunk 数)
+
+    hunk 按顺序应用；行号不准确时在附近查找匹配的上下文（偏移会传递给后续 hunk），
+    保留文件原有的换行符风格。任一 hunk 无法定位时抛出 PatchError，不做部分修改。
+    """
+    hunks = parse_unified_diff(diff)
+    if not hunks:
+        raise PatchError("补丁中没有可应用的 hunk（每段修改需以 @@ -起始行,行数 +起始行,行数 @@ 开头）")
+
+    lines = _split_lines(content)
+    newline = _detect_newline(content)
+    output: List[Tuple[str, str]] = []
+    position = 0
+    drift = 0
+    for number, hunk in enumerate(hunks, start=1):
+        # 只有新增行的 hunk（如 -5,0）表示插入到第 old_start 行之后
+        expected = hunk.old_start - (1 if hunk.old_lines else 0) + drift
+        start = _find_hunk(lines, hunk.old_lines, expected, position)
+        if start is None:
+            preview = hunk.old_lines[0][:80] if hunk.old_lines else ""
+            raise PatchError(f"第 {number} 个 hunk 无法应用，文件中找不到对应的原内容（起始行: {preview!r}）")
+        drift = start - (hunk.old_start - (1 if hunk.old_lines else 0))
+
+        end = start + len(hunk.old_lines)
+        output.extend(lines[position:start])
+        replaced = [(body, newline) for body in hunk.new_lines]
+        if end == len(lines) and replaced:
+            # 修改到文件末尾时按标记决定最后一行是否有换行，未标记时保持原样
+            if hunk.new_no_newline:
+                last_ending = ""
+            elif hunk.old_no_newline or not lines:
+                last_ending = newline
+            else:
+                last_ending = lines[-1][1] if hunk.old_lines else newline
+            replaced[-1] = (replaced[-1][0], last_ending)
+        output.extend(replaced)
+        position = end
+
+    output.extend(lines[position:])
+    # 在没有换行的末行之后插入内容时，补上原末行的换行
+    for i in range(len(output) - 1):
+        if not output[i][1]:
+            output[i] = (output[i][0], newline)
+    return "".join(body + ending for body, ending in output), len(hunks)
+
+
+def apply_edits(content: str, edits: Sequence[Tuple[str, str, bool]]) -> Tuple[str, int]:
+    """按顺序应用查找替换 (search, replace, replace_all)，返回 (新文本, 替换次数)
+
+    search 必须在文件中出现（replace_all 为假时必须唯一）；文件使用 CRLF 时，
+    search / replace 中的 LF 换行会自动转换。任一处无法应用时抛出 PatchError。
+    """
+    crlf = _detect_newline(content) == "\r\n"
+    replacements = 0
+    for number, (search, replace, replace_all) in enumerate(edits, start=1):
+        if not search:
+            raise PatchError(f"第 {number} 处修改的 search 为空")
+        if crlf and "\r\n" not in search:
+            search = search.replace("\n", "\r\n")
+            replace = replace.replace("\r\n", "\n").replace("\n", "\r\n")
+        count = content.count(search)
+        if count == 0:
+            raise PatchError(f"第 {number} 处修改未找到要替换的内容: {search[:80]!r}")
+        if count > 1 and not replace_all:
+            raise PatchError(
+                f"第 {number} 处修改要替换的内容出现了 {count} 次，"
+                f"请在 search 中加入更多上下文使其唯一，或设置 replace_all"
+            )
+        content = content.replace(search, replace)
+        replacements += count
+    return content, replacements
+
+
+def _current_umask() -> int:
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# 进程启动时读取一次，os.umask 会修改全局状态，不能在工具线程中调用
+_UMASK = _current_umask()
+
+
+def atomic_write(path: str, data: bytes):
+    """原子写入：先写入同目录的临时文件并落盘，再用 os.replace 替换目标文件
+
+    读者要么看到完整的旧内容，要么看到完整的新内容；写入失败时目标文件保持不变。
+    目标为符号链接时写入链接指向的文件；保留已有文件的权限位。
+    """
+    target = os.path.realpath(path)
+    directory = os.path.dirname(target)
+    os.makedirs(directory, exist_ok=True)
+    try:
+        mode = stat.S_IMODE(os.stat(target).st_mode)
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK
+
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(target)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, target)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,191 @@
+# ============================================================================
+# Line Index Module
+# ============================================================================
+import bisect
+import codecs
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Tuple
+
+from app.core.config import settings
+
+# 统计换行时每次处理的块大小
+_CHUNK_SIZE = 1024 * 1024
+
+
+class FileWindow(NamedTuple):
+    """文件的一个读取窗口（行号从 1 开始，end_line 含）"""
+    content: str
+    offset: int
+    length: int
+    start_line: int
+    end_line: int
+    total_lines: int
+    size: int
+    truncated: bool
+
+
+class LineIndex:
+    """稀疏行偏移索引 - 每隔 stride 行记录一次行首的字节偏移
+
+    定位第 n 行时先跳到最近的检查点，再向后查找不超过 stride 个换行，
+    内存占用为 行数 / stride，而不是每行一个偏移。
+    """
+
+    def __init__(self, mm: mmap.mmap, stride: int):
+        self.stride = stride
+        self.size = len(mm)
+        # checkpoints[k] 为第 k * stride + 1 行的行首偏移
+        self.checkpoints: List[int] = [0]
+        newlines = 0
+        for start in range(0, self.size, _CHUNK_SIZE):
+            chunk = mm[start:start + _CHUNK_SIZE]
+            position = chunk.find(b"\n")
+            while position >= 0:
+                newlines += 1
+                if newlines % stride == 0:
+                    self.checkpoints.append(start + position + 1)
+                position = chunk.find(b"\n", position + 1)
+        # 末尾没有换行时最后一行也算一行
+        ends_with_newline = self.size == 0 or mm[self.size - 1:self.size] == b"\n"
+        self.total_lines = newlines + (0 if ends_with_newline else 1)
+
+    def line_start(self, mm: mmap.mmap, line: int) -> int:
+        """第 line 行行首的字节偏移；超出末行时返回文件大小"""
+        if line <= 1:
+            return 0
+        if line > self.total_lines:
+            return self.size
+        checkpoint = (line - 1) // self.stride
+        position = self.checkpoints[checkpoint]
+        for _ in range((line - 1) - checkpoint * self.stride):
+            position = mm.find(b"\n", position) + 1
+        return position
+
+    def line_at(self, mm: mmap.mmap, offset: int) -> int:
+        """字节偏移所在的行号"""
+        offset = min(max(offset, 0), self.size)
+        checkpoint = bisect.bisect_right(self.checkpoints, offset) - 1
+        return checkpoint * self.stride + 1 + mm[self.checkpoints[checkpoint]:offset].count(b"\n")
+
+
+class LineIndexCache:
+    """行索引缓存 - 按路径缓存，mtime 或大小变化时重建（LRU 淘汰）"""
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or settings.FILE_READ_LINE_INDEX_CACHE_SIZE
+        self._entries: "OrderedDict[str, Tuple[int, int, LineIndex]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str, mm: mmap.mmap, stat: os.stat_result) -> LineIndex:
+        with self._lock:
+            cached = self._entries.get(path)
+            if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+                self._entries.move_to_end(path)
+                return cached[2]
+        index = LineIndex(mm, settings.FILE_READ_LINE_INDEX_STRIDE)
+        with self._lock:
+            self._entries[path] = (stat.st_mtime_ns, stat.st_size, index)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return index
+
+
+line_indexes = LineIndexCache()
+
+
+def _utf8_boundary(mm: mmap.mmap, position: int) -> int:
+    """向后移动到 UTF-8 字符边界（跳过延续字节）"""
+    while 0 < position < len(mm) and 0x80 <= mm[position] < 0xC0:
+        position += 1
+    return position
+
+
+def _decode(data: bytes, encoding: str) -> str:
+    if codecs.lookup(encoding).name == "utf-8":
+        return data.decode("utf-8")
+    return data.decode(encoding, errors="replace")
+
+
+def _read_whole(path: str, encoding: str, max_bytes: int) -> FileWindow:
+    size = os.path.getsize(path)
+    if size > max_bytes:
+        raise ValueError(f"文件超过单次读取上限（{max_bytes} 字节），且该编码不支持分段读取: {encoding}")
+    with open(path, "r", encoding=encoding) as f:
+        content = f.read()
+    total_lines = content.count("\n") + (0 if not content or content.endswith("\n") else 1)
+    return FileWindow(content, 0, size, 1, total_lines, total_lines, size, False)
+
+
+def read_window(
+    path: str,
+    encoding: str = "utf-8",
+    offset: Optional[int] = None,
+    length: Optional[int] = None,
+    start_line: Optional[int] = None,
+    end_line: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+) -> FileWindow:
+    """通过内存映射读取文件的一个窗口，不把整个文件载入内存
+
+    指定 start_line / end_line 时按行读取，否则按字节范围 offset / length 读取，
+    都不指定时读取整个文件。返回内容不超过 max_bytes（默认 FILE_READ_MAX_BYTES），
+    超出时按行边界截断并标记 truncated。UTF-8 文件的字节范围会对齐到字符边界。
+    """
+    max_bytes = max_bytes or settings.FILE_READ_MAX_BYTES
+    path = os.path.abspath(path)
+    if "\n".encode(encoding) != b"\n":
+        # UTF-16 等编码的换行不是单字节 \n，无法建立字节行索引，只支持整体读取
+        if any(value is not None for value in (offset, length, start_line, end_line)):
+            raise ValueError(f"该编码不支持按行或字节范围读取: {encoding}")
+        return _read_whole(path, encoding, max_bytes)
+    is_utf8 = codecs.lookup(encoding).name == "utf-8"
+
+    with open(path, "rb") as f:
+        stat = os.fstat(f.fileno())
+        if stat.st_size == 0:
+            return FileWindow("", 0, 0, 1, 0, 0, 0, False)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            index = line_indexes.get(path, mm, stat)
+            size = index.size
+
+            by_line = start_line is not None or end_line is not None
+            if by_line:
+                first = max(start_line or 1, 1)
+                last = min(end_line or index.total_lines, index.total_lines)
+                begin = index.line_start(mm, first)
+                end = index.line_start(mm, last + 1) if last >= first else begin
+            else:
+                begin = min(max(offset or 0, 0), size)
+                end = size if length is None else min(begin + max(length, 0), size)
+                if is_utf8:
+                    begin, end = _utf8_boundary(mm, begin), _utf8_boundary(mm, end)
+
+            truncated = end - begin > max_bytes
+            if truncated:
+                cut = mm.rfind(b"\n", begin, begin + max_bytes)
+                end = cut + 1 if cut >= begin else begin + max_bytes
+                if is_utf8:
+                    end = _utf8_boundary(mm, end)
+
+            content = _decode(mm[begin:end], encoding)
+            first_line = first if by_line else index.line_at(mm, begin)
+            if end <= begin:
+                last_line = first_line - 1
+            elif by_line and not truncated:
+                last_line = last
+            else:
+                last_line = index.line_at(mm, end - 1)
+            return FileWindow(
+                content=content,
+                offset=begin,
+                length=end - begin,
+                start_line=first_line,
+                end_line=last_line,
+                total_lines=index.total_lines,
+                size=size,
+                truncated=truncated,
+            )
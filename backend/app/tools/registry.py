@@ -0,0 +1,92 @@
+# ============================================================================
+# Builtin Tool Registry Module
+# ============================================================================
+from types import ModuleType
+from typing import Any, Dict, List, Optional
+
+from fastmcp.tools.base import Tool
+from loguru import logger
+from pydantic import ValidationError
+
+from app.tools.executor import tool_executor
+
+
+class ToolArgumentError(Exception):
+    """工具参数校验失败"""
+
+
+class BuiltinTool:
+    """内置工具 - 持有被 @mcp.tool() 装饰的原始函数
+
+    参数模型与 JSON Schema 由 fastmcp 从函数签名生成，与 FastMCP 服务对外暴露的定义一致。
+    同步函数整体提交到工具线程池执行；异步函数自行把阻塞部分交给 tool_executor 或 search_pool。
+    """
+
+    def __init__(self, name: str, fn: Any, server: Any = None):
+        self._tool = Tool.from_function(fn, name=name)
+        self.name = name
+        self.fn = fn
+        self.server = server
+        self.is_async = self._tool.is_async
+
+    @property
+    def definition(self) -> Dict[str, Any]:
+        """MCP 格式的工具定义"""
+        return {
+            "name": self.name,
+            "description": self._tool.description,
+            "inputSchema": self._tool.parameters,
+        }
+
+    async def call(self, arguments: Dict[str, Any]) -> Any:
+        """校验参数后直接调用原始函数，返回函数的原生结果"""
+        fn = self.fn
+        if not self.is_async:
+            async def fn(**kwargs):
+                return await tool_executor.run(self.fn, **kwargs)
+        try:
+            return await self._tool.fn_metadata.call_fn_with_arg_validation(
+                fn, True, arguments or {}, None
+            )
+        except ValidationError as e:
+            details = "; ".join(
+                f"{'.'.join(str(loc) for loc in error['loc']) or '参数'}: {error['msg']}"
+                for error in e.errors()
+            )
+            raise ToolArgumentError(details) from e
+
+
+class BuiltinToolRegistry:
+    """内置工具注册表 - 进程内直接调用，不经过 FastMCP.call_tool 的序列化与解析"""
+
+    def __init__(self):
+        self._tools: Dict[str, BuiltinTool] = {}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def get(self, name: str) -> Optional[BuiltinTool]:
+        return self._tools.get(name)
+
+    def names(self) -> List[str]:
+        return list(self._tools.keys())
+
+    async def register_module(self, module: ModuleType) -> List[BuiltinTool]:
+        """登记内置工具模块中 FastMCP 服务（module.mcp）声明的全部工具"""
+        server = module.mcp
+        registered = []
+        for tool_def in await server.list_tools():
+            fn = getattr(module, tool_def.name, None)
+            if fn is None or not callable(fn):
+                logger.warning(f"内置工具模块 {module.__name__} 中未找到函数 {tool_def.name}，跳过")
+                continue
+            tool = BuiltinTool(tool_def.name, fn, server)
+            self._tools[tool.name] = tool
+            registered.append(tool)
+        return registered
+
+    async def call(self, name: str, arguments: Dict[str, Any]) -> Any:
+        tool = self._tools.get(name)
+        if tool is None:
+            raise KeyError(name)
+        return await tool.call(arguments)
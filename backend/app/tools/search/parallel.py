@@ -0,0 +1,163 @@
+# ============================================================================
+# Parallel Search Module
+# ============================================================================
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from loguru import logger
+
+from app.core.config import settings
+from app.tools.search.scanner import SearchHit, SearchPattern, scan_file
+
+FileHits = Tuple[str, List[SearchHit]]
+# 单个正则，或多个模式（元组，可哈希）
+PatternSpec = Union[str, Tuple[str, ...]]
+
+
+@lru_cache(maxsize=32)
+def _compile(pattern: PatternSpec, case_sensitive: bool) -> SearchPattern:
+    return SearchPattern(pattern, case_sensitive)
+
+
+def scan_batch(
+    paths: List[str],
+    pattern: PatternSpec,
+    case_sensitive: bool,
+    max_hits: int,
+    resume: Optional[Tuple[str, int]] = None,
+) -> List[FileHits]:
+    """扫描一批文件（在工作进程中执行），按输入顺序返回有命中的文件，总命中数不超过 max_hits
+
+    resume 为 (文件路径, 字节偏移)，该文件从上一页最后一个命中处继续扫描。
+    """
+    search_pattern = _compile(pattern, case_sensitive)
+    results: List[FileHits] = []
+    remaining = max_hits
+    for path in paths:
+        if remaining <= 0:
+            break
+        resume_at = resume[1] if resume is not None and path == resume[0] else None
+        hits = scan_file(path, search_pattern, remaining, resume_at)
+        if hits:
+            results.append((path, hits))
+            remaining -= len(hits)
+    return results
+
+
+class SearchPool:
+    """文件内容搜索进程池
+
+    遍历得到的文件按批提交到进程池并行扫描，结果按提交顺序合并，
+    因此输出顺序与单进程扫描一致；累计命中达到 max_results 后取消尚未开始的批次。
+    进程池在首次搜索时创建（spawn 方式，避免 fork 带有事件循环与线程的服务进程）。
+    """
+
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def workers(self) -> int:
+        return settings.FILE_SEARCH_WORKERS or os.cpu_count() or 1
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                logger.info(f"文件搜索进程池已创建，工作进程数: {self.workers}")
+            return self._executor
+
+    def _discard_executor(self, executor: ProcessPoolExecutor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def search(
+        self,
+        paths: Iterable[str],
+        pattern: Union[str, Sequence[str]],
+        case_sensitive: bool,
+        max_results: int,
+        resume: Optional[Tuple[str, int]] = None,
+    ) -> Iterator[FileHits]:
+        """按遍历顺序产出 (文件路径, 命中列表)，总命中数不超过 max_results
+
+        SearchPattern 会先在调用方编译一次，模式无效时在提交任何任务之前抛出 re.error / ValueError。
+        """
+        pattern = pattern if isinstance(pattern, str) else tuple(pattern)
+        _compile(pattern, case_sensitive)
+        if max_results <= 0:
+            return
+        paths = iter(paths)
+        batch_size = max(settings.FILE_SEARCH_BATCH_SIZE, 1)
+        batches = iter(lambda: list(islice(paths, batch_size)), [])
+
+        if self.workers <= 1:
+            remaining = max_results
+            for batch in batches:
+                for path, hits in scan_batch(batch, pattern, case_sensitive, remaining, resume):
+                    yield path, hits
+                    remaining -= len(hits)
+                if remaining <= 0:
+                    return
+            return
+
+        executor = self._get_executor()
+        pending = deque()
+        remaining = max_results
+        try:
+            while True:
+                # 保持每个工作进程约两个批次在途，遍历与扫描交替进行
+                while len(pending) < self.workers * 2:
+                    batch = next(batches, None)
+                    if batch is None:
+                        break
+                    try:
+                        future = executor.submit(scan_batch, batch, pattern, case_sensitive, remaining, resume)
+                    except (BrokenProcessPool, RuntimeError):
+                        future = None
+                    pending.append((batch, future))
+                if not pending:
+                    return
+
+                batch, future = pending.popleft()
+                try:
+                    if future is None:
+                        raise BrokenProcessPool("进程池不可用")
+                    results = future.result()
+                except BrokenProcessPool as e:
+                    # 工作进程异常退出：丢弃进程池，本批次在当前线程补扫，下次搜索重新创建
+                    logger.warning(f"文件搜索进程池异常，改为在当前线程扫描: {str(e)}")
+                    self._discard_executor(executor)
+                    results = scan_batch(batch, pattern, case_sensitive, remaining, resume)
+
+                for path, hits in results:
+                    hits = hits[:remaining]
+                    yield path, hits
+                    remaining -= len(hits)
+                    if remaining <= 0:
+                        return
+        finally:
+            for _, future in pending:
+                if future is not None:
+                    future.cancel()
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+search_pool = SearchPool()
@@ -0,0 +1,524 @@
+# ============================================================================
+# File Scanner Module
+# ============================================================================
+import mmap
+import os
+import re
+from typing import Any, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from app.core.config import settings
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants
+    import sre_parse
+
+try:
+    import ahocorasick as _ahocorasick
+except ImportError:  # 可选依赖，未安装时多个字面量使用交替正则
+    _ahocorasick = None
+
+# 判定二进制文件时检查的文件头长度
+_SNIFF_SIZE = 8192
+# 统计换行数与文本扫描时每次处理的块大小
+_CHUNK_SIZE = 1024 * 1024
+
+
+class SearchHit(NamedTuple):
+    line_number: int
+    line_content: str
+    match: Any
+    pattern: Optional[str] = None
+    # 命中在文件中的字节偏移，用于分页续扫
+    offset: int = 0
+
+
+# ============================================================================
+# 模式编译
+# ============================================================================
+def _byte_safe(items, ignore_case: bool) -> bool:
+    """字节正则与文本正则的匹配结果是否一致
+
+    UTF-8 中一个非 ASCII 字符占多个字节。`.`、`\\w`、否定字符类等单字符结构
+    在字节正则中只匹配一个字节，与文本正则的语义不同；但出现在 `*`/`+`/`?`
+    这类不限上限的重复中时，匹配“任意数量字节”与“任意数量字符”等价。
+    """
+    for op, arg in items:
+        if op is sre_constants.LITERAL:
+            ch = chr(arg)
+            if ignore_case and not ch.isascii() and ch.lower() != ch.upper():
+                return False
+        elif op is sre_constants.IN:
+            for member_op, member_arg in arg:
+                if member_op is sre_constants.LITERAL and member_arg < 0x80:
+                    continue
+                if member_op is sre_constants.RANGE and member_arg[1] < 0x80:
+                    continue
+                return False
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            min_count, max_count, sub_items = arg
+            if len(sub_items) == 1 and sub_items[0][0] is sre_constants.LITERAL and sub_items[0][1] >= 0x80:
+                # 量词在字节正则中只作用于多字节字符的最后一个字节
+                return False
+            if _byte_safe(sub_items, ignore_case):
+                continue
+            if not (
+                min_count <= 1
+                and max_count is sre_constants.MAXREPEAT
+                and len(sub_items) == 1
+                and _matches_any_char(sub_items[0])
+            ):
+                return False
+        elif op is sre_constants.SUBPATTERN:
+            # (?i:...) / (?-i:...) 作用域标志
+            group_ignore_case = (ignore_case or bool(arg[1] & sre_constants.SRE_FLAG_IGNORECASE)) \
+                and not arg[2] & sre_constants.SRE_FLAG_IGNORECASE
+            if not _byte_safe(arg[-1], group_ignore_case):
+                return False
+        elif op is sre_constants.BRANCH:
+            if not all(_byte_safe(branch, ignore_case) for branch in arg[1]):
+                return False
+        elif op in (sre_constants.ANY, sre_constants.NOT_LITERAL, sre_constants.CATEGORY):
+            return False
+        elif op is sre_constants.AT:
+            # \b \B 依赖 \w 的 Unicode 语义
+            if arg in (sre_constants.AT_BOUNDARY, sre_constants.AT_NON_BOUNDARY):
+                return False
+        else:
+            return False
+    return True
+
+
+def _matches_any_char(item) -> bool:
+    """是否为能匹配任意非 ASCII 字符的单字符结构（`.`、只含 ASCII 成员的否定字符类、否定 ASCII 字面量）"""
+    op, arg = item
+    if op is sre_constants.ANY:
+        return True
+    if op is sre_constants.NOT_LITERAL:
+        return arg < 0x80
+    if op is sre_constants.IN and arg and arg[0][0] is sre_constants.NEGATE:
+        return all(
+            (member_op is sre_constants.LITERAL and member_arg < 0x80)
+            or (member_op is sre_constants.RANGE and member_arg[1] < 0x80)
+            for member_op, member_arg in arg[1:]
+        )
+    return False
+
+
+# 能匹配换行符的字符类别
+_NEWLINE_CATEGORIES = {
+    sre_constants.CATEGORY_SPACE, sre_constants.CATEGORY_NOT_DIGIT, sre_constants.CATEGORY_NOT_WORD,
+    sre_constants.CATEGORY_LINEBREAK, sre_constants.CATEGORY_UNI_SPACE, sre_constants.CATEGORY_UNI_NOT_DIGIT,
+    sre_constants.CATEGORY_UNI_NOT_WORD, sre_constants.CATEGORY_UNI_LINEBREAK,
+}
+_NEWLINE = ord("\n")
+
+
+def _set_has_newline(members) -> bool:
+    """字符类（IN 的成员列表）是否包含换行符"""
+    negate = False
+    contains = False
+    for op, arg in members:
+        if op is sre_constants.NEGATE:
+            negate = True
+        elif op is sre_constants.LITERAL:
+            contains = contains or arg == _NEWLINE
+        elif op is sre_constants.RANGE:
+            contains = contains or arg[0] <= _NEWLINE <= arg[1]
+        elif op is sre_constants.CATEGORY:
+            contains = contains or arg in _NEWLINE_CATEGORIES
+        else:
+            return True
+    return contains != negate
+
+
+def _line_sensitive(items, dotall: bool) -> bool:
+    """匹配能否越过行尾，或结果依赖行之外的内容
+
+    能匹配换行符的结构（\\s、否定字符类、DOTALL 下的 `.` 等）、\\A / \\Z 与前后断言都算；
+    不含这些结构时在整个缓冲区上匹配与逐行匹配的结果相同。无法判断的结构按敏感处理。
+    """
+    for op, arg in items:
+        if op is sre_constants.LITERAL:
+            if arg == _NEWLINE:
+                return True
+        elif op is sre_constants.NOT_LITERAL:
+            if arg != _NEWLINE:
+                return True
+        elif op is sre_constants.ANY:
+            if dotall:
+                return True
+        elif op is sre_constants.IN:
+            if _set_has_newline(arg):
+                return True
+        elif op is sre_constants.CATEGORY:
+            if arg in _NEWLINE_CATEGORIES:
+                return True
+        elif op is sre_constants.AT:
+            if arg in (sre_constants.AT_BEGINNING_STRING, sre_constants.AT_END_STRING):
+                return True
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            if _line_sensitive(arg[2], dotall):
+                return True
+        elif op is sre_constants.SUBPATTERN:
+            group_dotall = (dotall or bool(arg[1] & sre_constants.SRE_FLAG_DOTALL)) \
+                and not arg[2] & sre_constants.SRE_FLAG_DOTALL
+            if _line_sensitive(arg[-1], group_dotall):
+                return True
+        elif op is sre_constants.BRANCH:
+            if any(_line_sensitive(branch, dotall) for branch in arg[1]):
+                return True
+        elif op is sre_constants.GROUPREF:
+            continue
+        else:
+            # 断言、条件分组等
+            return True
+    return False
+
+
+def literal_text(pattern: str) -> Optional[str]:
+    """模式不含任何正则元字符（转义后的字面量也算）且没有内联标志时返回对应的字面文本"""
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error:
+        return None
+    # (?i) 等全局内联标志会改变匹配语义，不能按字面量查找
+    if parsed.state.flags & ~sre_constants.SRE_FLAG_UNICODE:
+        return None
+    items = list(parsed)
+    if not items or any(op is not sre_constants.LITERAL for op, _ in items):
+        return None
+    return "".join(chr(arg) for _, arg in items)
+
+
+# 模式开头的全局内联标志，如 (?i)、(?ms)
+_GLOBAL_FLAGS = re.compile(r"\(\?([aiLmsux]+)\)")
+
+
+def _scope_global_flags(pattern: str) -> str:
+    """把模式开头的全局内联标志改写为作用域分组（(?i)foo -> (?i:foo)），以便与其他模式合并为交替正则"""
+    letters = ""
+    pos = 0
+    match = _GLOBAL_FLAGS.match(pattern)
+    while match:
+        letters += match.group(1)
+        pos = match.end()
+        match = _GLOBAL_FLAGS.match(pattern, pos)
+    if not letters:
+        return pattern
+    body = pattern[pos:]
+    if "x" in letters:
+        # 详细模式下 # 注释延续到行尾，换行避免注释吞掉分组的右括号
+        body += "\n"
+    return f"(?{letters}:{body})"
+
+
+def _case_free(text: str) -> bool:
+    """忽略大小写对该文本没有影响（数字、符号、中文等）"""
+    return text.lower() == text.upper()
+
+
+class SearchPattern:
+    """编译后的搜索模式，支持单个正则或多个模式一次扫描
+
+    匹配方式按从快到慢选择：
+    - 单个字面量（区分大小写或不含大小写字母）：bytes.find 子串查找；
+    - 多个字面量且安装了 pyahocorasick：Aho–Corasick 自动机一次扫描；
+    - 其余：能安全转换时用字节正则直接匹配内存映射，否则逐块解码后用文本正则。
+    多个模式合并为一个交替正则（字面量按长度降序，与自动机的最长匹配一致）。
+
+    单个模式时匹配内容与 re.findall 一致：无分组时为整个匹配，一个分组时为该分组，
+    多个分组时为元组；多个模式时为整个匹配，并记录命中的是哪个模式。
+    """
+
+    def __init__(self, pattern: Union[str, Sequence[str]], case_sensitive: bool = False):
+        self.multi = not isinstance(pattern, str)
+        self.patterns: List[str] = [pattern] if isinstance(pattern, str) else list(pattern)
+        if not self.patterns:
+            raise ValueError("搜索模式不能为空")
+        ignore_case = not case_sensitive
+        flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+        literals = [literal_text(p) for p in self.patterns]
+        self.literal: Optional[bytes] = None
+        self.automaton: Any = None
+        self._needles: List[bytes] = []
+        self._fold = False
+
+        if self.multi:
+            for single in self.patterns:
+                # 逐个编译，正则有误时错误信息对应具体的模式
+                re.compile(single, flags)
+                if any(op is sre_constants.GROUPREF for op, _ in _walk_ops(sre_parse.parse(single))):
+                    raise ValueError(f"多模式搜索不支持反向引用: {single}")
+            order = sorted(
+                range(len(self.patterns)),
+                key=lambda i: -len(literals[i]) if literals[i] is not None else 0,
+            )
+            source = "|".join(
+                f"(?P<_p{i}>{re.escape(literals[i]) if literals[i] is not None else _scope_global_flags(self.patterns[i])})"
+                for i in order
+            )
+        else:
+            source = self.patterns[0]
+
+        self.text_regex = re.compile(source, flags)
+        self.groups = self.text_regex.groups
+        parsed = sre_parse.parse(source, flags)
+        # 匹配可能越过行尾时逐行匹配，保证每个命中都在一行之内
+        self.per_line = _line_sensitive(list(parsed), bool(parsed.state.flags & sre_constants.SRE_FLAG_DOTALL))
+        self.bytes_regex: Optional[re.Pattern] = None
+        try:
+            if _byte_safe(list(parsed), bool(parsed.state.flags & sre_constants.SRE_FLAG_IGNORECASE)):
+                self.bytes_regex = re.compile(source.encode("utf-8"), flags)
+        except (re.error, UnicodeEncodeError):
+            self.bytes_regex = None
+
+        if all(literal and "\n" not in literal for literal in literals):
+            # 忽略大小写时把缓冲区转为小写后查找，bytes.lower 只转换 ASCII，非 ASCII 字符须无大小写之分
+            self._fold = ignore_case and not all(_case_free(literal) for literal in literals)
+            if not self._fold or all(_ascii_foldable(literal) for literal in literals):
+                self._needles = [literal.encode("utf-8") for literal in literals]
+                if self._fold:
+                    self._needles = [needle.lower() for needle in self._needles]
+                if not self.multi:
+                    self.literal = self._needles[0]
+                elif _ahocorasick is not None:
+                    self._build_automaton()
+
+    def _build_automaton(self):
+        # 按 latin-1 把字节一一映射为字符，自动机返回的位置即字节偏移
+        automaton = _ahocorasick.Automaton()
+        for index, needle in enumerate(self._needles):
+            automaton.add_word(needle.decode("latin-1"), index)
+        automaton.make_automaton()
+        self.automaton = automaton
+
+    @property
+    def bytes_capable(self) -> bool:
+        """能否直接在内存映射（字节）上匹配"""
+        return self.literal is not None or self.automaton is not None or self.bytes_regex is not None
+
+    def iter_bytes(self, buffer, pos: int = 0) -> Iterator[Tuple[int, Any, Optional[str]]]:
+        """从 pos 开始在字节缓冲区上查找，产出 (起始偏移, 匹配内容, 命中的模式)"""
+        if self.literal is not None and not self._fold:
+            value = self.literal.decode("utf-8")
+            step = len(self.literal)
+            position = buffer.find(self.literal, pos)
+            while position >= 0:
+                yield position, value, None
+                position = buffer.find(self.literal, position + step)
+        elif self.literal is not None or self.automaton is not None:
+            yield from self._iter_folded(buffer, pos)
+        elif self.per_line:
+            yield from self._iter_lines(self.bytes_regex, buffer, pos, b"\n")
+        else:
+            for m in self.bytes_regex.finditer(buffer, pos):
+                yield m.start(), self.match_value(m), self.source_of(m)
+
+    def _iter_folded(self, buffer, pos: int) -> Iterator[Tuple[int, Any, Optional[str]]]:
+        # 按行边界分块（字面量不含换行，不会跨块匹配），忽略大小写时逐块转为小写
+        size = len(buffer)
+        offset = pos
+        while offset < size:
+            end = buffer.find(b"\n", min(offset + _CHUNK_SIZE, size))
+            end = size if end < 0 else end + 1
+            chunk = buffer[offset:end]
+            if self._fold:
+                chunk = chunk.lower()
+            if self.automaton is not None:
+                matches = (
+                    (last - len(self._needles[index]) + 1, index)
+                    for last, index in self.automaton.iter_long(chunk.decode("latin-1"))
+                )
+            else:
+                matches = _find_all(chunk, self.literal)
+            for start, index in matches:
+                value = buffer[offset + start:offset + start + len(self._needles[index])].decode("utf-8", "ignore")
+                yield offset + start, value, self.patterns[index] if self.multi else None
+            offset = end
+
+    def iter_text(self, text: str, pos: int = 0) -> Iterator[Tuple[int, Any, Optional[str]]]:
+        """从 pos 开始在文本上查找，产出 (起始偏移, 匹配内容, 命中的模式)"""
+        if self.per_line:
+            yield from self._iter_lines(self.text_regex, text, pos, "\n")
+            return
+        for m in self.text_regex.finditer(text, pos):
+            yield m.start(), self.match_value(m), self.source_of(m)
+
+    def _iter_lines(self, regex: re.Pattern, buffer, pos: int, newline) -> Iterator[Tuple[int, Any, Optional[str]]]:
+        """逐行匹配：每行单独取出后匹配（行首行尾即字符串首尾），pos 所在行只产出 pos 之后的命中"""
+        size = len(buffer)
+        offset = buffer.rfind(newline, 0, pos) + 1
+        while offset < size:
+            # 按行边界分块后拆分为行，减少逐行查找换行的开销
+            end = buffer.find(newline, min(offset + _CHUNK_SIZE, size))
+            end = size if end < 0 else end + 1
+            lines = buffer[offset:end].split(newline)
+            if lines[-1] == lines[-1][:0]:
+                # 块以换行结尾，最后的空串不是一行
+                lines.pop()
+            line_start = offset
+            for line in lines:
+                for m in regex.finditer(line):
+                    if line_start + m.start() >= pos:
+                        yield line_start + m.start(), self.match_value(m), self.source_of(m)
+                line_start += len(line) + 1
+            offset = end
+
+    def source_of(self, m: re.Match) -> Optional[str]:
+        if not self.multi:
+            return None
+        for index, single in enumerate(self.patterns):
+            if m.group(f"_p{index}") is not None:
+                return single
+        return None
+
+    def match_value(self, m: re.Match) -> Any:
+        if self.multi or self.groups == 0:
+            value = m.group(0)
+        elif self.groups == 1:
+            value = m.group(1)
+        else:
+            return tuple(_to_text(g) for g in m.groups(default=b"" if isinstance(m.string, bytes) else ""))
+        return _to_text(value)
+
+
+def _ascii_foldable(text: str) -> bool:
+    """只有 ASCII 字符区分大小写（可用 bytes.lower 统一大小写）"""
+    return all(ch.isascii() or _case_free(ch) for ch in text)
+
+
+def _find_all(data: bytes, needle: bytes) -> Iterator[Tuple[int, int]]:
+    """子串查找（不重叠），产出 (偏移, 0)"""
+    position = data.find(needle)
+    while position >= 0:
+        yield position, 0
+        position = data.find(needle, position + len(needle))
+
+
+def _walk_ops(items) -> Iterator[Tuple[Any, Any]]:
+    """深度优先遍历解析树中的全部操作"""
+    for op, arg in items:
+        yield op, arg
+        if op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            yield from _walk_ops(arg[2])
+        elif op is sre_constants.SUBPATTERN:
+            yield from _walk_ops(arg[-1])
+        elif op is sre_constants.BRANCH:
+            for branch in arg[1]:
+                yield from _walk_ops(branch)
+
+
+def _to_text(value: Union[bytes, str, None]) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        # 文本扫描按 surrogateescape 解码以保持字节偏移，输出前去掉无法解码的字节
+        return value.encode("utf-8", "surrogateescape").decode("utf-8", "ignore")
+    return value.decode("utf-8", "ignore")
+
+
+# ============================================================================
+# 文件扫描
+# ============================================================================
+def _count_newlines(buffer, start: int, end: int) -> int:
+    """分块统计换行数，避免一次复制大段内容"""
+    count = 0
+    for offset in range(start, end, _CHUNK_SIZE):
+        count += buffer[offset:min(offset + _CHUNK_SIZE, end)].count(b"\n")
+    return count
+
+
+def _line_around(buffer, line_start: int, line_end: int, match_start: int) -> str:
+    """取出命中所在的行，超长行只保留命中附近的片段"""
+    max_length = settings.FILE_SEARCH_MAX_LINE_LENGTH
+    if line_end - line_start > max_length:
+        line_start = max(line_start, match_start - max_length // 2)
+        line_end = min(line_end, line_start + max_length)
+    line = buffer[line_start:line_end]
+    return _to_text(line).strip()
+
+
+def should_skip(path: str, size: Optional[int] = None) -> bool:
+    """超过大小上限、空文件与二进制文件（文件头含 NUL）不扫描"""
+    try:
+        size = os.path.getsize(path) if size is None else size
+        if size == 0 or size > settings.FILE_SEARCH_MAX_FILE_SIZE:
+            return True
+        with open(path, "rb") as f:
+            return b"\0" in f.read(_SNIFF_SIZE)
+    except OSError:
+        return True
+
+
+def scan_file(path: str, pattern: SearchPattern, max_hits: int, resume_at: Optional[int] = None) -> List[SearchHit]:
+    """扫描单个文件，最多返回 max_hits 个命中
+
+    文件以只读方式内存映射，内存占用与命中数成正比，而不是与文件大小成正比。
+    resume_at 为上一页最后一个命中的字节偏移：从该位置继续扫描，并跳过该位置上已返回的命中。
+    """
+    if max_hits <= 0 or should_skip(path):
+        return []
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if pattern.bytes_capable:
+                return _scan_bytes(mm, pattern, max_hits, resume_at)
+            return _scan_text(mm, pattern, max_hits, resume_at)
+    except (OSError, ValueError):
+        return []
+
+
+def _scan_bytes(mm: mmap.mmap, pattern: SearchPattern, max_hits: int, resume_at: Optional[int]) -> List[SearchHit]:
+    hits: List[SearchHit] = []
+    line_number = 1
+    counted_to = 0
+    for start, value, source in pattern.iter_bytes(mm, resume_at or 0):
+        if start == resume_at:
+            continue
+        line_number += _count_newlines(mm, counted_to, start)
+        counted_to = start
+        line_start = mm.rfind(b"\n", 0, start) + 1
+        line_end = mm.find(b"\n", start)
+        if line_end < 0:
+            line_end = len(mm)
+        hits.append(SearchHit(line_number, _line_around(mm, line_start, line_end, start), value, source, start))
+        if len(hits) >= max_hits:
+            break
+    return hits
+
+
+def _scan_text(mm: mmap.mmap, pattern: SearchPattern, max_hits: int, resume_at: Optional[int]) -> List[SearchHit]:
+    """按行边界分块解码后用文本正则匹配"""
+    hits: List[SearchHit] = []
+    size = len(mm)
+    # 从续扫位置所在行的行首开始解码，保证 ^ 与后行断言的上下文不变
+    offset = mm.rfind(b"\n", 0, resume_at) + 1 if resume_at else 0
+    line_number = 1 + _count_newlines(mm, 0, offset)
+    while offset < size:
+        end = mm.find(b"\n", min(offset + _CHUNK_SIZE, size))
+        end = size if end < 0 else end + 1
+        chunk = mm[offset:end].decode("utf-8", "surrogateescape")
+        pos = 0
+        if resume_at is not None and offset <= resume_at < end:
+            pos = len(mm[offset:resume_at].decode("utf-8", "surrogateescape"))
+        counted_to = 0
+        # 字符位置与字节偏移的对应关系随命中递增计算
+        char_cursor, byte_cursor = 0, offset
+        for start, value, source in pattern.iter_text(chunk, pos):
+            byte_cursor += len(chunk[char_cursor:start].encode("utf-8", "surrogateescape"))
+            char_cursor = start
+            if byte_cursor == resume_at:
+                continue
+            line_number += chunk.count("\n", counted_to, start)
+            counted_to = start
+            line_start = chunk.rfind("\n", 0, start) + 1
+            line_end = chunk.find("\n", start)
+            if line_end < 0:
+                line_end = len(chunk)
+            hits.append(SearchHit(line_number, _line_around(chunk, line_start, line_end, start), value, source, byte_cursor))
+            if len(hits) >= max_hits:
+                return hits
+        line_number += chunk.count("\n", counted_to)
+        offset = end
+    return hits
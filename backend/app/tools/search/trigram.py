@@ -0,0 +1,417 @@
+# ============================================================================
+# Trigram Index Module
+# ============================================================================
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+from loguru import logger
+
+from app.core.config import settings
+from app.tools.search.walker import IgnoreFilter, walk_files
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants
+    import sre_parse
+
+# 单个分支最多使用的三元组数量，更多的三元组对缩小候选集帮助不大
+_MAX_QUERY_TRIGRAMS = 64
+
+
+# ============================================================================
+# 正则 -> 三元组查询
+# ============================================================================
+def _trigrams(data: bytes) -> Set[int]:
+    """提取字节串中的全部三元组（小写化后），每个三元组编码为 24 位整数"""
+    data = data.lower()
+    return {(a << 16) | (b << 8) | c for a, b, c in zip(data, data[1:], data[2:])}
+
+
+def _literal_runs(items, ignore_case: bool) -> Optional[List[List[str]]]:
+    """分析正则语法树，返回若干备选分支，每个分支是匹配时必然出现的字面量列表
+
+    返回 None 表示无法确定必需的字面量（如 `.*`、纯字符类）。
+    分析只会漏掉约束、不会多加约束，因此候选文件总是实际匹配文件的超集。
+    """
+    required: List[str] = []
+    run: List[str] = []
+
+    def flush():
+        if run:
+            required.append("".join(run))
+            run.clear()
+
+    for op, arg in items:
+        if op is sre_constants.LITERAL:
+            ch = chr(arg)
+            # 忽略大小写时，非 ASCII 的大小写字母无法与索引中的 ASCII 小写化对应
+            if ignore_case and not ch.isascii() and ch.lower() != ch.upper():
+                flush()
+                continue
+            run.append(ch)
+        elif op is sre_constants.SUBPATTERN:
+            flush()
+            # (?i:...) / (?-i:...) 作用域标志
+            group_ignore_case = (ignore_case or bool(arg[1] & sre_constants.SRE_FLAG_IGNORECASE)) \
+                and not arg[2] & sre_constants.SRE_FLAG_IGNORECASE
+            sub = _literal_runs(arg[-1], group_ignore_case)
+            if sub is not None and len(sub) == 1:
+                required.extend(sub[0])
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            flush()
+            min_count, _, sub_items = arg
+            if min_count >= 1:
+                sub = _literal_runs(sub_items, ignore_case)
+                if sub is not None and len(sub) == 1:
+                    required.extend(sub[0])
+        elif op is sre_constants.BRANCH:
+            flush()
+            if len(items) == 1:
+                branches = []
+                for branch in arg[1]:
+                    sub = _literal_runs(branch, ignore_case)
+                    if sub is None or len(sub) != 1:
+                        return None
+                    branches.append(sub[0])
+                return branches
+        elif op is sre_constants.AT:
+            continue
+        else:
+            flush()
+    flush()
+    return [required]
+
+
+def regex_trigram_query(pattern: Union[str, Sequence[str]], ignore_case: bool) -> Optional[List[Set[int]]]:
+    """将正则转换为三元组查询（析取范式：任一分支的全部三元组都出现的文件才是候选）
+
+    传入多个正则时取各正则查询的并集；无法利用索引时返回 None，调用方应回退到全量扫描。
+    """
+    branches: List[List[str]] = []
+    for single in ([pattern] if isinstance(pattern, str) else pattern):
+        try:
+            parsed = sre_parse.parse(single)
+        except Exception:
+            return None
+        # 模式中的 (?i) 与 ignore_case 参数效果相同
+        single_ignore_case = ignore_case or bool(parsed.state.flags & sre_constants.SRE_FLAG_IGNORECASE)
+        single_branches = _literal_runs(list(parsed), single_ignore_case)
+        if single_branches is None:
+            return None
+        branches.extend(single_branches)
+    if not branches:
+        return None
+
+    query = []
+    for literals in branches:
+        grams: Set[int] = set()
+        for literal in literals:
+            grams |= _trigrams(literal.encode("utf-8"))
+        if not grams:
+            return None
+        query.append(set(sorted(grams)[:_MAX_QUERY_TRIGRAMS]))
+    return query
+
+
+# ============================================================================
+# 索引
+# ============================================================================
+def _iter_files(root: str, start: str = "", ignore: Optional[IgnoreFilter] = None) -> Iterator[Tuple[str, os.stat_result]]:
+    """遍历目录下未被忽略的普通文件，产出 (相对路径, stat)"""
+    for rel_path, entry in walk_files(root, start, ignore):
+        try:
+            yield rel_path, entry.stat()
+        except OSError:
+            continue
+
+
+class TrigramIndex:
+    """单个搜索根目录的三元组倒排索引（SQLite 持久化）
+
+    files 表记录每个文件的 mtime/size，refresh 时按差异增量更新；
+    超过大小上限的文件不建索引，查询时总是作为候选文件返回。
+    """
+
+    def __init__(self, root: str, db_path: str):
+        self.root = root
+        self.db_path = db_path
+        self.ready = False
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL UNIQUE,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                indexed INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                trigram INTEGER NOT NULL,
+                file_id INTEGER NOT NULL,
+                PRIMARY KEY (trigram, file_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_postings_file ON postings (file_id);
+            """
+        )
+        self._watcher: Optional["_IndexWatcher"] = None
+        self._dirty: Set[str] = set()
+        self._dirty_lock = threading.Lock()
+
+    def close(self):
+        if self._watcher is not None:
+            self._watcher.stop()
+        with self._lock:
+            self._conn.close()
+
+    # -------------------------------------------------------------- 更新
+    def _index_file(self, rel_path: str, stat: os.stat_result):
+        """（重新）索引单个文件"""
+        indexed = stat.st_size <= settings.FILE_SEARCH_INDEX_MAX_FILE_SIZE
+        grams: Set[int] = set()
+        if indexed:
+            try:
+                with open(os.path.join(self.root, rel_path), "rb") as f:
+                    grams = _trigrams(f.read())
+            except OSError:
+                indexed = False
+
+        cursor = self._conn.cursor()
+        row = cursor.execute("SELECT id FROM files WHERE path = ?", (rel_path,)).fetchone()
+        if row is None:
+            cursor.execute(
+                "INSERT INTO files (path, mtime_ns, size, indexed) VALUES (?, ?, ?, ?)",
+                (rel_path, stat.st_mtime_ns, stat.st_size, int(indexed)),
+            )
+            file_id = cursor.lastrowid
+        else:
+            file_id = row[0]
+            cursor.execute(
+                "UPDATE files SET mtime_ns = ?, size = ?, indexed = ? WHERE id = ?",
+                (stat.st_mtime_ns, stat.st_size, int(indexed), file_id),
+            )
+            cursor.execute("DELETE FROM postings WHERE file_id = ?", (file_id,))
+        cursor.executemany(
+            "INSERT INTO postings (trigram, file_id) VALUES (?, ?)",
+            ((gram, file_id) for gram in grams),
+        )
+
+    def _remove_files(self, paths: Iterable[str]):
+        cursor = self._conn.cursor()
+        for rel_path in paths:
+            row = cursor.execute("SELECT id FROM files WHERE path = ?", (rel_path,)).fetchone()
+            if row is not None:
+                cursor.execute("DELETE FROM postings WHERE file_id = ?", (row[0],))
+                cursor.execute("DELETE FROM files WHERE id = ?", (row[0],))
+
+    def refresh(self) -> Tuple[int, int]:
+        """按 mtime/size 与磁盘对比，增量更新变化的文件，返回 (更新数, 删除数)"""
+        with self._lock:
+            known: Dict[str, Tuple[int, int]] = {
+                path: (mtime_ns, size)
+                for path, mtime_ns, size in self._conn.execute("SELECT path, mtime_ns, size FROM files")
+            }
+            updated = 0
+            self._conn.execute("BEGIN")
+            try:
+                for rel_path, stat in _iter_files(self.root):
+                    previous = known.pop(rel_path, None)
+                    if previous == (stat.st_mtime_ns, stat.st_size):
+                        continue
+                    self._index_file(rel_path, stat)
+                    updated += 1
+                self._remove_files(known.keys())
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            return updated, len(known)
+
+    def _apply_dirty(self) -> int:
+        """只处理文件监听报告的变化路径"""
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, set()
+        if not dirty:
+            return 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                removed = []
+                ignore = IgnoreFilter(self.root)
+                for abs_path in dirty:
+                    rel_path = os.path.relpath(abs_path, self.root)
+                    if ignore.is_ignored(rel_path, os.path.isdir(abs_path)):
+                        continue
+                    try:
+                        stat = os.stat(abs_path)
+                    except OSError:
+                        # 可能是被删除的文件或目录
+                        removed.append(rel_path)
+                        # 按前缀范围查找目录下的文件（LIKE 会把路径中的 _ 和 % 当作通配符）
+                        prefix = rel_path + os.sep
+                        removed.extend(
+                            path for (path,) in self._conn.execute(
+                                "SELECT path FROM files WHERE path >= ? AND path < ?",
+                                (prefix, rel_path + chr(ord(os.sep) + 1)),
+                            )
+                        )
+                        continue
+                    if os.path.isdir(abs_path):
+                        for sub_path, sub_stat in _iter_files(self.root, rel_path, ignore):
+                            self._index_file(sub_path, sub_stat)
+                    else:
+                        self._index_file(rel_path, stat)
+                self._remove_files(removed)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(dirty)
+
+    def sync(self):
+        """查询前保证索引与磁盘一致：有文件监听时只处理变化路径，否则做一次 stat 对比"""
+        if self._watcher is not None and self._watcher.healthy:
+            self._apply_dirty()
+        else:
+            self.refresh()
+
+    def watch(self):
+        """启用文件监听（需要 watchfiles），不可用时查询前回退为 stat 对比"""
+        try:
+            self._watcher = _IndexWatcher(self)
+            self._watcher.start()
+        except ImportError:
+            self._watcher = None
+
+    def mark_dirty(self, paths: Iterable[str]):
+        with self._dirty_lock:
+            self._dirty.update(paths)
+
+    # -------------------------------------------------------------- 查询
+    def candidates(self, query: List[Set[int]]) -> List[str]:
+        """返回可能匹配的文件（相对路径，按路径排序）"""
+        with self._lock:
+            paths: Set[str] = set()
+            for grams in query:
+                placeholders = ",".join("?" * len(grams))
+                rows = self._conn.execute(
+                    f"""
+                    SELECT f.path FROM postings p JOIN files f ON f.id = p.file_id
+                    WHERE p.trigram IN ({placeholders})
+                    GROUP BY p.file_id HAVING COUNT(*) = ?
+                    """,
+                    (*grams, len(grams)),
+                )
+                paths.update(path for (path,) in rows)
+            paths.update(path for (path,) in self._conn.execute("SELECT path FROM files WHERE indexed = 0"))
+        return sorted(paths)
+
+
+class _IndexWatcher(threading.Thread):
+    """基于 watchfiles（Linux 上为 inotify）的变化监听，只记录变化路径，由查询线程统一处理"""
+
+    def __init__(self, index: TrigramIndex):
+        import watchfiles  # noqa: F401  未安装时抛出 ImportError
+
+        super().__init__(name=f"trigram-watch:{index.root}", daemon=True)
+        self.index = index
+        self.healthy = True
+        self._stop_event = threading.Event()
+
+    def run(self):
+        import watchfiles
+
+        try:
+            for changes in watchfiles.watch(
+                self.index.root,
+                stop_event=self._stop_event,
+                debounce=200,
+                rust_timeout=500,
+                raise_interrupt=False,
+            ):
+                self.index.mark_dirty(path for _, path in changes)
+        except Exception as e:
+            logger.warning(f"文件监听已停止，回退为 stat 对比: {self.index.root}: {str(e)}")
+        finally:
+            self.healthy = False
+
+    def stop(self, timeout: float = 2.0):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+
+
+class TrigramIndexManager:
+    """按搜索根目录管理索引：首次搜索时在后台线程构建，构建完成前调用方使用全量扫描"""
+
+    def __init__(self):
+        self._indexes: Dict[str, TrigramIndex] = {}
+        self._building: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def _db_path(self, root: str) -> str:
+        directory = os.path.abspath(settings.FILE_SEARCH_INDEX_DIR)
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha1(root.encode("utf-8", "surrogateescape")).hexdigest()[:16]
+        return os.path.join(directory, f"{digest}.sqlite3")
+
+    def get(self, root: str) -> Optional[TrigramIndex]:
+        """返回已就绪的索引；不存在时安排后台构建并返回 None"""
+        if not settings.FILE_SEARCH_INDEX_ENABLED:
+            return None
+        root = os.path.abspath(root)
+        with self._lock:
+            index = self._indexes.get(root)
+            if index is not None and index.ready:
+                return index
+            if root in self._building:
+                return None
+            self._building.add(root)
+        threading.Thread(target=self._build, args=(root,), name=f"trigram-build:{root}", daemon=True).start()
+        return None
+
+    def _build(self, root: str):
+        started = time.monotonic()
+        try:
+            index = TrigramIndex(root, self._db_path(root))
+            # 先开启监听再全量对比，避免构建期间的修改被遗漏
+            index.watch()
+            updated, removed = index.refresh()
+            index.ready = True
+            with self._lock:
+                self._indexes[root] = index
+            logger.info(
+                f"三元组索引已就绪: {root}（更新 {updated} 个文件，删除 {removed} 个，"
+                f"耗时 {time.monotonic() - started:.2f}s）"
+            )
+        except Exception as e:
+            logger.error(f"构建三元组索引失败: {root}: {str(e)}")
+        finally:
+            with self._lock:
+                self._building.discard(root)
+
+    def mark_changed(self, path: str):
+        """通知索引某个路径已被修改（如 file_save 写入），下次查询前重新索引"""
+        path = os.path.abspath(path)
+        with self._lock:
+            indexes = list(self._indexes.values())
+        for index in indexes:
+            if path.startswith(index.root.rstrip(os.sep) + os.sep):
+                index.mark_dirty([path])
+
+    def close(self):
+        with self._lock:
+            for index in self._indexes.values():
+                index.close()
+            self._indexes.clear()
+
+
+trigram_indexes = TrigramIndexManager()
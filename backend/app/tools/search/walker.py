@@ -0,0 +1,221 @@
+# ============================================================================
+# Directory Walker Module
+# ============================================================================
+import os
+import re
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+
+# 读取的忽略规则文件（与 git / ripgrep 一致，后者优先级更高）
+IGNORE_FILES = (".gitignore", ".ignore")
+# 含有该文件的目录视为 Python 虚拟环境
+_VENV_MARKER = "pyvenv.cfg"
+
+
+class IgnoreRule:
+    """一条 gitignore 规则，按相对于规则文件所在目录的路径匹配"""
+
+    __slots__ = ("base", "regex", "negate", "dir_only")
+
+    def __init__(self, base: str, regex: "re.Pattern", negate: bool, dir_only: bool):
+        self.base = base
+        self.regex = regex
+        self.negate = negate
+        self.dir_only = dir_only
+
+    def matches(self, rel_path: str, is_dir: bool) -> bool:
+        if self.dir_only and not is_dir:
+            return False
+        if self.base:
+            if not rel_path.startswith(self.base + "/"):
+                return False
+            rel_path = rel_path[len(self.base) + 1:]
+        return self.regex.match(rel_path) is not None
+
+
+def _translate(pattern: str) -> str:
+    """把 gitignore 通配符转换为正则（不含锚定）"""
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        ch = pattern[i]
+        if ch == "*":
+            if pattern.startswith("**/", i):
+                out.append("(?:.*/)?")
+                i += 3
+                continue
+            if pattern.startswith("**", i):
+                out.append(".*")
+                i += 2
+                continue
+            out.append("[^/]*")
+        elif ch == "?":
+            out.append("[^/]")
+        elif ch == "[":
+            end = pattern.find("]", i + 2 if pattern.startswith("[!", i) or pattern.startswith("[^", i) else i + 1)
+            if end < 0:
+                out.append(re.escape(ch))
+            else:
+                body = pattern[i + 1:end]
+                if body[:1] in ("!", "^"):
+                    body = "^" + body[1:]
+                out.append("[" + body.replace("\\", "\\\\") + "]")
+                i = end
+        elif ch == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(ch))
+        i += 1
+    return "".join(out)
+
+
+def parse_ignore_file(path: str, base: str) -> List[IgnoreRule]:
+    """解析忽略规则文件，base 为规则文件所在目录相对于搜索根目录的路径（"/" 分隔）"""
+    try:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return []
+
+    rules = []
+    for line in lines:
+        if not line.endswith("\\ "):
+            line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        elif line.startswith("\\!") or line.startswith("\\#"):
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        # 开头或中间含有 "/" 的规则相对于规则文件所在目录锚定，否则匹配任意层级
+        anchored = "/" in line
+        line = line.lstrip("/")
+        prefix = "" if anchored else "(?:.*/)?"
+        try:
+            regex = re.compile(f"{prefix}{_translate(line)}$")
+        except re.error:
+            continue
+        rules.append(IgnoreRule(base, regex, negate, dir_only))
+    return rules
+
+
+class IgnoreFilter:
+    """判断路径是否被忽略：默认排除目录、虚拟环境，以及各级目录中的 .gitignore / .ignore
+
+    规则文件按目录缓存，一个实例对应一次遍历或一次查询。
+    """
+
+    def __init__(self, root: str, respect_ignore_files: bool = True):
+        self.root = os.path.abspath(root)
+        self.respect_ignore_files = respect_ignore_files
+        self.exclude_dirs = set(settings.FILE_SEARCH_EXCLUDE_DIRS)
+        self._rules: Dict[str, List[IgnoreRule]] = {}
+
+    def rules_in(self, rel_dir: str) -> List[IgnoreRule]:
+        """某个目录自身的忽略规则（rel_dir 为 "/" 分隔的相对路径，根目录为空串）"""
+        rules = self._rules.get(rel_dir)
+        if rules is None:
+            rules = []
+            if self.respect_ignore_files:
+                directory = os.path.join(self.root, rel_dir) if rel_dir else self.root
+                for name in IGNORE_FILES:
+                    rules.extend(parse_ignore_file(os.path.join(directory, name), rel_dir))
+            self._rules[rel_dir] = rules
+        return rules
+
+    def chain_for(self, rel_dir: str) -> List[IgnoreRule]:
+        """从根目录到 rel_dir 各级目录的规则，越深的规则越靠后"""
+        chain = list(self.rules_in(""))
+        if rel_dir:
+            parts = rel_dir.split("/")
+            for depth in range(1, len(parts) + 1):
+                chain.extend(self.rules_in("/".join(parts[:depth])))
+        return chain
+
+    def is_excluded_dir(self, name: str, abs_path: str) -> bool:
+        return name in self.exclude_dirs or os.path.isfile(os.path.join(abs_path, _VENV_MARKER))
+
+    @staticmethod
+    def match(chain: List[IgnoreRule], rel_path: str, is_dir: bool) -> bool:
+        """按 gitignore 语义判断：最后一条匹配的规则生效，"!" 规则重新包含"""
+        ignored = False
+        for rule in chain:
+            if rule.negate == ignored and rule.matches(rel_path, is_dir):
+                ignored = not rule.negate
+        return ignored
+
+    def is_ignored(self, rel_path: str, is_dir: bool = False) -> bool:
+        """判断单个路径（os.sep 分隔的相对路径）是否被忽略，任一上级目录被忽略时同样视为忽略"""
+        parts = rel_path.replace(os.sep, "/").split("/")
+        if parts[0] == "..":
+            return True
+        for depth in range(1, len(parts) + 1):
+            sub_is_dir = is_dir or depth < len(parts)
+            name = parts[depth - 1]
+            sub_path = "/".join(parts[:depth])
+            if sub_is_dir and self.is_excluded_dir(name, os.path.join(self.root, sub_path)):
+                return True
+            if self.match(self.chain_for("/".join(parts[:depth - 1])), sub_path, sub_is_dir):
+                return True
+        return False
+
+
+def walk_order_key(rel_path: str) -> Tuple[Tuple[int, str], ...]:
+    """文件在 walk_files 遍历顺序中的排序键（同一目录内文件在前、子目录在后，均按名称排序）"""
+    parts = rel_path.replace(os.sep, "/").split("/")
+    return tuple((1, name) for name in parts[:-1]) + ((0, parts[-1]),)
+
+
+def walk_files(
+    root: str,
+    start: str = "",
+    ignore: Optional[IgnoreFilter] = None,
+    resume_from: Optional[str] = None,
+) -> Iterator[Tuple[str, os.DirEntry]]:
+    """惰性遍历目录下未被忽略的普通文件，产出 (os.sep 分隔的相对路径, DirEntry)
+
+    每个目录内按名称排序，先产出文件再进入子目录，遍历顺序稳定；不跟随目录符号链接。
+    start 为开始遍历的子目录（相对路径），其上级目录的忽略规则同样生效。
+    resume_from 为续遍历的位置：从该文件（含）开始产出，整棵位于其之前的子目录不再进入。
+    """
+    ignore = ignore or IgnoreFilter(root)
+    start = start.replace(os.sep, "/").strip("/")
+    resume_key = walk_order_key(resume_from) if resume_from else None
+    stack = [(start, ignore.chain_for(start))]
+    while stack:
+        rel_dir, chain = stack.pop()
+        directory = os.path.join(ignore.root, rel_dir) if rel_dir else ignore.root
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError:
+            continue
+
+        subdirs = []
+        for entry in entries:
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if resume_key is not None:
+                        dir_key = walk_order_key(rel_path)[:-1] + ((1, entry.name),)
+                        if dir_key < resume_key[:len(dir_key)]:
+                            continue
+                    if ignore.is_excluded_dir(entry.name, entry.path) or ignore.match(chain, rel_path, True):
+                        continue
+                    subdirs.append(rel_path)
+                elif entry.is_file() and not ignore.match(chain, rel_path, False):
+                    if resume_key is not None and walk_order_key(rel_path) < resume_key:
+                        continue
+                    yield rel_path.replace("/", os.sep), entry
+            except OSError:
+                continue
+
+        for rel_path in reversed(subdirs):
+            stack.append((rel_path, chain + ignore.rules_in(rel_path)))
@@ -0,0 +1,345 @@
+# ============================================================================
+# Web Fetch Module
+# ============================================================================
+import asyncio
+import codecs
+import ipaddress
+import re
+import time
+import weakref
+from collections import OrderedDict
+from html.parser import HTMLParser
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+import httpx
+
+from app.core.config import settings
+from app.core.http_client import http_clients
+
+# 不计入正文的元素（脚本、样式、导航、页脚等）；head 的结束标签可以省略，不在其中
+_SKIP_TAGS = {
+    "script", "style", "noscript", "template", "svg", "canvas", "iframe", "object",
+    "nav", "footer", "aside", "form", "button", "select",
+}
+# 块级元素前后换行
+_BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "header", "br", "hr", "li", "ul", "ol",
+    "h1", "h2", "h3", "h4", "h5", "h6", "tr", "table", "blockquote", "pre", "dd", "dt",
+    "figcaption", "details", "summary",
+}
+_HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+_VOID_TAGS = {"br", "hr", "img", "input", "meta", "link", "source", "wbr", "area", "base", "col", "embed"}
+# 正文容器：存在且内容足够时只返回其中的文本
+_MAIN_TAGS = {"main", "article"}
+_MAIN_MIN_CHARS = 200
+
+_TEXT_TYPES = ("text/plain", "text/markdown", "text/csv", "application/json", "application/xml", "text/xml")
+_REDIRECT_CODES = {301, 302, 303, 307, 308}
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([A-Za-z0-9_.:-]+)""", re.IGNORECASE)
+
+
+class FetchError(Exception):
+    """页面无法获取（地址无效、状态码错误、内容类型不支持等）"""
+
+
+class FetchedPage(NamedTuple):
+    """抓取并提取后的页面（content 为提取的正文，不超过 WEB_FETCH_MAX_CHARS 字符）"""
+    url: str
+    final_url: str
+    status: int
+    content_type: str
+    title: str
+    content: str
+    truncated: bool
+
+
+class _TextExtractor(HTMLParser):
+    """流式正文提取 - 随数据到达逐块 feed，跳过脚本与导航等元素，保留块级结构的换行"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title_parts: List[str] = []
+        self.parts: List[str] = []
+        self.main_parts: List[str] = []
+        self.length = 0
+        self._skip_depth = 0
+        self._main_depth = 0
+        self._pre_depth = 0
+        self._in_title = False
+
+    def _append(self, text: str):
+        self.parts.append(text)
+        self.length += len(text)
+        if self._main_depth:
+            self.main_parts.append(text)
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title":
+            self._in_title = True
+        if tag in _SKIP_TAGS and tag not in _VOID_TAGS:
+            self._skip_depth += 1
+            return
+        if self._skip_depth:
+            return
+        if tag in _MAIN_TAGS:
+            self._main_depth += 1
+        if tag == "pre":
+            self._pre_depth += 1
+        if tag in _BLOCK_TAGS:
+            self._append("\n")
+        if tag == "li":
+            self._append("-")
+        elif tag in _HEADING_TAGS:
+            self._append("#" * int(tag[1]))
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        if tag in _SKIP_TAGS:
+            self._skip_depth = max(self._skip_depth - 1, 0)
+            return
+        if self._skip_depth:
+            return
+        if tag in _BLOCK_TAGS:
+            self._append("\n")
+        if tag == "pre":
+            self._pre_depth = max(self._pre_depth - 1, 0)
+        if tag in _MAIN_TAGS:
+            self._main_depth = max(self._main_depth - 1, 0)
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title_parts.append(data)
+            return
+        if self._skip_depth:
+            return
+        if not self._pre_depth:
+            data = " ".join(data.split())
+            if not data:
+                return
+            data = " " + data
+        self._append(data)
+
+    def title(self) -> str:
+        return " ".join("".join(self.title_parts).split())
+
+    def text(self) -> str:
+        main = _clean("".join(self.main_parts))
+        if len(main) >= _MAIN_MIN_CHARS:
+            return main
+        return _clean("".join(self.parts))
+
+
+def _clean(text: str) -> str:
+    """去掉行首尾空白与空行（每个块级元素占一行）"""
+    return "\n".join(line.strip() for line in text.split("\n") if line.strip())
+
+
+def _charset(response: httpx.Response, head: bytes) -> str:
+    """页面编码：优先 Content-Type 头，其次 HTML meta 标签，默认 UTF-8"""
+    for candidate in (response.charset_encoding, None):
+        if candidate is None:
+            match = _META_CHARSET.search(head[:4096])
+            candidate = match.group(1).decode("ascii") if match else None
+        if candidate:
+            try:
+                return codecs.lookup(candidate).name
+            except LookupError:
+                continue
+    return "utf-8"
+
+
+def _freshness(response: httpx.Response) -> Optional[float]:
+    """按 Cache-Control 计算缓存有效期；None 表示不缓存"""
+    cache_control = response.headers.get("cache-control", "").lower()
+    if "no-store" in cache_control:
+        return None
+    if "no-cache" in cache_control:
+        return 0.0
+    match = re.search(r"max-age\s*=\s*(\d+)", cache_control)
+    if match:
+        return min(float(match.group(1)), settings.WEB_FETCH_CACHE_TTL)
+    return float(settings.WEB_FETCH_CACHE_TTL)
+
+
+async def _check_url(url: str):
+    """只允许 http(s)；默认拒绝解析到内网、回环等非公网地址的主机"""
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise FetchError(f"只支持 http/https 地址: {url}")
+    if settings.WEB_FETCH_ALLOW_PRIVATE_NETWORKS:
+        return
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(parts.hostname, parts.port or None)
+    except OSError as e:
+        raise FetchError(f"无法解析主机 {parts.hostname}: {str(e)}")
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        if not address.is_global:
+            raise FetchError(f"不允许访问内网地址: {parts.hostname}")
+
+
+class _CacheEntry:
+    __slots__ = ("page", "etag", "last_modified", "expires_at")
+
+    def __init__(self, page: FetchedPage, etag: Optional[str], last_modified: Optional[str], expires_at: float):
+        self.page = page
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+
+    @property
+    def revalidatable(self) -> bool:
+        return bool(self.etag or self.last_modified)
+
+
+class WebFetcher:
+    """网页抓取 - 共享连接池、按主机限制并发、流式提取正文、按 URL 缓存
+
+    所有请求使用 HTTP 客户端注册表中名为 web_fetch 的共享客户端；同一主机同时最多
+    WEB_FETCH_PER_HOST_CONCURRENCY 个请求。响应边下载边提取，正文达到 WEB_FETCH_MAX_CHARS
+    字符或下载达到 WEB_FETCH_MAX_BYTES 字节时立即停止。结果按 URL 缓存，过期后带
+    If-None-Match / If-Modified-Since 重新验证，服务器返回 304 时直接复用缓存。
+    """
+
+    def __init__(self):
+        self._cache: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        # 没有请求使用时自动释放，避免访问过的主机越积越多
+        self._host_limits: "weakref.WeakValueDictionary[str, asyncio.Semaphore]" = weakref.WeakValueDictionary()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = (urlsplit(url).hostname or "").lower()
+        semaphore = self._host_limits.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(settings.WEB_FETCH_PER_HOST_CONCURRENCY)
+            self._host_limits[host] = semaphore
+        return semaphore
+
+    async def fetch(self, url: str) -> Tuple[FetchedPage, bool]:
+        """抓取单个页面，返回 (页面, 是否来自缓存)"""
+        entry = self._cache.get(url)
+        if entry is not None and entry.expires_at > time.monotonic():
+            self._cache.move_to_end(url)
+            self.hits += 1
+            return entry.page, True
+
+        headers = {"User-Agent": settings.WEB_FETCH_USER_AGENT, "Accept": "text/html,text/plain;q=0.9,*/*;q=0.5"}
+        if entry is not None and entry.revalidatable:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        semaphore = self._host_limit(url)
+        async with semaphore:
+            page, response = await asyncio.wait_for(self._get(url, headers), timeout=settings.WEB_FETCH_TIMEOUT)
+
+        if page is None:
+            # 304 Not Modified：沿用缓存内容，刷新有效期
+            self.revalidated += 1
+            freshness = _freshness(response)
+            entry.expires_at = time.monotonic() + (freshness or 0.0)
+            self._cache[url] = entry
+            self._cache.move_to_end(url)
+            return entry.page, True
+
+        self.misses += 1
+        freshness = _freshness(response)
+        if freshness is None:
+            self._cache.pop(url, None)
+        else:
+            self._cache[url] = _CacheEntry(
+                page,
+                response.headers.get("etag"),
+                response.headers.get("last-modified"),
+                time.monotonic() + freshness,
+            )
+            self._cache.move_to_end(url)
+            while len(self._cache) > settings.WEB_FETCH_CACHE_MAX_ENTRIES:
+                self._cache.popitem(last=False)
+        return page, False
+
+    async def _get(self, url: str, headers: Dict[str, str]) -> Tuple[Optional[FetchedPage], httpx.Response]:
+        """发起请求（手动跟随重定向，每一跳都检查地址），返回 (页面, 响应)；304 时页面为 None"""
+        client = http_clients.named("web_fetch")
+        current = url
+        for _ in range(settings.WEB_FETCH_MAX_REDIRECTS + 1):
+            await _check_url(current)
+            async with client.stream("GET", current, headers=headers) as response:
+                if response.status_code in _REDIRECT_CODES and "location" in response.headers:
+                    current = urljoin(current, response.headers["location"])
+                    continue
+                if response.status_code == 304 and ("If-None-Match" in headers or "If-Modified-Since" in headers):
+                    return None, response
+                if response.status_code >= 300:
+                    raise FetchError(f"HTTP {response.status_code}: {current}")
+                return await self._extract(url, current, response), response
+        raise FetchError(f"重定向次数超过 {settings.WEB_FETCH_MAX_REDIRECTS} 次: {url}")
+
+    async def _extract(self, url: str, final_url: str, response: httpx.Response) -> FetchedPage:
+        """边下载边提取正文，达到字符或字节上限时停止读取"""
+        content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+        is_html = content_type in ("", "text/html", "application/xhtml+xml")
+        if not is_html and not content_type.startswith(_TEXT_TYPES):
+            raise FetchError(f"不支持的内容类型: {content_type}")
+
+        max_chars = settings.WEB_FETCH_MAX_CHARS
+        extractor = _TextExtractor() if is_html else None
+        plain: List[str] = []
+        plain_length = 0
+        decoder = None
+        downloaded = 0
+        truncated = False
+        async for chunk in response.aiter_bytes():
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder(_charset(response, chunk))(errors="replace")
+            downloaded += len(chunk)
+            text = decoder.decode(chunk)
+            if extractor is not None:
+                extractor.feed(text)
+                length = extractor.length
+            else:
+                plain.append(text)
+                plain_length += len(text)
+                length = plain_length
+            if length >= max_chars or downloaded >= settings.WEB_FETCH_MAX_BYTES:
+                truncated = True
+                break
+
+        if extractor is not None:
+            if decoder is not None and not truncated:
+                extractor.feed(decoder.decode(b"", final=True))
+            extractor.close()
+            title, content = extractor.title(), extractor.text()
+        else:
+            title, content = "", "".join(plain).strip()
+        if len(content) > max_chars:
+            content, truncated = content[:max_chars], True
+
+        return FetchedPage(
+            url=url,
+            final_url=final_url,
+            status=response.status_code,
+            content_type=content_type or "text/html",
+            title=title,
+            content=content,
+            truncated=truncated,
+        )
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+        }
+
+
+web_fetcher = WebFetcher()
@@ -0,0 +1,221 @@
+# ============================================================================
+# Web Search Backend Module
+# ============================================================================
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from app.core.config import settings
+from app.tools.executor import tool_executor
+
+# (规范化查询词, 区域, 时间范围)
+SearchKey = Tuple[str, str, Optional[str]]
+
+
+def normalize_query(query: str) -> str:
+    """规范化查询词：合并空白并忽略大小写"""
+    return " ".join(str(query).split()).casefold()
+
+
+class SearchBackend(ABC):
+    """搜索后端基类 - 实现 search 返回 {"title", "url", "snippet"} 列表"""
+
+    name = "base"
+
+    @abstractmethod
+    async def search(
+        self, query: str, max_results: int, region: str, time_range: Optional[str]
+    ) -> List[dict]:
+        """执行一次搜索"""
+
+
+class DuckDuckGoBackend(SearchBackend):
+    """DuckDuckGo 搜索（duckduckgo-search 是同步库，在工具线程池中执行）"""
+
+    name = "duckduckgo"
+
+    @staticmethod
+    def _search(query: str, max_results: int, region: str, time_range: Optional[str]) -> List[dict]:
+        from duckduckgo_search import DDGS
+
+        results = []
+        with DDGS() as ddgs:
+            # 构建搜索参数，只传递非 None 的参数
+            search_kwargs = {
+                "keywords": query,
+                "max_results": max_results,
+                "region": region
+            }
+            if time_range:
+                search_kwargs["timelimit"] = time_range
+
+            for result in ddgs.text(**search_kwargs):
+                results.append({
+                    "title": result.get("title", ""),
+                    "url": result.get("href", ""),
+                    "snippet": result.get("body", "")
+                })
+        return results
+
+    async def search(
+        self, query: str, max_results: int, region: str, time_range: Optional[str]
+    ) -> List[dict]:
+        return await tool_executor.run(self._search, query, max_results, region, time_range)
+
+
+class StubBackend(SearchBackend):
+    """本地桩后端 - 不访问网络，用于测试与离线开发
+
+    results 中登记了的查询词（按规范化后的查询词匹配）返回对应结果，
+    否则按查询词生成确定的结果。calls 记录实际执行的搜索次数。
+    """
+
+    name = "stub"
+
+    def __init__(self, results: Optional[Dict[str, List[dict]]] = None, delay: float = 0.0):
+        self.results = {normalize_query(query): items for query, items in (results or {}).items()}
+        self.delay = delay
+        self.calls = 0
+
+    async def search(
+        self, query: str, max_results: int, region: str, time_range: Optional[str]
+    ) -> List[dict]:
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        items = self.results.get(normalize_query(query))
+        if items is None:
+            items = [
+                {
+                    "title": f"{query} - 结果 {i}",
+                    "url": f"https://example.invalid/{i}?q={normalize_query(query).replace(' ', '+')}",
+                    "snippet": f"关于 {query} 的第 {i} 条本地测试结果"
+                }
+                for i in range(1, 6)
+            ]
+        return [dict(item) for item in items[:max_results]]
+
+
+BACKENDS: Dict[str, Callable[[], SearchBackend]] = {
+    DuckDuckGoBackend.name: DuckDuckGoBackend,
+    StubBackend.name: StubBackend,
+}
+
+
+def register_backend(name: str, factory: Callable[[], SearchBackend]):
+    """登记搜索后端，通过 WEB_SEARCH_BACKEND 选择"""
+    BACKENDS[name] = factory
+
+
+class _CachedResults:
+    __slots__ = ("results", "max_results", "expires_at")
+
+    def __init__(self, results: List[dict], max_results: int, expires_at: float):
+        self.results = results
+        self.max_results = max_results
+        self.expires_at = expires_at
+
+    def covers(self, max_results: int) -> bool:
+        """缓存结果能否满足本次请求：请求数不超过缓存时的请求数，或结果已经取尽"""
+        return max_results <= self.max_results or len(self.results) < self.max_results
+
+
+def _copy(results: List[dict], max_results: int) -> List[dict]:
+    return [dict(item) for item in results[:max_results]]
+
+
+class WebSearchService:
+    """网络搜索服务 - 在搜索后端之上提供 TTL 缓存与单飞合并
+
+    结果按 (规范化查询词, 区域, 时间范围) 缓存 WEB_SEARCH_CACHE_TTL 秒，结果条数更少的请求
+    直接截取缓存；同一个键同时只有一个请求访问后端，并发的相同查询等待同一个结果。
+    某个调用方被取消（如工具超时）不会取消其他调用方正在等待的请求。失败的结果不缓存。
+    """
+
+    def __init__(self, backend: Optional[SearchBackend] = None):
+        self._backend = backend
+        self._cache: "OrderedDict[SearchKey, _CachedResults]" = OrderedDict()
+        self._inflight: Dict[SearchKey, Tuple[int, "asyncio.Future"]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @property
+    def backend(self) -> SearchBackend:
+        if self._backend is None:
+            factory = BACKENDS.get(settings.WEB_SEARCH_BACKEND)
+            if factory is None:
+                raise ValueError(f"未知的搜索后端: {settings.WEB_SEARCH_BACKEND}")
+            self._backend = factory()
+            logger.info(f"网络搜索后端: {self._backend.name}")
+        return self._backend
+
+    def set_backend(self, backend: Optional[SearchBackend]):
+        """替换搜索后端（如测试中使用 StubBackend），同时清空缓存"""
+        self._backend = backend
+        self.clear()
+
+    async def search(
+        self,
+        query: str,
+        max_results: int = 10,
+        region: Optional[str] = None,
+        time_range: Optional[str] = None,
+    ) -> List[dict]:
+        """搜索并返回结果列表（每次返回新的副本，调用方可以修改）"""
+        region = region or "wt-wt"
+        key: SearchKey = (normalize_query(query), region, time_range or None)
+
+        cached = self._cache.get(key)
+        if cached is not None:
+            if cached.expires_at > time.monotonic() and cached.covers(max_results):
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return _copy(cached.results, max_results)
+            if cached.expires_at <= time.monotonic():
+                del self._cache[key]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight[0] >= max_results:
+            self.coalesced += 1
+            return _copy(await asyncio.shield(inflight[1]), max_results)
+
+        self.misses += 1
+        task = asyncio.ensure_future(self._fetch(key, query, max_results, region, time_range))
+        # 所有调用方都被取消时，后端的异常由回调取走，避免 "exception was never retrieved"
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._inflight[key] = (max_results, task)
+        return _copy(await asyncio.shield(task), max_results)
+
+    async def _fetch(
+        self, key: SearchKey, query: str, max_results: int, region: str, time_range: Optional[str]
+    ) -> List[dict]:
+        try:
+            results = await self.backend.search(query, max_results, region, time_range)
+            self._cache[key] = _CachedResults(results, max_results, time.monotonic() + settings.WEB_SEARCH_CACHE_TTL)
+            self._cache.move_to_end(key)
+            while len(self._cache) > settings.WEB_SEARCH_CACHE_MAX_ENTRIES:
+                self._cache.popitem(last=False)
+            return results
+        finally:
+            if self._inflight.get(key, (None, None))[1] is asyncio.current_task():
+                del self._inflight[key]
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend.name,
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
+
+
+web_search_service = WebSearchService()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+流式响应延迟基准 - 验证内置工具执行期间其他客户端的流不被阻塞
+
+模拟一个 SSE 客户端按固定间隔接收事件，同时通过 tool_manager 执行大目录的 file_search
+与大文件的 file_read，统计事件间隔。事件循环被阻塞时间隔会明显超过设定的发送间隔。
+
+对照组（--baseline）直接在事件循环中调用工具的同步实现，展示阻塞时的间隔。
+最大间隔超过 --max-gap-ms 时以退出码 1 结束，可作为回归检查。
+
+用法（在 backend 目录下）:
+    python benchmarks/stream_latency.py
+    python benchmarks/stream_latency.py --directory /path/to/repo --pattern "TODO|FIXME"
+    python benchmarks/stream_latency.py --baseline
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def build_tree(root: Path, files: int, file_size: int) -> Path:
+    """生成测试目录：files 个文本文件，每个约 file_size 字节"""
+    line = "the quick brown fox jumps over the lazy dog 0123456789\n"
+    body = line * max(file_size // len(line), 1)
+    for i in range(files):
+        directory = root / f"pkg{i % 32:02d}"
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"module_{i:05d}.txt").write_text(body, encoding="utf-8")
+    big_file = root / "big.log"
+    with open(big_file, "w", encoding="utf-8") as f:
+        for i in range(200_000):
+            f.write(f"{i:08d} {line}")
+    return root
+
+
+async def stream_client(interval: float, stop: asyncio.Event) -> list:
+    """模拟 SSE 客户端：每 interval 秒收到一个事件，返回相邻事件的实际间隔（秒）"""
+    gaps = []
+    last = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(interval)
+        now = time.perf_counter()
+        gaps.append(now - last)
+        last = now
+    return gaps
+
+
+async def run_tools(directory: Path, pattern: str, rounds: int, baseline: bool) -> list:
+    """执行若干轮 file_search + file_read，返回每轮耗时（秒）"""
+    from app.core.tool_manager import tool_manager
+    from app.tools.builtin import file_search
+    from app.tools.line_index import read_window
+
+    await tool_manager.load_builtin_tools()
+    # 每轮都要真实执行，不走结果缓存
+    tool_manager.result_cache.enabled = False
+
+    durations = []
+    for i in range(rounds):
+        started = time.perf_counter()
+        if baseline:
+            file_search._search(directory, pattern, None, False, 100)
+            read_window(str(directory / "big.log"), start_line=100_000, end_line=100_100)
+        else:
+            await tool_manager.execute_tool("file_search", {
+                "directory": str(directory), "pattern": pattern, "max_results": 100
+            })
+            await tool_manager.execute_tool("file_read", {
+                "file_path": str(directory / "big.log"), "start_line": 100_000, "end_line": 100_100
+            })
+        durations.append(time.perf_counter() - started)
+        print(f"  第 {i + 1} 轮工具耗时: {durations[-1] * 1000:.0f} ms")
+    return durations
+
+
+async def main(args) -> int:
+    with tempfile.TemporaryDirectory(prefix="stream_latency_") as tmp:
+        if args.directory:
+            directory = Path(args.directory).absolute()
+        else:
+            print(f"生成测试目录: {args.files} 个文件 x {args.file_size // 1024} KB")
+            directory = build_tree(Path(tmp), args.files, args.file_size)
+
+        from app.core.tool_manager import tool_manager
+        from app.tools.executor import tool_executor
+        from app.tools.search.parallel import search_pool
+
+        # 预热：创建进程池与线程池，避免把启动开销计入第一轮
+        await tool_manager.load_builtin_tools()
+        await tool_manager.execute_tool("file_search", {
+            "directory": str(directory), "pattern": args.pattern, "max_results": 1
+        })
+
+        stop = asyncio.Event()
+        client = asyncio.create_task(stream_client(args.interval, stop))
+        await asyncio.sleep(args.interval * 5)
+        try:
+            durations = await run_tools(directory, args.pattern, args.rounds, args.baseline)
+        finally:
+            stop.set()
+            gaps = await client
+            await tool_manager.cleanup()
+            tool_executor.close()
+            search_pool.close()
+
+    gaps_ms = sorted(gap * 1000 for gap in gaps)
+    p50 = statistics.median(gaps_ms)
+    p99 = gaps_ms[min(int(len(gaps_ms) * 0.99), len(gaps_ms) - 1)]
+    worst = gaps_ms[-1]
+    mode = "对照组（事件循环中同步执行）" if args.baseline else "工具执行池"
+    print(f"\n模式: {mode}")
+    print(f"工具平均耗时: {statistics.mean(durations) * 1000:.0f} ms")
+    print(f"流事件数: {len(gaps_ms)}，目标间隔: {args.interval * 1000:.0f} ms")
+    print(f"事件间隔 p50: {p50:.1f} ms  p99: {p99:.1f} ms  最大: {worst:.1f} ms")
+
+    if worst > args.max_gap_ms:
+        print(f"失败: 最大间隔超过 {args.max_gap_ms} ms，工具执行阻塞了事件循环")
+        return 1
+    print("通过: 工具执行期间流保持流畅")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="内置工具执行期间的流式响应延迟基准")
+    parser.add_argument("--directory", help="搜索的目录，默认生成临时测试目录")
+    parser.add_argument("--pattern", default=r"needle_\d{6}_absent", help="搜索的正则（默认不命中，扫描全部文件）")
+    parser.add_argument("--files", type=int, default=2000, help="生成的文件数")
+    parser.add_argument("--file-size", type=int, default=16 * 1024, help="生成的单个文件大小（字节）")
+    parser.add_argument("--rounds", type=int, default=3, help="工具执行轮数")
+    parser.add_argument("--interval", type=float, default=0.01, help="模拟流的事件间隔（秒）")
+    parser.add_argument("--max-gap-ms", type=float, default=100.0, help="允许的最大事件间隔（毫秒）")
+    parser.add_argument("--baseline", action="store_true", help="对照组：在事件循环中同步执行工具")
+    sys.exit(asyncio.run(main(parser.parse_args())))
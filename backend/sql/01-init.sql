@@ -230,8 +230,10 @@ CREATE TABLE IF NOT EXISTS `builtin_tools` (
 -- 内置工具列表:
 -- - file_save: 文件保存
 -- - file_read: 文件读取
+-- - file_read_many: 批量文件读取
 -- - file_search: 文件搜索
 -- - web_search: 网络搜索
+-- - web_fetch: 网页抓取
 
 -- ============================================================================
 -- 7. 工具执行历史表 (tool_executions)
@@ -299,6 +301,29 @@ CREATE TABLE IF NOT EXISTS `system_settings` (
         ON UPDATE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='系统设置表';
 
+-- ============================================================================
+-- 9. MCP工具目录表 (mcp_tool_catalog)
+-- ============================================================================
+-- 说明: 持久化外部 MCP 服务器的工具定义，聊天请求直接读取，无需实时 tools/list
+-- ============================================================================
+CREATE TABLE IF NOT EXISTS `mcp_tool_catalog` (
+    `id` BIGINT UNSIGNED NOT NULL AUTO_INCREMENT COMMENT '工具目录ID，主键',
+    `server_id` BIGINT UNSIGNED NOT NULL COMMENT '所属MCP服务器ID',
+    `tool_name` VARCHAR(100) NOT NULL COMMENT '工具名称',
+    `description` TEXT DEFAULT NULL COMMENT '工具描述',
+    `input_schema` JSON NOT NULL COMMENT '工具参数Schema (JSON格式)',
+    `schema_hash` CHAR(64) NOT NULL COMMENT '工具定义哈希值 (SHA-256)',
+    `fetched_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '最近拉取时间',
+    PRIMARY KEY (`id`),
+    UNIQUE KEY `uk_server_tool` (`server_id`, `tool_name`),
+    KEY `idx_server_id` (`server_id`),
+    CONSTRAINT `fk_mcp_tool_catalog_server_id`
+        FOREIGN KEY (`server_id`)
+        REFERENCES `mcp_servers` (`id`)
+        ON DELETE CASCADE
+        ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='MCP工具目录表';
+
 -- ============================================================================
 -- 插入默认内置工具配置 (所有用户默认启用)
 -- ============================================================================
@@ -307,8 +332,10 @@ CREATE TABLE IF NOT EXISTS `system_settings` (
 -- INSERT INTO `builtin_tools` (`user_id`, `tool_name`, `is_enabled`)
 -- VALUES (1, 'file_save', TRUE),
 --        (1, 'file_read', TRUE),
+--        (1, 'file_read_many', TRUE),
 --        (1, 'file_search', TRUE),
---        (1, 'web_search', TRUE);
+--        (1, 'web_search', TRUE),
+--        (1, 'web_fetch', TRUE);
 
 -- ============================================================================
 -- 创建视图 (可选，便于查询)
@@ -0,0 +1,19 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.deps import get_current_admin_user
+
+
+@pytest.mark.asyncio
+async def test_admin_routes_require_listed_username(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_USERNAMES", ["root"])
+
+    admin = SimpleNamespace(username="root", is_active=True)
+    assert await get_current_admin_user(admin) is admin
+
+    with pytest.raises(HTTPException) as excinfo:
+        await get_current_admin_user(SimpleNamespace(username="alice", is_active=True))
+    assert excinfo.value.status_code == 403
@@ -0,0 +1,82 @@
+import re
+
+import pytest
+
+from app.core.config import settings
+from app.tools.builtin.file_search import file_search
+from app.tools.search.scanner import SearchPattern, literal_text, scan_file
+
+TEXT = "foo a\nb bar\nzzz\n中文 a\tb\r\nend"
+
+
+def baseline(pattern: str, text: str = TEXT):
+    """逐行匹配（原实现的行为）"""
+    return [
+        (line_number, match)
+        for line_number, line in enumerate(text.split("\n"), 1)
+        for match in re.findall(pattern, line)
+    ]
+
+
+@pytest.fixture
+def sample(tmp_path):
+    path = tmp_path / "sample.txt"
+    path.write_text(TEXT, encoding="utf-8")
+    return path
+
+
+@pytest.mark.parametrize("pattern", [
+    r"[^z]+", r"a\s+b", r"\s+$", r"(?s).+", r"[\s\S]b", r"\Ab", r"\w+$", r"a(?!\n)", r"b\Z",
+    r"foo", r"\w+", r"^b",
+])
+def test_matches_stay_within_one_line(sample, pattern):
+    hits = scan_file(str(sample), SearchPattern(pattern, case_sensitive=True), 100)
+    assert [(hit.line_number, hit.match) for hit in hits] == baseline(pattern)
+    assert all("\n" not in hit.match for hit in hits)
+
+
+@pytest.mark.parametrize("pattern", [r"[^z]+", r"a\s+b|\w+"])
+def test_resume_after_cross_line_pattern(sample, pattern):
+    search_pattern = SearchPattern(pattern, case_sensitive=True)
+    hits = scan_file(str(sample), search_pattern, 100)
+    resumed = scan_file(str(sample), search_pattern, 100, resume_at=hits[0].offset)
+    assert resumed == hits[1:]
+
+
+@pytest.mark.asyncio
+async def test_file_search_does_not_match_across_lines(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "FILE_SEARCH_WORKERS", 1)
+    (tmp_path / "a.txt").write_text("foo a\nb bar\n", encoding="utf-8")
+
+    result = await file_search(str(tmp_path), r"[^z]+", case_sensitive=True)
+    assert [(r["line_number"], r["match"]) for r in result["results"]] == [(1, "foo a"), (2, "b bar")]
+
+    result = await file_search(str(tmp_path), r"a\s+b", case_sensitive=True)
+    assert result["results"] == []
+
+
+FLAGGED = "Foo foo FOO\nbar BAR\nBär bär\n"
+
+
+def test_inline_flags_disable_literal_fast_path():
+    assert literal_text("foo") == "foo"
+    assert literal_text("(?i)foo") is None
+    assert SearchPattern("(?i)foo", case_sensitive=True).literal is None
+
+
+@pytest.mark.parametrize("patterns", [
+    ["(?i)foo"], ["(?i)foo", "bar"], ["(?i)fo+", "bar"], ["(?i)bär", "foo"], ["(?s)o.", "BAR"],
+    ["(?x) b a r  # 注释", "FOO"], ["(?im)^bar", "(?i)FOO"],
+])
+def test_inline_flags_on_fast_paths(tmp_path, patterns):
+    path = tmp_path / "flags.txt"
+    path.write_text(FLAGGED, encoding="utf-8")
+    pattern = patterns[0] if len(patterns) == 1 else patterns
+    hits = scan_file(str(path), SearchPattern(pattern, case_sensitive=True), 100)
+    expected = sorted(
+        (line_number, match.start(), match.group())
+        for single in patterns
+        for line_number, line in enumerate(FLAGGED.split("\n"), 1)
+        for match in re.finditer(single, line)
+    )
+    assert [(hit.line_number, hit.match) for hit in hits] == [(line, match) for line, _, match in expected]
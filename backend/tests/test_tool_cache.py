@@ -0,0 +1,29 @@
+import os
+
+from app.core.tool_cache import _directory_fingerprint
+
+
+def test_directory_fingerprint_follows_search_walk(tmp_path):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "main.py").write_text("print('hi')\n", encoding="utf-8")
+    (tmp_path / "node_modules" / "pkg").mkdir(parents=True)
+    vendored = tmp_path / "node_modules" / "pkg" / "index.js"
+    vendored.write_text("x", encoding="utf-8")
+    root = str(tmp_path)
+
+    before = _directory_fingerprint(root, None)
+    with_py = _directory_fingerprint(root, "*.py")
+    # 被排除目录中的变化不影响指纹
+    vendored.write_text("changed", encoding="utf-8")
+    (tmp_path / "node_modules" / "pkg" / "extra.js").write_text("y", encoding="utf-8")
+    assert _directory_fingerprint(root, None) == before
+
+    # 不匹配 file_pattern 的文件不参与指纹
+    (tmp_path / "notes.txt").write_text("note", encoding="utf-8")
+    assert _directory_fingerprint(root, "*.py") == with_py
+    assert _directory_fingerprint(root, None) != before
+
+    source = tmp_path / "src" / "main.py"
+    source.write_text("print('changed')\n", encoding="utf-8")
+    os.utime(source, ns=(1, 1))
+    assert _directory_fingerprint(root, "*.py") != with_py
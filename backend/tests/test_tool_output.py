@@ -0,0 +1,60 @@
+import json
+
+from app.core.tool_output import ToolOutputShaper, _fitting_length, count_tokens, truncate_middle
+
+TEXT = "\n".join(f"{i:06d} the quick brown fox 中文内容 jumps over the lazy dog" for i in range(20000))
+
+
+def test_fitting_length_is_longest_prefix_within_budget():
+    for max_tokens in (1, 50, 3000):
+        for from_end in (False, True):
+            length = _fitting_length(TEXT, max_tokens, from_end=from_end)
+            part = TEXT[len(TEXT) - length:] if from_end else TEXT[:length]
+            assert count_tokens(part) <= max_tokens
+            longer = TEXT[len(TEXT) - length - 64:] if from_end else TEXT[:length + 64]
+            assert count_tokens(longer) > max_tokens
+
+
+def test_truncate_middle_keeps_head_and_tail():
+    shaped = truncate_middle(TEXT, 1000)
+    assert count_tokens(shaped) <= 1000
+    assert shaped.startswith("000000 ")
+    assert shaped.endswith(TEXT[-40:])
+    assert "已省略" in shaped
+    assert truncate_middle("short", 1000) == "short"
+
+
+def test_shape_respects_budget():
+    shaper = ToolOutputShaper()
+    result = {
+        "success": True,
+        "content": TEXT,
+        "results": [{"line_content": "x = foo(bar)", "line_number": i} for i in range(5000)],
+    }
+    budget = shaper.budget_for("file_read")
+    shaped = shaper.shape("file_read", result)
+    assert count_tokens(shaped) <= budget
+    assert '"_omitted"' in shaped
+    assert shaper.remaining == shaper.run_budget - count_tokens(shaped)
+
+
+def test_shape_keeps_json_valid_when_estimate_is_slightly_low():
+    shaper = ToolOutputShaper()
+    budget = shaper.budget_for("file_read")
+    shaped = shaper.shape("file_read", {"success": True, "content": "line\n" * 100000})
+
+    assert count_tokens(shaped) <= budget
+    data = json.loads(shaped)
+    assert data["content"].startswith("line\nline\n")
+    assert "已省略" in data["content"]
+
+
+def test_shape_shrinks_oversized_list_elements_instead_of_dropping_them():
+    shaper = ToolOutputShaper()
+    budget = shaper.budget_for("x")
+    shaped = shaper.shape("x", {"a": [["z" * 1000] * 100] * 10})
+
+    assert count_tokens(shaped) <= budget
+    first, marker = json.loads(shaped)["a"]
+    assert "z" * 1000 in first
+    assert marker.startswith("...[已省略 9 项")
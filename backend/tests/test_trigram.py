@@ -0,0 +1,37 @@
+import shutil
+
+from app.tools.search.trigram import TrigramIndex, regex_trigram_query
+
+
+def test_removed_directory_only_drops_its_own_files(tmp_path):
+    root = tmp_path / "root"
+    for directory in ("my_pkg", "myXpkg", "my%pkg"):
+        (root / directory).mkdir(parents=True)
+        (root / directory / "mod.py").write_text("needle\n", encoding="utf-8")
+    index = TrigramIndex(str(root), str(tmp_path / "index.sqlite3"))
+    try:
+        index.refresh()
+        shutil.rmtree(root / "my_pkg")
+        index.mark_dirty([str(root / "my_pkg")])
+        index._apply_dirty()
+        # 目录名中的 _ 不会当作通配符删除同级目录的文件
+        assert index.candidates(regex_trigram_query("needle", ignore_case=False)) == [
+            "my%pkg/mod.py", "myXpkg/mod.py",
+        ]
+    finally:
+        index.close()
+
+
+def test_inline_ignore_case_flag_applies_to_trigram_query(tmp_path):
+    root = tmp_path / "root"
+    root.mkdir()
+    (root / "upper.txt").write_text("BÄR\n", encoding="utf-8")
+    index = TrigramIndex(str(root), str(tmp_path / "index.sqlite3"))
+    try:
+        index.refresh()
+        # (?i) 与 ignore_case=True 一样不能按非 ASCII 字母的大小写筛选文件
+        for pattern in ("(?i)bär", "(?i:bär)"):
+            query = regex_trigram_query(pattern, ignore_case=False)
+            assert query is None or index.candidates(query) == ["upper.txt"]
+    finally:
+        index.close()
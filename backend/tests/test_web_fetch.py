@@ -0,0 +1,137 @@
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import pytest_asyncio
+
+from app.core.config import settings
+from app.core.http_client import HTTPClientRegistry
+from app.tools.builtin import web_fetch as web_fetch_module
+from app.tools.web import fetch as fetch_module
+from app.tools.web.fetch import WebFetcher
+
+ARTICLE = """<!doctype html>
+<html><head><title>  测试 页面 </title><style>body { color: red }</style></head>
+<body>
+<nav><a href="/">首页</a></nav>
+<script>var tracking = true;</script>
+<h1>标题</h1>
+<p>第一段   正文。</p>
+<ul><li>要点一</li><li>要点二</li></ul>
+<footer>页脚</footer>
+</body></html>
+"""
+
+
+class _Handler(BaseHTTPRequestHandler):
+    hits: Counter = Counter()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.hits[self.path] += 1
+        if self.path == "/article":
+            self._send(200, ARTICLE.encode("utf-8"), {"Content-Type": "text/html; charset=utf-8"})
+        elif self.path == "/plain":
+            self._send(200, "纯文本\n内容".encode("gbk"), {"Content-Type": "text/plain; charset=gbk"})
+        elif self.path == "/etag":
+            # max-age=0：每次都要重新验证，内容未变时返回 304
+            if self.headers.get("If-None-Match") == '"v1"':
+                self._send(304, headers={"ETag": '"v1"', "Cache-Control": "max-age=0"})
+            else:
+                self._send(200, b"<p>versioned</p>", {
+                    "Content-Type": "text/html", "ETag": '"v1"', "Cache-Control": "max-age=0",
+                })
+        elif self.path == "/redirect":
+            self._send(302, headers={"Location": "/article"})
+        elif self.path == "/image":
+            self._send(200, b"\x89PNG", {"Content-Type": "image/png"})
+        else:
+            self._send(404)
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest_asyncio.fixture
+async def fetcher(monkeypatch):
+    """每个测试使用独立的抓取器与 HTTP 客户端（客户端绑定在当前事件循环上）"""
+    _Handler.hits.clear()
+    clients = HTTPClientRegistry()
+    fetcher = WebFetcher()
+    monkeypatch.setattr(fetch_module, "http_clients", clients)
+    monkeypatch.setattr(web_fetch_module, "web_fetcher", fetcher)
+    monkeypatch.setattr(settings, "WEB_FETCH_ALLOW_PRIVATE_NETWORKS", True)
+    yield fetcher
+    await clients.aclose()
+
+
+@pytest.mark.asyncio
+async def test_web_fetch_extracts_main_text(server, fetcher):
+    result = await web_fetch_module.web_fetch([f"{server}/redirect", f"{server}/plain"])
+
+    assert result["success"] and result["message"] == "已抓取 2/2 个网页"
+    article, plain = result["results"]
+    assert article["final_url"] == f"{server}/article"
+    assert article["title"] == "测试 页面"
+    assert article["content"] == "# 标题\n第一段 正文。\n- 要点一\n- 要点二"
+    assert plain["content"] == "纯文本\n内容"
+    assert plain["content_type"] == "text/plain"
+
+
+@pytest.mark.asyncio
+async def test_web_fetch_caches_and_revalidates(server, fetcher):
+    first = await web_fetch_module.web_fetch([f"{server}/article", f"{server}/article"])
+    second = await web_fetch_module.web_fetch([f"{server}/article"])
+
+    # 重复地址只抓取一次，再次抓取直接命中缓存
+    assert _Handler.hits["/article"] == 1
+    assert [r["cached"] for r in first["results"]] == [False, False]
+    assert second["results"][0]["cached"] is True
+    assert second["results"][0]["content"] == first["results"][0]["content"]
+
+    # 已过期的条目带 If-None-Match 重新验证，304 时复用缓存内容
+    await fetcher.fetch(f"{server}/etag")
+    page, cached = await fetcher.fetch(f"{server}/etag")
+    assert cached and page.content == "versioned"
+    assert _Handler.hits["/etag"] == 2
+    assert fetcher.stats()["revalidated"] == 1
+
+
+@pytest.mark.asyncio
+async def test_web_fetch_reports_per_url_errors(server, fetcher):
+    result = await web_fetch_module.web_fetch([f"{server}/missing", f"{server}/image", "ftp://example.com/x"])
+
+    assert result["success"] is False
+    messages = [r["message"] for r in result["results"]]
+    assert messages[0].startswith("HTTP 404")
+    assert messages[1] == "不支持的内容类型: image/png"
+    assert messages[2].startswith("只支持 http/https 地址")
+
+
+@pytest.mark.asyncio
+async def test_web_fetch_blocks_private_networks(server, fetcher, monkeypatch):
+    monkeypatch.setattr(settings, "WEB_FETCH_ALLOW_PRIVATE_NETWORKS", False)
+
+    result = await web_fetch_module.web_fetch([f"{server}/article"])
+
+    assert result["success"] is False
+    assert result["results"][0]["message"] == "不允许访问内网地址: 127.0.0.1"
+    assert _Handler.hits["/article"] == 0
@@ -0,0 +1,101 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.tools.builtin import web_search as web_search_module
+from app.tools.web import search as search_module
+from app.tools.web.search import SearchBackend, StubBackend, WebSearchService
+
+
+def test_search_backend_is_abstract():
+    with pytest.raises(TypeError):
+        SearchBackend()
+
+
+@pytest.mark.asyncio
+async def test_repeated_query_is_served_from_cache():
+    backend = StubBackend()
+    service = WebSearchService(backend)
+
+    first = await service.search("Python  asyncio", max_results=5)
+    # 规范化后相同的查询词、更少的结果条数都命中缓存
+    again = await service.search("python asyncio", max_results=3)
+
+    assert backend.calls == 1
+    assert again == first[:3]
+    assert (service.hits, service.misses) == (1, 1)
+
+    # 返回的是副本，修改不会污染缓存
+    again[0]["title"] = "modified"
+    assert (await service.search("python asyncio", max_results=5)) == first
+
+    # 需要更多结果、不同区域时重新访问后端
+    await service.search("python asyncio", max_results=8)
+    await service.search("python asyncio", max_results=5, region="cn-zh")
+    assert backend.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_queries_share_one_backend_call():
+    backend = StubBackend(delay=0.05)
+    service = WebSearchService(backend)
+
+    results = await asyncio.gather(*(service.search("single flight", max_results=5) for _ in range(5)))
+
+    assert backend.calls == 1
+    assert service.coalesced == 4
+    assert all(r == results[0] for r in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_shared_search():
+    backend = StubBackend(delay=0.05)
+    service = WebSearchService(backend)
+
+    first = asyncio.ensure_future(service.search("shared", max_results=5))
+    await asyncio.sleep(0)
+    second = asyncio.ensure_future(service.search("shared", max_results=5))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert len(await second) == 5
+    assert backend.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    # 只替换搜索模块看到的时钟，事件循环仍使用真实的 time.monotonic
+    monkeypatch.setattr(search_module, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    monkeypatch.setattr(settings, "WEB_SEARCH_CACHE_TTL", 60)
+    backend = StubBackend()
+    service = WebSearchService(backend)
+
+    await service.search("ttl", max_results=5)
+    now[0] += 59
+    await service.search("ttl", max_results=5)
+    assert backend.calls == 1
+
+    now[0] += 2
+    await service.search("ttl", max_results=5)
+    assert backend.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_web_search_tool_pages_with_cursor(monkeypatch):
+    items = [{"title": f"t{i}", "url": f"https://example.invalid/{i}", "snippet": ""} for i in range(7)]
+    monkeypatch.setattr(web_search_module, "web_search_service", WebSearchService(StubBackend({"paging": items})))
+
+    pages = [await web_search_module.web_search("paging", max_results=3)]
+    while pages[-1]["next_cursor"]:
+        pages.append(await web_search_module.web_search("paging", max_results=3, cursor=pages[-1]["next_cursor"]))
+
+    assert [r["url"] for page in pages for r in page["results"]] == [item["url"] for item in items]
+    assert [page["total_results"] for page in pages] == [3, 3, 1]
+
+    # 游标只能用于同一查询
+    mismatched = await web_search_module.web_search("other", max_results=3, cursor=pages[0]["next_cursor"])
+    assert mismatched["success"] is False
+    assert "游标与本次查询参数不匹配" in mismatched["message"]